@@ -1,5 +1,12 @@
+import numpy as np
 import pandas as pd
+from utils.config_loader import ConfigLoader
 from utils.logger import get_logger
+from backtest.vectorized_backtest import entry_arrays, find_exit
+from backtest.intrabar import IntrabarExits
+from data.bar_store import BAR_FIELDS
+from execution.order_executor import OrderExecutor
+from execution.simulated_broker import SimulatedBroker
 
 logger = get_logger(__name__)
 
@@ -7,11 +14,40 @@ class BacktestEngine:
     """
     Main engine to simulate backtest using a strategy and risk rules.
     Supports both long and short positions.
+
+    Two execution modes produce the same trades:
+    - 'loop': calls the strategy's per-bar methods on every bar
+    - 'vectorized': uses the strategy's array-level signals and only runs
+      Python code per trade, not per bar
+
+    With a broker, entries and exits are sent as market orders through an
+    OrderExecutor (the same path live trading uses) and the trades record the
+    broker's fill prices, fill times and fees, so slippage, latency, volume
+    caps and maker/taker fees apply. Without one, trades fill instantly at
+    the bar's close.
+
+    With intrabar exits, take profit / stop loss use the strategy's
+    exit_levels() checked against each bar's high and low (IntrabarExits)
+    instead of take_profit() / stop_loss() on the close; with a broker they
+    are sent as resting stop / limit orders.
     """
 
-    def __init__(self, strategy_class, data, context, trade_logger, risk_checker):
-        self.strategy = strategy_class(data, config_path=None)
-        self.strategy.config = context.strategy_config
+    def __init__(self, strategy_class, data, context, trade_logger, risk_checker, mode=None, strategy=None,
+                 broker=None, intrabar=None):
+        """
+        Parameters:
+        - strategy (BaseStrategy): Optional already prepared instance (e.g. a
+          strategy.window() view) used instead of building one from strategy_class
+        - broker (BrokerInterface): Order execution; defaults to a SimulatedBroker built
+          from backtest_config['execution_config'], or instant fills at close if that is empty
+        - intrabar (IntrabarExits): High/low level exits, e.g. with lower-timeframe drill-down;
+          defaults to one without drill-down if backtest_config['intrabar_exits'] is set
+        """
+        if strategy is None:
+            strategy = strategy_class(data, config_path=None)
+            strategy.config = context.strategy_config
+            strategy.prepare()
+        self.strategy = strategy
         self.data = data
         self.ctx = context
         self.trade_logger = trade_logger
@@ -22,10 +58,28 @@ class BacktestEngine:
         self.daily_loss = 0.0
         self.current_day = None
         self.final_unrealized_position = None
+        self.mode = mode or context.backtest_config.get('engine_mode', 'loop')
+
+        execution_config = context.backtest_config.get('execution_config')
+        if broker is None and execution_config:
+            broker = SimulatedBroker.from_config(ConfigLoader.load(execution_config), context.backtest_config)
+        self.executor = OrderExecutor(broker) if broker is not None else None
+        self.symbol = data.attrs.get('symbol') or 'asset'
+        self._ohlcv = {f: data[f].to_numpy(dtype=float) for f in BAR_FIELDS if f in data} if broker else None
+
+        if intrabar is None and context.backtest_config.get('intrabar_exits'):
+            intrabar = IntrabarExits(data, ambiguous=context.backtest_config.get('intrabar_ambiguous', 'stop_loss'))
+        self.intrabar = intrabar
 
     def run(self):
+        if self.mode == 'vectorized':
+            self._run_vectorized()
+            return
         logger.info("Starting backtest engine run...")
+        resume = 0  # 订单跨多根 K 线成交时，跳到成交完成的那根
         for i in range(len(self.data)):
+            if i < resume:
+                continue
             time = self.data.index[i]
             price = self.data['close'].iloc[i]
 
@@ -42,22 +96,35 @@ class BacktestEngine:
 
                 logger.debug(f"Evaluating exit for position at index {i}, price {price:.2f}")
 
-                take_profit = self.strategy.take_profit(entry_price, price) if direction == 'long' \
-                    else self.strategy.take_profit(price, entry_price)
-                stop_loss = self.strategy.stop_loss(entry_price, price) if direction == 'long' \
-                    else self.strategy.stop_loss(price, entry_price)
+                levels = self.position['levels']
+                exit_price = price
+                if levels is not None:
+                    # 止盈止损价位按当根最高 / 最低价判断
+                    reason, level_price = self.intrabar.check(i, *levels, direction)
+                    take_profit, stop_loss = reason == 'take_profit', reason == 'stop_loss'
+                    if reason:
+                        exit_price = level_price
+                else:
+                    take_profit = self.strategy.take_profit(entry_price, price) if direction == 'long' \
+                        else self.strategy.take_profit(price, entry_price)
+                    stop_loss = self.strategy.stop_loss(entry_price, price) if direction == 'long' \
+                        else self.strategy.stop_loss(price, entry_price)
 
                 exit_signal = hasattr(self.strategy, "exit_signal") and self.strategy.exit_signal(i, entry_price)
 
+                k = i
                 if take_profit:
                     logger.info(f"Take profit triggered at index {i}")
-                    self._exit_trade(i, price, 'take_profit')
+                    k = self._close(i, exit_price, 'take_profit')
                 elif stop_loss:
                     logger.info(f"Stop loss triggered at index {i}")
-                    self._exit_trade(i, price, 'stop_loss')
+                    k = self._close(i, exit_price, 'stop_loss')
                 elif exit_signal:
                     logger.info(f"Exit signal triggered at index {i}")
-                    self._exit_trade(i, price, 'exit_signal')
+                    k = self._close(i, price, 'exit_signal')
+                if k > i:
+                    resume = k
+                    continue
 
             # === Entry Logic ===
             if not self.position:
@@ -68,8 +135,61 @@ class BacktestEngine:
                     capital = self.equity * score
                     if not self.risk_checker.block_entry(capital):
                         logger.info(f"Opening new position at index {i} with signal {signal}")
-                        self._enter_trade(i, price, capital, signal, direction)
+                        resume = self._open(i, price, capital, signal, direction) + 1
+
+        self._record_unrealized()
+        logger.info("Backtest engine run completed.")
+
+    def _run_vectorized(self):
+        logger.info("Starting vectorized backtest engine run...")
+        close = self.data['close'].to_numpy(dtype=float)
+        signals, score, direction = entry_arrays(self.strategy)
+        exit_mask = self.strategy.exit_signals()
+        if exit_mask is not None:
+            exit_mask = np.asarray(exit_mask, dtype=bool)
+        candidates = np.flatnonzero((score > 0) & (direction != 0))
+
+        i = 0
+        while True:
+            k = np.searchsorted(candidates, i)
+            if k >= len(candidates):
+                break
+            i = int(candidates[k])
+            capital = self.equity * score[i]
+            if self.risk_checker.block_entry(capital):
+                i += 1
+                continue
+
+            side = 'long' if direction[i] > 0 else 'short'
+            logger.info(f"Opening new position at index {i} with signal {signals[i]}")
+            k = self._open(i, close[i], capital, signals[i], side)
+            if not self.position:
+                i = k + 1
+                continue
+
+            entry_price, levels = self.position['entry_price'], self.position['levels']
+            if levels is not None:
+                j, reason, exit_price = self.intrabar.find_exit(self.strategy, k + 1, entry_price, *levels,
+                                                                side, exit_mask)
+            else:
+                j, reason = find_exit(self.strategy, close, k + 1, entry_price, side, exit_mask)
+                exit_price = None if j is None else close[j]
+            if j is None:
+                break
+            day = self.data.index[j].date()
+            if self.current_day != day:
+                self.current_day = day
+                self.daily_loss = 0
+            logger.info(f"{reason} triggered at index {j}")
+            k = self._close(j, exit_price, reason)
+            if self.position:
+                break  # 数据结束时平仓单仍未成交完
+            i = k  # 与循环引擎一致：平仓完成的那根 K 线可以再次开仓
 
+        self._record_unrealized()
+        logger.info("Vectorized backtest engine run completed.")
+
+    def _record_unrealized(self):
         # Check for unrealized position
         if self.position:
             entry_price = self.position['entry_price']
@@ -80,8 +200,12 @@ class BacktestEngine:
 
             gross_return = (final_price - entry_price) if direction == 'long' else (entry_price - final_price)
             unrealized_pnl = gross_return * qty
-            fee_pct = self.ctx.backtest_config.get('commission_pct', 0.001)
-            fee_dollar = fee_pct * (entry_price + final_price) / 2 * qty
+            if self.position['fee'] is None:
+                fee_pct = self.ctx.backtest_config.get('commission_pct', 0.001)
+                fee_dollar = fee_pct * (entry_price + final_price) / 2 * qty
+            else:
+                # 已付开仓费 + 按 taker 费率估算的平仓费
+                fee_dollar = self.position['fee'] + self.executor.broker.fee_rate('taker') * final_price * qty
             net_pnl = unrealized_pnl - fee_dollar
 
             self.final_unrealized_position = {
@@ -96,33 +220,112 @@ class BacktestEngine:
             }
             logger.info(f"[Unrealized] Holding position at end → {self.final_unrealized_position}")
 
-        logger.info("Backtest engine run completed.")
-
     def get_unrealized(self):
         return self.final_unrealized_position
 
-    def _enter_trade(self, i, price, capital, signal, direction):
-        qty = capital / price
+    # === Order path ===
+
+    def _bar(self, i) -> dict:
+        bar = {f: values[i] for f, values in self._ohlcv.items()}
+        bar['timestamp'] = self.data.index[i]
+        return bar
+
+    def _execute(self, i, order) -> int:
+        """Feed bars after i to the broker until the order is done; returns the bar it finished on."""
+        k, n = i, len(self.data)
+        while not self.executor.done(order) and k + 1 < n:
+            k += 1
+            self.executor.on_bar(self.symbol, self._bar(k))
+        if not self.executor.done(order):
+            self.executor.cancel(order['id'])  # 数据已结束
+        return k
+
+    def _open(self, i, price, capital, signal, direction) -> int:
+        """
+        Open a position decided on bar i.
+
+        Returns:
+        - int: Bar the entry finished on (i unless latency / volume caps delay it);
+          self.position stays None if nothing filled
+        """
+        if self.executor is None:
+            self._enter_trade(i, price, capital, signal, direction)
+            return i
+        self.executor.on_bar(self.symbol, self._bar(i))
+        order = self.executor.open_position(self.symbol, direction, capital / price, tag=signal)
+        k = self._execute(i, order)
+        if order['filled_qty'] > 0:
+            self._enter_trade(k, order['avg_price'], None, signal, direction,
+                              qty=order['filled_qty'], fee=order['fee'])
+        return k
+
+    def _close(self, i, price, reason) -> int:
+        """Close the position on an exit decided on bar i; returns the bar the exit finished on."""
+        if self.executor is None:
+            self._exit_trade(i, price, reason)
+            return i
+        levels = self.position['levels']
+        if levels is not None and reason in ('stop_loss', 'take_profit'):
+            # 价位出场：上一根收盘时挂好的止损单 / 止盈限价单，在第 i 根内成交
+            level = levels[0] if reason == 'stop_loss' else levels[1]
+            self.executor.on_bar(self.symbol, self._bar(i - 1))
+            order = self.executor.close_at(self.symbol, self.position['direction'], self.position['qty'], level, reason)
+            self.executor.on_bar(self.symbol, self._bar(i))
+            if order['filled_qty'] > 0:
+                self._exit_trade(i, order['avg_price'], reason, qty=order['filled_qty'], fee=order['fee'])
+            if not self.executor.done(order):
+                self.executor.cancel(order['id'])
+            if not self.position:
+                return i
+            # 未成交部分改用市价平仓
+        self.executor.on_bar(self.symbol, self._bar(i))
+        order = self.executor.close_position(self.symbol, self.position['direction'], self.position['qty'], tag=reason)
+        k = self._execute(i, order)
+        if order['filled_qty'] > 0:
+            self._exit_trade(k, order['avg_price'], reason, qty=order['filled_qty'], fee=order['fee'])
+        return k
+
+    def _enter_trade(self, i, price, capital, signal, direction, qty=None, fee=None):
+        """
+        Parameters:
+        - qty / fee: Broker fill quantity and entry fee; without them qty = capital / price
+          and fees are charged on exit from commission_pct
+        """
+        if qty is None:
+            qty = capital / price
+        if capital is None:
+            capital = qty * price
         self.position = {
             'entry_time': self.data.index[i],
             'entry_price': price,
             'capital': capital,
             'qty': qty,
             'signal': signal,
-            'direction': direction
+            'direction': direction,
+            'fee': fee,
+            'levels': self.strategy.exit_levels(i, price, direction) if self.intrabar is not None else None
         }
         logger.debug(f"Entered trade: {self.position}")
 
-    def _exit_trade(self, i, price, reason):
+    def _exit_trade(self, i, price, reason, qty=None, fee=None):
+        """
+        Parameters:
+        - qty / fee: Broker fill quantity and exit fee; a partial qty closes only that part
+        """
         entry_price = self.position['entry_price']
-        qty = self.position['qty']
-        capital = self.position['capital']
+        held = self.position['qty']
+        qty = held if qty is None else min(qty, held)
+        share = qty / held
+        capital = self.position['capital'] * share
         direction = self.position['direction']
 
         gross_return = (price - entry_price) if direction == 'long' else (entry_price - price)
         pnl_dollar = gross_return * qty
-        fee_pct = self.ctx.backtest_config.get('commission_pct', 0.001)
-        fee_dollar = fee_pct * (entry_price + price) / 2 * qty
+        if fee is None:
+            fee_pct = self.ctx.backtest_config.get('commission_pct', 0.001)
+            fee_dollar = fee_pct * (entry_price + price) / 2 * qty
+        else:
+            fee_dollar = (self.position['fee'] or 0.0) * share + fee
         net_pnl = pnl_dollar - fee_dollar
 
         self.equity += net_pnl
@@ -144,4 +347,11 @@ class BacktestEngine:
 
         self.trade_logger.record(trade_record)
         logger.debug(f"Exited trade: {trade_record}")
-        self.position = None
+        if share < 1 - 1e-12:
+            # 部分平仓：剩余仓位继续持有
+            self.position['qty'] = held - qty
+            self.position['capital'] -= capital
+            if self.position['fee'] is not None:
+                self.position['fee'] *= 1 - share
+        else:
+            self.position = None
@@ -0,0 +1,233 @@
+import numpy as np
+import pandas as pd
+
+from utils.logger import get_logger
+from utils.timeframe import bar_delta
+
+logger = get_logger(__name__)
+
+AMBIGUOUS_POLICIES = ("stop_loss", "take_profit")
+
+_lower_timeframes = {}  # (fetcher 类型, symbol, bar) -> LowerTimeframe，进程内复用
+
+
+class LowerTimeframe:
+    """
+    Lower-timeframe candles of one symbol, used to look inside bars where
+    both exit levels were touched.
+
+    With a fetcher only the candles inside each bar that needs resolving are
+    downloaded, through the fetcher's range method, and kept per bar. from_fetcher() shares one instance per
+    (fetcher type, symbol, bar) in the process, so parameter sweeps and
+    walk-forward windows download each bar once. A bar without lower
+    candles is logged and left to the `ambiguous` rule.
+    """
+
+    def __init__(self, df: pd.DataFrame = None, fetcher=None, symbol=None, bar="1m"):
+        """
+        Parameters:
+        - df (pd.DataFrame): Already loaded candles (timestamp index, high / low columns)
+        - fetcher: OKXDataFetcher / BinanceDataFetcher used when df does not cover a bar
+        - symbol (str): Instrument for the fetcher
+        - bar (str): Lower timeframe, e.g. '1m' / '5m'
+        """
+        self.fetcher = fetcher
+        self.symbol = symbol
+        self.bar = bar
+        self._ts = self._high = self._low = None
+        self._fetched = {}  # (start, end) -> (high, low)，已下载过的K线窗口
+        self.missing = 0    # 没有低周期K线可用的窗口数
+        if df is not None:
+            self._set(df)
+
+    @classmethod
+    def from_fetcher(cls, fetcher, symbol, bar="1m", **kwargs) -> "LowerTimeframe":
+        key = (type(fetcher).__name__, symbol, bar)
+        if key not in _lower_timeframes:
+            _lower_timeframes[key] = cls(fetcher=fetcher, symbol=symbol, bar=bar, **kwargs)
+        return _lower_timeframes[key]
+
+    def _set(self, df):
+        if df is None or df.empty:
+            return
+        df = df.sort_index()
+        self._ts = pd.DatetimeIndex(df.index).as_unit("ns").asi8
+        self._high = df["high"].to_numpy(dtype=float)
+        self._low = df["low"].to_numpy(dtype=float)
+
+    def _covers(self, start, end):
+        return self._ts is not None and self._ts[0] <= start.value \
+            and end.value <= self._ts[-1] + bar_delta(self.bar).value
+
+    def _fetch(self, start, end):
+        """Download just the candles in [start, end)."""
+        if hasattr(self.fetcher, "get_kline_range"):
+            df = self.fetcher.get_kline_range(self.symbol, bar=self.bar, start=start, end=end)
+        else:
+            df = self.fetcher.get_klines_range(self.symbol, interval=self.bar, start=start, end=end)
+        if df is None or df.empty:
+            return np.empty(0), np.empty(0)
+        df = df.sort_index()
+        return df["high"].to_numpy(dtype=float), df["low"].to_numpy(dtype=float)
+
+    def window(self, start, end):
+        """
+        Candles with start <= timestamp < end.
+
+        Returns:
+        - (np.ndarray, np.ndarray): high and low (empty if not available)
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if self.fetcher is not None and not self._covers(start, end):
+            key = (start.value, end.value)
+            if key not in self._fetched:
+                self._fetched[key] = self._fetch(start, end)
+            high, low = self._fetched[key]
+        elif self._ts is None:
+            high, low = np.empty(0), np.empty(0)
+        else:
+            a, b = np.searchsorted(self._ts, [start.value, end.value])
+            high, low = self._high[a:b], self._low[a:b]
+
+        if not len(high):
+            self.missing += 1
+            # 第一次提示，之后只记 debug，避免参数扫描时刷屏
+            log = logger.warning if self.missing == 1 else logger.debug
+            log(f"[Intrabar] No {self.bar} candles for {self.symbol or 'data'} in [{start}, {end}), "
+                f"bar left to the ambiguous rule")
+        return high, low
+
+
+def _level(value):
+    return np.nan if value is None else float(value)
+
+
+class IntrabarExits:
+    """
+    Exits on stop-loss / take-profit price levels checked against each bar's
+    high and low instead of only its close.
+
+    A level already crossed at the open fills at the open, as a resting stop
+    / limit order would (a gap through the stop is taken first). Otherwise
+    the stop is hit when the low (long) / high (short) reaches it and fills
+    at the stop, and the take-profit when the high / low reaches it and
+    fills at the target. If both levels lie
+    inside one bar, OHLC cannot tell which came first: the bar's
+    lower-timeframe candles decide when available, else `ambiguous`. Level
+    exits come before the strategy's exit signal, which is judged on the close.
+
+    Bars are checked as whole arrays (and in growing chunks by find_exit()),
+    so the only per-trade Python work is one look at the exit bar.
+    """
+
+    def __init__(self, data: pd.DataFrame, lower: LowerTimeframe = None, bar=None, ambiguous="stop_loss"):
+        """
+        Parameters:
+        - data (pd.DataFrame): OHLC candles of the backtest
+        - lower (LowerTimeframe): Candles used to resolve bars that touch both levels
+        - bar (str): Timeframe of data, defaults to data.attrs['bar'] or the typical bar spacing
+        - ambiguous (str): 'stop_loss' (conservative) or 'take_profit' when a bar cannot be resolved
+        """
+        if ambiguous not in AMBIGUOUS_POLICIES:
+            raise ValueError(f"Unknown ambiguous policy: {ambiguous}")
+        self.index = data.index
+        self.open = data["open"].to_numpy(dtype=float)
+        self.high = data["high"].to_numpy(dtype=float)
+        self.low = data["low"].to_numpy(dtype=float)
+        self.close = data["close"].to_numpy(dtype=float)
+        bar = bar or data.attrs.get("bar")
+        if bar:
+            self.bar = bar_delta(bar)
+        else:
+            steps = np.diff(pd.DatetimeIndex(data.index).as_unit("ns").asi8)
+            self.bar = pd.Timedelta(int(np.median(steps)) if len(steps) else 0, unit="ns")
+        self.lower = lower
+        self.ambiguous = ambiguous
+        self.resolved = 0   # 靠低周期K线判定先后的次数
+        self.unresolved = 0  # 按 ambiguous 处理的次数
+
+    def _hits(self, start, end, stop, take, direction):
+        """Per bar in [start, end): stop hit, take hit, stop crossed at open, take crossed at open."""
+        o, h, l = self.open[start:end], self.high[start:end], self.low[start:end]
+        if direction == 'long':
+            return l <= stop, h >= take, o <= stop, o >= take
+        return h >= stop, l <= take, o >= stop, o <= take
+
+    def _resolve(self, j, stop, take, direction) -> str:
+        if self.lower is not None:
+            t = self.index[j]
+            high, low = self.lower.window(t, t + self.bar)
+            if len(high):
+                if direction == 'long':
+                    stop_hit, take_hit = low <= stop, high >= take
+                else:
+                    stop_hit, take_hit = high >= stop, low <= take
+                first_stop = stop_hit.argmax() if stop_hit.any() else len(high)
+                first_take = take_hit.argmax() if take_hit.any() else len(high)
+                if first_stop != first_take:
+                    self.resolved += 1
+                    return 'stop_loss' if first_stop < first_take else 'take_profit'
+        self.unresolved += 1
+        return self.ambiguous
+
+    def _decide(self, j, stop, take, direction, stop_hit, take_hit, stop_gap, take_gap):
+        if stop_gap:
+            return 'stop_loss', self.open[j]
+        if take_gap:
+            return 'take_profit', self.open[j]  # 开盘已越过止盈价：限价单按更优的开盘价成交
+        if stop_hit and take_hit:
+            reason = self._resolve(j, stop, take, direction)
+        else:
+            reason = 'stop_loss' if stop_hit else 'take_profit'
+        return reason, stop if reason == 'stop_loss' else take
+
+    def check(self, i, stop, take, direction):
+        """
+        Level exit on bar i, for the loop engine.
+
+        Returns:
+        - (str, float): 'stop_loss' / 'take_profit' and the exit price, or (None, None)
+        """
+        stop, take = _level(stop), _level(take)
+        hits = [h[0] for h in self._hits(i, i + 1, stop, take, direction)]
+        if hits[0] or hits[1]:
+            return self._decide(i, stop, take, direction, *hits)
+        return None, None
+
+    def find_exit(self, strategy, start, entry_price, stop, take, direction, exit_mask=None, chunk=256):
+        """
+        First bar >= start where the position exits, scanned in growing chunks
+        like vectorized_backtest.find_exit().
+
+        Parameters:
+        - stop / take (float): Price levels, None for no level
+        - exit_mask (np.ndarray): Precomputed strategy.exit_signals(), or None to ask
+          exit_signal(index, entry_price) per bar
+
+        Returns:
+        - (int, str, float): Exit bar, reason and price (the close for 'exit_signal'),
+          or (None, None, None) if the position is still open at the end
+        """
+        stop, take = _level(stop), _level(take)
+        n = len(self.close)
+        while start < n:
+            end = min(n, start + chunk)
+            stop_hit, take_hit, stop_gap, take_gap = self._hits(start, end, stop, take, direction)
+            level = stop_hit | take_hit
+            if exit_mask is not None:
+                ex = exit_mask[start:end]
+            else:
+                ex = np.array([bool(strategy.exit_signal(j, entry_price)) for j in range(start, end)], dtype=bool)
+
+            hit = level | ex
+            if hit.any():
+                k = int(hit.argmax())
+                j = start + k
+                if level[k]:
+                    reason, price = self._decide(j, stop, take, direction,
+                                                 stop_hit[k], take_hit[k], stop_gap[k], take_gap[k])
+                    return j, reason, price
+                return j, 'exit_signal', self.close[j]
+            start = end
+            chunk *= 2
+        return None, None, None
@@ -0,0 +1,190 @@
+import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest.backtest_engine import BacktestEngine
+from backtest.performance_metrics import compute_trade_stats
+from core.strategy_loader import load_all_strategies
+from core.strategy_registry import StrategyRegistry
+from execution.trade_logger import TradeLogger
+from risk_management.risk_checker import RiskChecker
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _attach_shared_memory(name):
+    """
+    Attach to an existing block. Pool workers share the parent's resource
+    tracker, so the block is unlinked exactly once, by SharedCandles.close().
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedCandles:
+    """
+    OHLCV candles placed in shared memory once, so worker processes can build
+    a DataFrame over the same buffer instead of receiving a pickled copy.
+
+    Values are stored column-major (one contiguous float64 row per column),
+    which is exactly pandas' internal block layout, so attaching is zero-copy.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns=("open", "high", "low", "close", "volume")):
+        self.columns = list(columns)
+        n = len(df)
+        self._values = shared_memory.SharedMemory(create=True, size=max(1, len(self.columns) * n * 8))
+        self._index = shared_memory.SharedMemory(create=True, size=max(1, n * 8))
+
+        values = np.ndarray((len(self.columns), n), dtype="f8", buffer=self._values.buf)
+        for k, col in enumerate(self.columns):
+            values[k] = df[col].to_numpy(dtype="f8")
+        dt_index = pd.DatetimeIndex(df.index)
+        index = np.ndarray((n,), dtype="i8", buffer=self._index.buf)
+        index[:] = dt_index.asi8
+        self.spec = {
+            "values": self._values.name,
+            "index": self._index.name,
+            "rows": n,
+            "columns": self.columns,
+            "index_name": df.index.name,
+            "index_unit": dt_index.unit,
+            "index_tz": dt_index.tz,
+        }
+
+    @staticmethod
+    def attach(spec):
+        """
+        Build a read-only DataFrame over the shared buffers.
+
+        Returns:
+        - (pd.DataFrame, list): the frame and the SharedMemory handles that must stay alive with it
+        """
+        values_shm = _attach_shared_memory(spec["values"])
+        index_shm = _attach_shared_memory(spec["index"])
+        n, columns = spec["rows"], spec["columns"]
+        values = np.ndarray((len(columns), n), dtype="f8", buffer=values_shm.buf)
+        values.flags.writeable = False
+        index = np.ndarray((n,), dtype="i8", buffer=index_shm.buf)
+        index = pd.DatetimeIndex(index.view(f"M8[{spec['index_unit']}]"), name=spec["index_name"])
+        if spec["index_tz"] is not None:
+            index = index.tz_localize("UTC").tz_convert(spec["index_tz"])
+        df = pd.DataFrame(values.T, index=index, columns=columns, copy=False)
+        return df, [values_shm, index_shm]
+
+    def close(self):
+        for shm in (self._values, self._index):
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def expand_grid(param_grid: dict, constraint=None) -> list:
+    """
+    Cartesian product of a parameter grid.
+
+    Parameters:
+    - param_grid (dict): name -> list of values
+    - constraint (callable): Optional filter params -> bool, e.g. short_window < long_window
+    """
+    names = list(param_grid)
+    combos = [dict(zip(names, values)) for values in itertools.product(*(param_grid[n] for n in names))]
+    if constraint is not None:
+        combos = [c for c in combos if constraint(c)]
+    return combos
+
+
+# === Worker side ===
+# 每个进程只在初始化时挂载一次共享数据，之后每个任务只重建策略
+
+_worker = {}
+
+
+def _init_worker(spec, context, strategy_name, mode):
+    logging.getLogger().setLevel(logging.WARNING)  # 避免每笔交易的 info 日志拖慢 sweep
+    load_all_strategies()
+    data, handles = SharedCandles.attach(spec)
+    _worker.update(data=data, handles=handles, context=context, strategy_name=strategy_name, mode=mode)
+
+
+def run_single(data, context, strategy_name, params, mode="vectorized"):
+    """Run one backtest with `params` overriding the strategy config and return its stats."""
+    ctx = context.with_strategy_params(params)
+    trade_logger = TradeLogger()
+    engine = BacktestEngine(
+        strategy_class=StrategyRegistry.get(strategy_name),
+        data=data,
+        context=ctx,
+        trade_logger=trade_logger,
+        risk_checker=RiskChecker(ctx),
+        mode=mode
+    )
+    engine.run()
+    stats = compute_trade_stats(trade_logger.to_dataframe(), ctx.backtest_config['initial_capital'],
+                                engine.get_unrealized())
+    return {**params, **stats}
+
+
+def _run_in_worker(params):
+    return run_single(_worker["data"], _worker["context"], _worker["strategy_name"], params, _worker["mode"])
+
+
+class ParameterSweep:
+    """
+    Grid search over strategy parameters on a process pool.
+
+    The candle data is copied into shared memory once; every worker attaches
+    to it at start-up and then only rebuilds the strategy per parameter set.
+    Results come back as one table ranked by `rank_by`.
+    """
+
+    def __init__(self, strategy_name, data: pd.DataFrame, context, param_grid: dict,
+                 constraint=None, max_workers=None, mode="vectorized"):
+        """
+        Parameters:
+        - strategy_name (str): Name in StrategyRegistry
+        - data (pd.DataFrame): OHLCV candles shared by all runs
+        - context (BacktestContext): Base configs; the grid overrides strategy_config keys
+        - param_grid (dict): name -> list of values
+        - constraint (callable): Optional filter on parameter combinations
+        - max_workers (int): Process count, defaults to os.cpu_count()
+        - mode (str): BacktestEngine mode for each run
+        """
+        self.strategy_name = strategy_name
+        self.data = data
+        self.context = context
+        self.combos = expand_grid(param_grid, constraint)
+        self.max_workers = max_workers or os.cpu_count()
+        self.mode = mode
+
+    def run(self, rank_by="total_pnl", ascending=False) -> pd.DataFrame:
+        logger.info(f"Sweeping {len(self.combos)} parameter sets on {self.max_workers} workers...")
+        if not self.combos:
+            return pd.DataFrame()
+
+        with SharedCandles(self.data) as shared:
+            with ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(shared.spec, self.context, self.strategy_name, self.mode)
+            ) as pool:
+                chunksize = max(1, len(self.combos) // (self.max_workers * 4))
+                results = list(pool.map(_run_in_worker, self.combos, chunksize=chunksize))
+
+        df = pd.DataFrame(results).sort_values(by=rank_by, ascending=ascending).reset_index(drop=True)
+        df.index.name = "rank"
+        logger.info(f"Sweep finished, best {rank_by}: {df[rank_by].iloc[0]}")
+        return df
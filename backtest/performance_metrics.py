@@ -1,3 +1,5 @@
+import numpy as np
+
 
 def analyze_performance(trades_df, unrealized=None):
     if trades_df.empty and unrealized is None:
@@ -18,3 +20,29 @@ def analyze_performance(trades_df, unrealized=None):
         "Unrealized Position": unrealized if unrealized else "None"
     }
     return summary
+
+
+def compute_trade_stats(trades_df, initial_capital, unrealized=None):
+    """
+    Compact numeric statistics for ranking many backtests (parameter sweeps,
+    walk-forward windows).
+
+    Returns:
+    - dict: total_trades, total_pnl, return_pct, win_rate, max_drawdown_pct, final_equity
+    """
+    pnl = trades_df["pnl_dollar"].to_numpy(dtype=float) if not trades_df.empty else np.empty(0)
+    total_pnl = pnl.sum() + (unrealized['pnl_dollar'] if unrealized else 0.0)
+
+    # 按已平仓交易的权益曲线计算最大回撤
+    equity = initial_capital + np.concatenate([[0.0], np.cumsum(pnl)])
+    peak = np.maximum.accumulate(equity)
+    max_drawdown = float(((peak - equity) / peak).max())
+
+    return {
+        "total_trades": len(pnl),
+        "total_pnl": float(total_pnl),
+        "return_pct": float(total_pnl / initial_capital),
+        "win_rate": float((pnl > 0).mean()) if len(pnl) else 0.0,
+        "max_drawdown_pct": max_drawdown,
+        "final_equity": float(initial_capital + total_pnl),
+    }
@@ -0,0 +1,270 @@
+import heapq
+
+import numpy as np
+import pandas as pd
+from utils.logger import get_logger
+from backtest.vectorized_backtest import entry_arrays, find_exit
+
+logger = get_logger(__name__)
+
+
+def align_panel(frames: dict, fields=("open", "high", "low", "close", "volume")):
+    """
+    Align per-symbol K-line frames on one timestamp axis.
+
+    Parameters:
+    - frames (dict): symbol -> DataFrame indexed by timestamp
+
+    Returns:
+    - index (pd.DatetimeIndex): Union of all timestamps
+    - symbols (list): Column order of the panel
+    - panel (dict): field -> float64 array of shape (timestamps, symbols), NaN where a symbol has no bar
+    - positions (dict): symbol -> int array mapping each of its rows to a panel row
+    """
+    symbols = list(frames)
+    index = frames[symbols[0]].index if symbols else pd.DatetimeIndex([])
+    for s in symbols[1:]:
+        if not frames[s].index.equals(index):
+            index = index.union(frames[s].index)
+
+    panel = {f: np.full((len(index), len(symbols)), np.nan) for f in fields}
+    positions = {}
+    for k, s in enumerate(symbols):
+        df = frames[s]
+        rows = index.get_indexer(df.index)
+        positions[s] = rows
+        for f in fields:
+            if f in df:
+                panel[f][rows, k] = df[f].to_numpy(dtype=float)
+    return index, symbols, panel, positions
+
+
+class PortfolioBacktestEngine:
+    """
+    Backtest one strategy over many symbols at once with a shared equity pool.
+
+    Each symbol gets its own prepared strategy instance; their array-level
+    signals are laid out as a timestamp x symbol panel. The engine then walks
+    only the timestamps where something can happen: exits are resolved per
+    position with find_exit() at entry time and kept in a heap, entries on the
+    same bar are taken in descending score order and checked against the
+    book-level RiskChecker limits (open positions, gross exposure, daily loss,
+    drawdown).
+    """
+
+    def __init__(self, strategy_class, data: dict, context, trade_logger, risk_checker):
+        """
+        Parameters:
+        - strategy_class: BaseStrategy subclass
+        - data (dict): symbol -> OHLCV DataFrame
+        - context (BacktestContext): Shared configs for every symbol
+        """
+        self.ctx = context
+        self.trade_logger = trade_logger
+        self.risk_checker = risk_checker
+        self.frames = data
+        self.index, self.symbols, self.panel, self.positions = align_panel(data)
+
+        self.strategies = {}
+        for s, df in data.items():
+            strategy = strategy_class(df, config_path=None)
+            strategy.config = context.strategy_config
+            self.strategies[s] = strategy.prepare()
+
+        self.equity = context.backtest_config['initial_capital']
+        self.peak_equity = self.equity
+        self.daily_loss = 0.0
+        self.day_start_equity = self.equity
+        self.current_day = None
+        self.open_positions = {}
+        self.final_unrealized_positions = []
+
+        self.fee_pct = context.backtest_config.get('commission_pct', 0.001)
+        sizing = context.risk_config.get('position_size_mode', 'score_based')
+        if sizing == 'fixed':
+            self._position_pct = lambda score: context.risk_config.get('fixed_position_pct', 0.05)
+        else:
+            # score_based: 满分信号分到 1 / max_open_positions 的权益
+            self._position_pct = lambda score: score / max(1, risk_checker.max_open_positions)
+
+    def _entry_panel(self):
+        """Score and direction panels (timestamps x symbols), plus per-symbol signals and exit masks."""
+        shape = (len(self.index), len(self.symbols))
+        score = np.zeros(shape)
+        direction = np.zeros(shape, dtype=np.int8)
+        self._signals, self._exit_masks, self._close = {}, {}, {}
+        for k, s in enumerate(self.symbols):
+            strategy = self.strategies[s]
+            self._close[s] = self.frames[s]['close'].to_numpy(dtype=float)
+            signals, sc, d = entry_arrays(strategy)
+            rows = self.positions[s]
+            score[rows, k] = sc
+            direction[rows, k] = d
+            self._signals[s] = signals
+            exit_mask = strategy.exit_signals()
+            self._exit_masks[s] = None if exit_mask is None else np.asarray(exit_mask, dtype=bool)
+        return score, direction
+
+    def _new_day(self, time):
+        day = time.date()
+        if self.current_day != day:
+            self.current_day = day
+            self.daily_loss = 0.0
+            self.day_start_equity = self.equity
+
+    def _book(self):
+        return {
+            'equity': self.equity,
+            'peak_equity': self.peak_equity,
+            'day_start_equity': self.day_start_equity,
+            'daily_loss': self.daily_loss,
+            'open_positions': len(self.open_positions),
+            'gross_exposure': sum(p['capital'] for p in self.open_positions.values()),
+        }
+
+    def run(self):
+        logger.info(f"Starting portfolio backtest over {len(self.symbols)} symbols, {len(self.index)} bars...")
+        score, direction = self._entry_panel()
+        t_idx, s_idx = np.nonzero((score > 0) & (direction != 0))
+        # 同一根 K 线上按分数从高到低开仓
+        order = np.lexsort((-score[t_idx, s_idx], t_idx))
+        t_idx, s_idx = t_idx[order], s_idx[order]
+        bounds = np.flatnonzero(np.diff(t_idx)) + 1
+
+        exits = []  # heap of (panel row, symbol column)
+        for group in np.split(np.arange(len(t_idx)), bounds):
+            if not len(group):
+                continue
+            t = int(t_idx[group[0]])
+            # 先处理在此之前（含当根）到期的平仓，释放权益与仓位
+            while exits and exits[0][0] <= t:
+                self._exit_trade(*heapq.heappop(exits))
+            self._new_day(self.index[t])
+
+            for c in s_idx[group]:
+                c = int(c)
+                symbol = self.symbols[c]
+                if symbol in self.open_positions:
+                    continue
+                capital = self.equity * self._position_pct(score[t, c])
+                if self.risk_checker.block_portfolio_entry(capital, self._book()):
+                    if len(self.open_positions) >= self.risk_checker.max_open_positions:
+                        break
+                    continue
+                exit_row = self._enter_trade(t, c, capital, 'long' if direction[t, c] > 0 else 'short')
+                if exit_row is not None:
+                    heapq.heappush(exits, (exit_row, c))
+
+        while exits:
+            self._exit_trade(*heapq.heappop(exits))
+        self._record_unrealized()
+        logger.info(f"Portfolio backtest completed. Final equity: {self.equity:.2f}")
+
+    def _enter_trade(self, t, c, capital, direction):
+        """Open a position and resolve its exit right away; returns the exit panel row or None."""
+        symbol = self.symbols[c]
+        rows = self.positions[symbol]
+        i = int(np.searchsorted(rows, t))  # 该币种自身数据中的行号
+        close = self._close[symbol]
+        price = close[i]
+        j, reason = find_exit(self.strategies[symbol], close, i + 1, price, direction, self._exit_masks[symbol])
+        self.open_positions[symbol] = {
+            'symbol': symbol,
+            'entry_time': self.index[t],
+            'entry_price': price,
+            'capital': capital,
+            'qty': capital / price,
+            'signal': self._signals[symbol][i],
+            'direction': direction,
+            'exit_index': j,
+            'exit_reason': reason,
+        }
+        logger.debug(f"Entered trade: {self.open_positions[symbol]}")
+        return None if j is None else int(rows[j])
+
+    def _exit_trade(self, t, c):
+        symbol = self.symbols[c]
+        position = self.open_positions.pop(symbol)
+        time = self.index[t]
+        self._new_day(time)
+        price = self.panel['close'][t, c]
+        net_pnl = self._net_pnl(position, price)
+
+        self.equity += net_pnl
+        self.peak_equity = max(self.peak_equity, self.equity)
+        self.daily_loss += max(-net_pnl, 0)
+
+        trade_record = {
+            'symbol': symbol,
+            'entry_time': position['entry_time'],
+            'exit_time': time,
+            'entry_price': position['entry_price'],
+            'exit_price': price,
+            'qty': position['qty'],
+            'capital': position['capital'],
+            'direction': position['direction'],
+            'pnl_pct': net_pnl / position['capital'],
+            'pnl_dollar': net_pnl,
+            'signal': position['signal'],
+            'exit_reason': position['exit_reason']
+        }
+        self.trade_logger.record(trade_record)
+        logger.debug(f"Exited trade: {trade_record}")
+
+    def _net_pnl(self, position, price):
+        entry_price, qty = position['entry_price'], position['qty']
+        gross_return = (price - entry_price) if position['direction'] == 'long' else (entry_price - price)
+        fee_dollar = self.fee_pct * (entry_price + price) / 2 * qty
+        return gross_return * qty - fee_dollar
+
+    def _record_unrealized(self):
+        self.final_unrealized_positions = []
+        for symbol, position in self.open_positions.items():
+            final_price = self.frames[symbol]['close'].iloc[-1]
+            net_pnl = self._net_pnl(position, final_price)
+            self.final_unrealized_positions.append({
+                'symbol': symbol,
+                'entry_time': position['entry_time'],
+                'entry_price': position['entry_price'],
+                'current_price': final_price,
+                'qty': position['qty'],
+                'capital': position['capital'],
+                'direction': position['direction'],
+                'pnl_dollar': net_pnl,
+                'pnl_pct': net_pnl / position['capital']
+            })
+        if self.final_unrealized_positions:
+            logger.info(f"[Unrealized] {len(self.final_unrealized_positions)} positions open at end")
+
+    def get_unrealized(self):
+        """
+        Open positions at the end, combined into one record so the result can go
+        straight into analyze_performance() / compute_trade_stats().
+        """
+        if not self.final_unrealized_positions:
+            return None
+        capital = sum(p['capital'] for p in self.final_unrealized_positions)
+        pnl = sum(p['pnl_dollar'] for p in self.final_unrealized_positions)
+        return {'positions': self.final_unrealized_positions, 'capital': capital,
+                'pnl_dollar': pnl, 'pnl_pct': pnl / capital}
+
+    def equity_curve(self) -> pd.Series:
+        """
+        Mark-to-market equity per panel timestamp: realized PnL of closed trades
+        plus the floating PnL of open positions (fees only on close).
+        """
+        trades = self.trade_logger.to_dataframe()
+        curve = np.zeros(len(self.index))
+        close = self.panel['close']
+        col = {s: k for k, s in enumerate(self.symbols)}
+        records = trades.to_dict('records') if not trades.empty else []
+        for p in records + self.final_unrealized_positions:
+            c = col[p['symbol']]
+            start = self.index.get_loc(p['entry_time'])
+            end = self.index.get_loc(p['exit_time']) if 'exit_time' in p else len(self.index)
+            sign = 1.0 if p['direction'] == 'long' else -1.0
+            prices = pd.Series(close[start:end, c]).ffill().to_numpy()
+            curve[start:end] += sign * (prices - p['entry_price']) * p['qty']
+            if 'exit_time' in p:
+                curve[end:] += p['pnl_dollar']
+        return pd.Series(self.ctx.backtest_config['initial_capital'] + curve, index=self.index, name='equity')
@@ -0,0 +1,72 @@
+import numpy as np
+
+DIRECTION_CODES = {'long': 1, 'short': -1}
+
+
+def entry_arrays(strategy):
+    """
+    Evaluate a strategy's entry side for all bars at once.
+
+    entry_score()/entry_direction() are called once per distinct signal value
+    and broadcast, so the result matches calling them bar by bar.
+
+    Returns:
+    - signals (np.ndarray): object array of signal strings / None
+    - score (np.ndarray): float64 position score per bar
+    - direction (np.ndarray): int8, 1 = long, -1 = short, 0 = no entry
+    """
+    signals = np.asarray(strategy.entry_signals(), dtype=object)
+    score = np.zeros(len(signals), dtype=float)
+    direction = np.zeros(len(signals), dtype=np.int8)
+    for signal in set(signals.tolist()):
+        mask = signals == signal
+        score[mask] = strategy.entry_score(signal)
+        direction[mask] = DIRECTION_CODES.get(strategy.entry_direction(signal), 0)
+    return signals, score, direction
+
+
+def find_exit(strategy, close, start, entry_price, direction, exit_mask=None, chunk=256):
+    """
+    Find the first bar >= start where the open position exits, using the same
+    precedence as the loop engine: take_profit, then stop_loss, then exit_signal.
+
+    Bars are scanned in geometrically growing chunks so a trade held for k bars
+    costs O(k) array work and a handful of Python calls.
+
+    Parameters:
+    - close (np.ndarray): Close prices
+    - start (int): First bar to check (the bar after entry)
+    - direction (str): 'long' or 'short'
+    - exit_mask (np.ndarray): Precomputed strategy.exit_signals(), or None to ask
+      exit_signal(index, entry_price) per bar
+
+    Returns:
+    - (int, str): Exit bar and reason, or (None, None) if the position is still open at the end
+    """
+    n = len(close)
+    while start < n:
+        end = min(n, start + chunk)
+        prices = close[start:end]
+        if direction == 'long':
+            tp = strategy.take_profit_array(entry_price, prices)
+            sl = strategy.stop_loss_array(entry_price, prices)
+        else:
+            # 与循环引擎一致：做空时参数顺序互换
+            tp = strategy.take_profit_array(prices, entry_price)
+            sl = strategy.stop_loss_array(prices, entry_price)
+        if exit_mask is not None:
+            ex = exit_mask[start:end]
+        else:
+            ex = np.array([bool(strategy.exit_signal(j, entry_price)) for j in range(start, end)], dtype=bool)
+
+        hit = tp | sl | ex
+        if hit.any():
+            k = int(hit.argmax())
+            if tp[k]:
+                return start + k, 'take_profit'
+            if sl[k]:
+                return start + k, 'stop_loss'
+            return start + k, 'exit_signal'
+        start = end
+        chunk *= 2
+    return None, None
@@ -0,0 +1,189 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from backtest.backtest_engine import BacktestEngine
+from backtest.param_sweep import SharedCandles, expand_grid
+from backtest.performance_metrics import compute_trade_stats
+from core.strategy_loader import load_all_strategies
+from core.strategy_registry import StrategyRegistry
+from execution.trade_logger import TradeLogger
+from risk_management.risk_checker import RiskChecker
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def rolling_windows(n, in_sample, out_sample, step=None, anchored=False):
+    """
+    Split n bars into walk-forward windows.
+
+    Parameters:
+    - in_sample (int): Bars used to pick parameters
+    - out_sample (int): Bars evaluated with the picked parameters
+    - step (int): Shift between windows, defaults to out_sample (back-to-back OOS periods)
+    - anchored (bool): Keep the in-sample start at bar 0 (expanding window)
+
+    Returns:
+    - list: (is_start, is_end, oos_start, oos_end) bar positions, ends exclusive
+    """
+    step = step or out_sample
+    windows = []
+    start = 0
+    while start + in_sample + out_sample <= n:
+        is_end = start + in_sample
+        windows.append((0 if anchored else start, is_end, is_end, is_end + out_sample))
+        start += step
+    return windows
+
+
+class PreparedStrategies:
+    """
+    One prepared strategy per parameter set over the full history.
+
+    Indicators are computed once per parameter set and every window reuses
+    them through strategy.window(), instead of re-preparing per window.
+    """
+
+    def __init__(self, strategy_name, data, context):
+        self.strategy_cls = StrategyRegistry.get(strategy_name)
+        self.data = data
+        self.context = context
+        self._cache = {}
+
+    def get(self, params: dict):
+        key = tuple(sorted(params.items()))
+        if key not in self._cache:
+            ctx = self.context.with_strategy_params(params)
+            strategy = self.strategy_cls(self.data, config_path=None)
+            strategy.config = ctx.strategy_config
+            self._cache[key] = (strategy.prepare(), ctx)
+        return self._cache[key]
+
+
+def backtest_window(prepared: PreparedStrategies, params, start, stop, mode="vectorized"):
+    """
+    Backtest one parameter set on bars [start, stop).
+
+    Returns:
+    - (dict, pd.DataFrame): compute_trade_stats() result and the trades
+    """
+    strategy, ctx = prepared.get(params)
+    view = strategy.window(start, stop)
+    trade_logger = TradeLogger()
+    engine = BacktestEngine(None, view.data, ctx, trade_logger, RiskChecker(ctx), mode=mode, strategy=view)
+    engine.run()
+    trades = trade_logger.to_dataframe()
+    return compute_trade_stats(trades, ctx.backtest_config['initial_capital'], engine.get_unrealized()), trades
+
+
+def evaluate_window(prepared: PreparedStrategies, combos, window, rank_by="total_pnl", mode="vectorized"):
+    """Optimize on the in-sample part of `window` and test the winner out-of-sample."""
+    is_start, is_end, oos_start, oos_end = window
+    best_params, best_stats = None, None
+    for params in combos:
+        stats, _ = backtest_window(prepared, params, is_start, is_end, mode)
+        if best_stats is None or stats[rank_by] > best_stats[rank_by]:
+            best_params, best_stats = params, stats
+
+    oos_stats, oos_trades = backtest_window(prepared, best_params, oos_start, oos_end, mode)
+    index = prepared.data.index
+    row = {
+        'is_start': index[is_start],
+        'is_end': index[is_end - 1],
+        'oos_start': index[oos_start],
+        'oos_end': index[oos_end - 1],
+        **best_params,
+        **{f'is_{k}': v for k, v in best_stats.items()},
+        **{f'oos_{k}': v for k, v in oos_stats.items()},
+    }
+    return row, oos_trades
+
+
+# === Worker side ===
+# 每个进程挂载一次共享K线，并在处理多个窗口时复用同一组已计算指标的策略
+
+_worker = {}
+
+
+def _init_worker(spec, context, strategy_name, combos, rank_by, mode):
+    logging.getLogger().setLevel(logging.WARNING)
+    load_all_strategies()
+    data, handles = SharedCandles.attach(spec)
+    _worker.update(prepared=PreparedStrategies(strategy_name, data, context), handles=handles,
+                   combos=combos, rank_by=rank_by, mode=mode)
+
+
+def _evaluate_in_worker(window):
+    return evaluate_window(_worker["prepared"], _worker["combos"], window, _worker["rank_by"], _worker["mode"])
+
+
+class WalkForward:
+    """
+    Walk-forward analysis: for each rolling window, pick the best parameter
+    set in-sample and record how it does on the following out-of-sample bars.
+
+    Windows run in parallel on a process pool. Candles are shared through
+    SharedCandles, and each worker prepares a strategy once per parameter
+    set and reuses it for every window it handles.
+    """
+
+    def __init__(self, strategy_name, data: pd.DataFrame, context, param_grid: dict,
+                 in_sample, out_sample, step=None, anchored=False,
+                 constraint=None, max_workers=None, mode="vectorized"):
+        """
+        Parameters:
+        - strategy_name (str): Name in StrategyRegistry
+        - data (pd.DataFrame): Full OHLCV history
+        - context (BacktestContext): Base configs; the grid overrides strategy_config keys
+        - param_grid (dict): name -> list of values searched in-sample
+        - in_sample / out_sample / step / anchored: see rolling_windows()
+        - max_workers (int): Process count, defaults to min(windows, os.cpu_count()); 1 runs inline
+        """
+        self.strategy_name = strategy_name
+        self.data = data
+        self.context = context
+        self.combos = expand_grid(param_grid, constraint)
+        self.windows = rolling_windows(len(data), in_sample, out_sample, step, anchored)
+        self.max_workers = max_workers or min(len(self.windows), os.cpu_count()) or 1
+        self.mode = mode
+        self.oos_trades = pd.DataFrame()
+
+    def run(self, rank_by="total_pnl") -> pd.DataFrame:
+        """
+        Returns:
+        - pd.DataFrame: One row per window with its dates, chosen parameters,
+          in-sample stats (is_*) and out-of-sample stats (oos_*).
+          Stitched out-of-sample trades are kept in self.oos_trades.
+        """
+        logger.info(f"Walk-forward: {len(self.windows)} windows x {len(self.combos)} parameter sets "
+                    f"on {self.max_workers} workers...")
+        if not self.windows or not self.combos:
+            return pd.DataFrame()
+
+        if self.max_workers == 1:
+            prepared = PreparedStrategies(self.strategy_name, self.data, self.context)
+            results = [evaluate_window(prepared, self.combos, w, rank_by, self.mode) for w in self.windows]
+        else:
+            with SharedCandles(self.data) as shared:
+                with ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker,
+                    initargs=(shared.spec, self.context, self.strategy_name, self.combos, rank_by, self.mode)
+                ) as pool:
+                    # 连续窗口分给同一进程，尽量命中该进程已准备好的策略
+                    chunksize = max(1, len(self.windows) // self.max_workers)
+                    results = list(pool.map(_evaluate_in_worker, self.windows, chunksize=chunksize))
+
+        rows = [row for row, _ in results]
+        trades = [t for _, t in results if not t.empty]
+        self.oos_trades = pd.concat(trades, ignore_index=True) if trades else pd.DataFrame()
+        df = pd.DataFrame(rows)
+        logger.info(f"Walk-forward finished, total out-of-sample PnL: {df['oos_total_pnl'].sum():.2f}")
+        return df
+
+    def summary(self) -> dict:
+        """compute_trade_stats() over the stitched out-of-sample trades."""
+        return compute_trade_stats(self.oos_trades, self.context.backtest_config['initial_capital'])
@@ -0,0 +1,4 @@
+# 放在仓库根目录，让 pytest 把根目录加入 sys.path，测试可直接 import data / backtest 等包
+
+# 手动运行的脚本：导入时就会请求交易所接口 / 写数据库，不作为测试收集
+collect_ignore = ["test.py", "database/test_db.py"]
@@ -1,3 +1,4 @@
+import copy
 from utils.config_loader import ConfigLoader
 
 class BacktestContext:
@@ -17,6 +18,15 @@ class BacktestContext:
         self.backtest_config = ConfigLoader.load(backtest_config_path)
         self.risk_config = ConfigLoader.load(risk_config_path)
 
+    def with_strategy_params(self, params: dict) -> "BacktestContext":
+        """
+        Return a copy of this context whose strategy config is overridden by `params`
+        (used by parameter sweeps; the original context is left untouched).
+        """
+        ctx = copy.copy(self)
+        ctx.strategy_config = {**self.strategy_config, **params}
+        return ctx
+
     def __repr__(self):
         return (
             f"<BacktestContext: "
@@ -0,0 +1,280 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# === Triggers ===
+# 所有时间均为 UTC；next_fire(after) 返回严格晚于 after 的下一次触发时间
+
+class IntervalTrigger:
+    """Fire every `seconds`, aligned to multiples of the interval since the epoch plus `offset`."""
+
+    def __init__(self, seconds, offset=0):
+        self.seconds = seconds
+        self.offset = offset
+
+    def next_fire(self, after: datetime) -> datetime:
+        t = after.timestamp() - self.offset
+        k = int(t // self.seconds) + 1
+        return datetime.fromtimestamp(k * self.seconds + self.offset, tz=timezone.utc)
+
+    def __repr__(self):
+        return f"every {self.seconds}s"
+
+
+class BarCloseTrigger(IntervalTrigger):
+    """
+    Fire when a candle of `bar` closes ('1m', '15m', '1H', '4H', '1D'), plus
+    `delay` seconds so the exchange has published the closed bar.
+    """
+
+    UNIT_SECONDS = {"m": 60, "H": 3600, "D": 86400}
+
+    def __init__(self, bar="1H", delay=10):
+        self.bar = bar
+        super().__init__(int(bar[:-1]) * self.UNIT_SECONDS[bar[-1]], offset=delay)
+
+    def __repr__(self):
+        return f"{self.bar} close +{self.offset}s"
+
+
+class CronTrigger:
+    """
+    Standard 5-field cron expression (minute hour day-of-month month day-of-week),
+    supporting '*', 'a-b', 'a,b', '*/n' and 'a-b/n'. Day-of-week 0 or 7 is Sunday.
+    As in cron, if both day fields are restricted a day matching either one fires.
+    """
+
+    RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, dow = (
+            self._parse(f, lo, hi) for f, (lo, hi) in zip(fields, self.RANGES)
+        )
+        self.weekdays = {d % 7 for d in dow}
+        self.day_restricted = fields[2] != "*"
+        self.weekday_restricted = fields[4] != "*"
+
+    @staticmethod
+    def _parse(field, lo, hi) -> set:
+        values = set()
+        for part in field.split(","):
+            rng, _, step = part.partition("/")
+            if rng == "*":
+                start, stop = lo, hi
+            elif "-" in rng:
+                start, stop = (int(x) for x in rng.split("-"))
+            else:
+                start = stop = int(rng)
+                if step:
+                    stop = hi
+            if not (lo <= start <= stop <= hi):
+                raise ValueError(f"Cron field out of range: {field!r}")
+            values.update(range(start, stop + 1, int(step) if step else 1))
+        return values
+
+    def _day_matches(self, t: datetime) -> bool:
+        dom = t.day in self.days
+        dow = (t.weekday() + 1) % 7 in self.weekdays  # cron: 0 = 周日
+        if self.day_restricted and self.weekday_restricted:
+            return dom or dow
+        return dom and dow
+
+    def next_fire(self, after: datetime) -> datetime:
+        t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # 逐级跳过不匹配的月 / 日 / 时 / 分，最多看 5 年
+        limit = t + timedelta(days=5 * 366)
+        while t < limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"Cron expression never fires: {self.expression!r}")
+
+    def __repr__(self):
+        return f"cron '{self.expression}'"
+
+
+def trigger_from_config(spec: dict):
+    """
+    Build a trigger from a config entry:
+    {cron: '0 3 * * *'}, {interval: 300, offset: 0} or {bar_close: '1H', delay: 30}.
+    """
+    if "cron" in spec:
+        return CronTrigger(spec["cron"])
+    if "bar_close" in spec:
+        return BarCloseTrigger(spec["bar_close"], spec.get("delay", 10))
+    if "interval" in spec:
+        return IntervalTrigger(spec["interval"], spec.get("offset", 0))
+    raise ValueError(f"Unknown trigger: {spec}")
+
+
+# === Jobs ===
+
+class Job:
+    def __init__(self, name, func, trigger, kwargs=None):
+        self.name = name
+        self.func = func
+        self.trigger = trigger
+        self.kwargs = kwargs or {}
+        self.next_run = None
+        self.future = None
+        # 运行指标
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = None
+        self.last_start = None
+        self.last_error = None
+
+    @property
+    def running(self) -> bool:
+        return self.future is not None and not self.future.done()
+
+    def metrics(self) -> dict:
+        return {
+            'job': self.name,
+            'trigger': repr(self.trigger),
+            'runs': self.runs,
+            'failures': self.failures,
+            'skipped': self.skipped,
+            'running': self.running,
+            'last_start': self.last_start,
+            'last_seconds': self.last_seconds,
+            'mean_seconds': self.total_seconds / self.runs if self.runs else None,
+            'max_seconds': self.max_seconds if self.runs else None,
+            'next_run': self.next_run,
+            'last_error': self.last_error,
+        }
+
+
+class Scheduler:
+    """
+    Long-running in-process job scheduler.
+
+    Jobs run on a shared thread pool inside one Python process, so they reuse
+    already-imported modules, exchange clients, rate limiters, DB connection
+    pools and indicator caches instead of cold-starting per run. A job whose
+    previous run is still going is skipped for that firing (and counted).
+    Missed firings while the process was busy are coalesced into one.
+    """
+
+    def __init__(self, max_workers=4, clock=None):
+        """
+        Parameters:
+        - max_workers (int): Jobs allowed to run at the same time
+        - clock (callable): () -> aware UTC datetime, defaults to the system clock
+        """
+        self.jobs = {}
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.clock = clock or (lambda: datetime.now(timezone.utc))
+        self._resources = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def resource(self, name, factory):
+        """Shared object (client, fetcher, cache) created once on first use and reused by every job."""
+        with self._lock:
+            if name not in self._resources:
+                self._resources[name] = factory()
+            return self._resources[name]
+
+    def add_job(self, name, func, trigger, **kwargs) -> Job:
+        job = Job(name, func, trigger, kwargs)
+        job.next_run = trigger.next_fire(self.clock())
+        self.jobs[name] = job
+        logger.info(f"[Scheduler] Added job '{name}' ({trigger!r}), next run {job.next_run:%Y-%m-%d %H:%M:%S} UTC")
+        return job
+
+    def _execute(self, job):
+        start = time.perf_counter()
+        try:
+            job.func(**job.kwargs)
+        except Exception as e:
+            with self._lock:
+                job.failures += 1
+                job.last_error = f"{e.__class__.__name__}: {e}"
+            logger.exception(f"[Scheduler] Job '{job.name}' failed")
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                job.runs += 1
+                job.last_seconds = elapsed
+                job.total_seconds += elapsed
+                job.max_seconds = max(job.max_seconds, elapsed)
+            logger.info(f"[Scheduler] Job '{job.name}' finished in {elapsed:.2f}s")
+
+    def fire(self, name) -> bool:
+        """Start a job now (e.g. from a live-feed event); returns False if it was skipped."""
+        job = self.jobs[name]
+        with self._lock:
+            if job.running:
+                job.skipped += 1
+                logger.warning(f"[Scheduler] Job '{name}' still running, skipped this run")
+                return False
+            job.last_start = self.clock()
+            job.future = self.pool.submit(self._execute, job)
+        return True
+
+    def run_pending(self, now=None):
+        """Fire every job that is due at `now` and schedule its next run."""
+        now = now or self.clock()
+        for job in list(self.jobs.values()):
+            if job.next_run <= now:
+                self.fire(job.name)
+                job.next_run = job.trigger.next_fire(now)
+
+    def run_forever(self, metrics_interval=None):
+        """Block and run jobs until stop(); logs the metrics table every `metrics_interval` seconds."""
+        self._stop.clear()
+        next_report = time.monotonic() + metrics_interval if metrics_interval else None
+        logger.info(f"[Scheduler] Running {len(self.jobs)} jobs")
+        try:
+            while not self._stop.is_set():
+                self.run_pending()
+                if next_report is not None and time.monotonic() >= next_report:
+                    logger.info("[Scheduler] Job metrics:\n" + self.metrics().to_string())
+                    next_report += metrics_interval
+                upcoming = min((j.next_run for j in self.jobs.values()), default=None)
+                wait = 60 if upcoming is None else (upcoming - self.clock()).total_seconds()
+                self._stop.wait(min(max(wait, 0.0), 60))
+        finally:
+            self.pool.shutdown(wait=True)
+
+    def start(self, metrics_interval=None):
+        """Run the scheduler loop on a background thread."""
+        self._thread = threading.Thread(target=self.run_forever, args=(metrics_interval,),
+                                        name="scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, wait=True):
+        self._stop.set()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    def metrics(self) -> pd.DataFrame:
+        """One row per job: runs, failures, skipped, timing (last / mean / max seconds), next run."""
+        with self._lock:
+            rows = [job.metrics() for job in self.jobs.values()]
+        return pd.DataFrame(rows).set_index('job') if rows else pd.DataFrame()
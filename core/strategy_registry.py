@@ -20,6 +20,16 @@ class StrategyRegistry:
             raise KeyError(f"Strategy '{name}' not found in registry.")
         return cls._registry[name]
 
+    @classmethod
+    def build(cls, name: str, data, config: dict) -> BaseStrategy:
+        """
+        Instantiate a registered strategy with the given config and run its
+        prepare phase, so indicators are computed once up front.
+        """
+        strategy = cls.get(name)(data, config_path=None)
+        strategy.config = config
+        return strategy.prepare()
+
     @classmethod
     def list_strategies(cls):
         return list(cls._registry.keys())
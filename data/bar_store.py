@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+
+BAR_FIELDS = ["open", "high", "low", "close", "volume"]
+
+
+class BarBuffer:
+    """
+    Fixed-capacity OHLCV buffer for one symbol in contiguous arrays.
+
+    Timestamps (int64 ns) and the five price/volume fields (one float64 row
+    per field) are preallocated with `slack` spare rows. Appends write past
+    the end; when the spare rows run out the last `capacity` bars are copied
+    into freshly allocated arrays once, so appends are amortized O(1) and the
+    live bars always sit in one contiguous slice. Readers get read-only views
+    of that slice (no copies). Rows a view covers are never written again,
+    so views and frames handed out earlier keep showing the same bars.
+    """
+
+    def __init__(self, capacity=5000, slack=None):
+        """
+        Parameters:
+        - capacity (int): Bars kept; older bars are dropped
+        - slack (int): Spare rows between compactions, defaults to capacity // 4
+        """
+        self.capacity = capacity
+        self.slack = max(1, capacity // 4 if slack is None else slack)
+        size = capacity + self.slack
+        self._ts = np.empty(size, dtype=np.int64)
+        self._values = np.empty((len(BAR_FIELDS), size), dtype=np.float64)
+        self._start = 0
+        self._end = 0
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the buffer, fixed at construction."""
+        return self._ts.nbytes + self._values.nbytes
+
+    def __len__(self):
+        return self._end - self._start
+
+    def _make_room(self, k):
+        if self._end + k <= len(self._ts):
+            return
+        # 空间用完：把最后 capacity - k 根复制到新数组开头；
+        # 旧数组不再写入，之前交出去的视图 / DataFrame 不会被改写
+        keep = min(len(self), self.capacity - k)
+        src = slice(self._end - keep, self._end)
+        ts = np.empty_like(self._ts)
+        values = np.empty_like(self._values)
+        ts[:keep] = self._ts[src]
+        values[:, :keep] = self._values[:, src]
+        self._ts, self._values = ts, values
+        self._start, self._end = 0, keep
+
+    def append(self, timestamp, open_, high, low, close, volume):
+        """Add one bar (timestamp as pd.Timestamp / datetime64 / int ns)."""
+        self._make_room(1)
+        i = self._end
+        self._ts[i] = pd.Timestamp(timestamp).value if not isinstance(timestamp, (int, np.integer)) else timestamp
+        self._values[:, i] = (open_, high, low, close, volume)
+        self._end += 1
+        if len(self) > self.capacity:
+            self._start += 1
+
+    def append_bar(self, bar: dict):
+        self.append(bar["timestamp"], *(bar[f] for f in BAR_FIELDS))
+
+    def extend(self, df: pd.DataFrame):
+        """Append the rows of a timestamp-indexed OHLCV frame (only the last `capacity` are kept)."""
+        df = df.iloc[-self.capacity:]
+        k = len(df)
+        if k == 0:
+            return
+        self._make_room(k)
+        i = self._end
+        self._ts[i:i + k] = pd.DatetimeIndex(df.index).as_unit("ns").asi8
+        self._values[:, i:i + k] = df[BAR_FIELDS].to_numpy(dtype=np.float64).T
+        self._end += k
+        self._start = max(self._start, self._end - self.capacity)
+
+    def _view(self, arr, n=None):
+        start = self._start if n is None else max(self._start, self._end - n)
+        view = arr[..., start:self._end]
+        view.flags.writeable = False
+        return view
+
+    def timestamps(self, n=None) -> np.ndarray:
+        """Read-only int64 ns timestamps of the last n bars (all if None)."""
+        return self._view(self._ts, n)
+
+    def column(self, field, n=None) -> np.ndarray:
+        """Read-only view of one field ('open' ... 'volume') over the last n bars."""
+        return self._view(self._values[BAR_FIELDS.index(field)], n)
+
+    def values(self, n=None) -> np.ndarray:
+        """Read-only (5, n) view: one row per field in BAR_FIELDS order."""
+        return self._view(self._values, n)
+
+    def last_timestamp(self):
+        return pd.Timestamp(self._ts[self._end - 1]) if len(self) else None
+
+    def to_frame(self, n=None) -> pd.DataFrame:
+        """
+        DataFrame over the last n bars backed by the buffer's arrays (no copy
+        of the bar data). Treat it as read-only: add columns, don't write into
+        the OHLCV ones.
+        """
+        index = pd.DatetimeIndex(self.timestamps(n), name="timestamp")
+        return pd.DataFrame(dict(zip(BAR_FIELDS, self.values(n))), index=index, copy=False)
+
+
+class BarStore:
+    """
+    Per-symbol BarBuffers with one shared capacity, so memory is
+    symbols x (capacity + slack) x 48 bytes regardless of how bars arrive.
+    """
+
+    def __init__(self, capacity=5000, slack=None, bar=None, exchange=None):
+        self.capacity = capacity
+        self.slack = slack
+        self.bar = bar
+        self.exchange = exchange
+        self.buffers = {}
+
+    def buffer(self, symbol) -> BarBuffer:
+        if symbol not in self.buffers:
+            self.buffers[symbol] = BarBuffer(self.capacity, self.slack)
+        return self.buffers[symbol]
+
+    def append(self, symbol, bar: dict):
+        self.buffer(symbol).append_bar(bar)
+
+    def extend(self, symbol, df: pd.DataFrame):
+        """Append the rows of df newer than the symbol's last stored bar."""
+        last = self.last_timestamp(symbol)
+        if last is not None:
+            df = df[df.index > last]
+        self.buffer(symbol).extend(df)
+
+    @classmethod
+    def from_frames(cls, frames: dict, capacity=None, **kwargs) -> "BarStore":
+        capacity = capacity or max((len(df) for df in frames.values()), default=1)
+        store = cls(capacity, **kwargs)
+        for symbol, df in frames.items():
+            store.extend(symbol, df)
+        return store
+
+    def last_timestamp(self, symbol):
+        buf = self.buffers.get(symbol)
+        return buf.last_timestamp() if buf is not None else None
+
+    def to_frame(self, symbol, n=None) -> pd.DataFrame:
+        """Zero-copy DataFrame facade, tagged with exchange / symbol / bar for the indicator cache."""
+        buf = self.buffers.get(symbol)
+        df = buf.to_frame(n) if buf is not None else pd.DataFrame(columns=BAR_FIELDS)
+        df.attrs.update(exchange=self.exchange, symbol=symbol, bar=self.bar)
+        return df
+
+    def frames(self, n=None) -> dict:
+        return {s: self.to_frame(s, n) for s in self.buffers}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(buf.nbytes for buf in self.buffers.values())
+
+    def symbols(self) -> list:
+        return list(self.buffers)
+
+    def __len__(self):
+        return len(self.buffers)
+
+    def __contains__(self, symbol):
+        return symbol in self.buffers
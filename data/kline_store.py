@@ -0,0 +1,181 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+
+KLINE_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+class KlineStore:
+    """
+    Local columnar K-line store keyed by (exchange, symbol, bar).
+
+    Every key is a directory with one raw little-endian file per column
+    (timestamp as int64 milliseconds, OHLCV as float64), so appending new
+    candles is a plain file append and reading the last N bars only touches
+    the tail of each column file. Reads can be memory-mapped.
+
+    Layout: <root>/<exchange>/<bar>/<symbol>/<column>.bin
+    """
+
+    COLUMN_DTYPES = {
+        "timestamp": np.dtype("<i8"),
+        "open": np.dtype("<f8"),
+        "high": np.dtype("<f8"),
+        "low": np.dtype("<f8"),
+        "close": np.dtype("<f8"),
+        "volume": np.dtype("<f8"),
+    }
+
+    def __init__(self, root: str = None):
+        """
+        Parameters:
+        - root (str): Storage directory, defaults to data/kline_cache next to this file
+        """
+        if root is None:
+            root = os.path.join(os.path.dirname(__file__), "kline_cache")
+        self.root = root
+
+    @staticmethod
+    def _bar_key(bar):
+        # '1m' 和 '1M' 在 Windows 上大小写不敏感，需要区分开
+        return "".join(c.lower() + "_" if c.isupper() else c for c in bar)
+
+    def _key_dir(self, exchange, symbol, bar):
+        safe_symbol = re.sub(r"[^A-Za-z0-9_.-]", "_", symbol)
+        return os.path.join(self.root, exchange.lower(), self._bar_key(bar), safe_symbol)
+
+    def _column_path(self, key_dir, column):
+        return os.path.join(key_dir, f"{column}.bin")
+
+    def count(self, exchange, symbol, bar) -> int:
+        """Number of complete rows stored for the key."""
+        key_dir = self._key_dir(exchange, symbol, bar)
+        if not os.path.isdir(key_dir):
+            return 0
+        rows = []
+        for col, dtype in self.COLUMN_DTYPES.items():
+            path = self._column_path(key_dir, col)
+            if not os.path.exists(path):
+                return 0
+            rows.append(os.path.getsize(path) // dtype.itemsize)
+        # 写入中断时以最短的列为准
+        return min(rows)
+
+    def symbols(self, exchange, bar) -> list:
+        """List symbols that have data stored for (exchange, bar)."""
+        bar_dir = os.path.join(self.root, exchange.lower(), self._bar_key(bar))
+        if not os.path.isdir(bar_dir):
+            return []
+        return sorted(os.listdir(bar_dir))
+
+    def _read_column(self, key_dir, column, start, stop, mmap=False):
+        dtype = self.COLUMN_DTYPES[column]
+        path = self._column_path(key_dir, column)
+        if stop <= start:
+            return np.empty(0, dtype=dtype)
+        if mmap:
+            return np.memmap(path, dtype=dtype, mode="r", offset=start * dtype.itemsize, shape=(stop - start,))
+        return np.fromfile(path, dtype=dtype, count=stop - start, offset=start * dtype.itemsize)
+
+    def last_timestamp(self, exchange, symbol, bar):
+        """
+        Timestamp (ms) of the newest stored candle, or None if nothing is stored.
+        """
+        n = self.count(exchange, symbol, bar)
+        if n == 0:
+            return None
+        key_dir = self._key_dir(exchange, symbol, bar)
+        return int(self._read_column(key_dir, "timestamp", n - 1, n)[0])
+
+    def read_arrays(self, exchange, symbol, bar, total=None, start=None, end=None, mmap=False) -> dict:
+        """
+        Read stored columns as NumPy arrays.
+
+        Parameters:
+        - total (int): Only return the newest `total` candles
+        - start, end (int): Inclusive timestamp range in milliseconds
+        - mmap (bool): Return read-only memory-mapped arrays instead of copies
+
+        Returns:
+        - dict: column name -> np.ndarray
+        """
+        n = self.count(exchange, symbol, bar)
+        key_dir = self._key_dir(exchange, symbol, bar)
+        lo, hi = 0, n
+        if n and (start is not None or end is not None):
+            ts = self._read_column(key_dir, "timestamp", 0, n, mmap=True)
+            if start is not None:
+                lo = int(np.searchsorted(ts, start, side="left"))
+            if end is not None:
+                hi = int(np.searchsorted(ts, end, side="right"))
+            del ts
+        if total is not None:
+            lo = max(lo, hi - total)
+        return {col: self._read_column(key_dir, col, lo, hi, mmap=mmap) if n else
+                np.empty(0, dtype=self.COLUMN_DTYPES[col]) for col in self.COLUMN_DTYPES}
+
+    def load(self, exchange, symbol, bar, total=None, start=None, end=None) -> pd.DataFrame:
+        """
+        Load stored candles in the same shape the fetchers return:
+        a DataFrame indexed by timestamp with open/high/low/close/volume columns.
+        """
+        arrays = self.read_arrays(exchange, symbol, bar, total=total, start=start, end=end)
+        index = pd.to_datetime(arrays.pop("timestamp"), unit="ms")
+        df = pd.DataFrame(arrays, index=index)
+        df.index.name = "timestamp"
+        return df
+
+    def write(self, exchange, symbol, bar, df: pd.DataFrame) -> int:
+        """
+        Upsert candles into the store. Rows with a timestamp already stored
+        are overwritten (the latest, still-forming candle gets refreshed),
+        newer rows are appended.
+
+        Parameters:
+        - df (pd.DataFrame): Timestamp-indexed OHLCV frame as returned by the fetchers
+
+        Returns:
+        - int: Number of rows stored for the key after the write
+        """
+        if df is None or df.empty:
+            return self.count(exchange, symbol, bar)
+
+        new_ts = pd.DatetimeIndex(df.index).as_unit("ms").asi8
+        order = np.argsort(new_ts, kind="stable")
+        new_ts = new_ts[order]
+        # 同一时间戳重复出现时保留最后一条
+        keep = np.append(new_ts[1:] != new_ts[:-1], True)
+        new_cols = {"timestamp": new_ts[keep]}
+        for col in KLINE_COLUMNS:
+            new_cols[col] = df[col].to_numpy(dtype="f8")[order][keep]
+
+        key_dir = self._key_dir(exchange, symbol, bar)
+        os.makedirs(key_dir, exist_ok=True)
+        n = self.count(exchange, symbol, bar)
+
+        # 找到需要改写的位置：只有与新数据重叠的尾部会被重写
+        pos = n
+        if n:
+            old_ts = self._read_column(key_dir, "timestamp", 0, n, mmap=True)
+            pos = int(np.searchsorted(old_ts, new_cols["timestamp"][0], side="left"))
+            del old_ts
+
+        if pos < n:
+            tail = self.read_arrays(exchange, symbol, bar, total=n - pos)
+            merged_ts = np.concatenate([tail["timestamp"], new_cols["timestamp"]])
+            idx = np.argsort(merged_ts, kind="stable")
+            merged_ts = merged_ts[idx]
+            last = np.append(merged_ts[1:] != merged_ts[:-1], True)
+            new_cols = {col: np.concatenate([tail[col], new_cols[col]])[idx][last] for col in self.COLUMN_DTYPES}
+
+        # 先写价格列，最后写 timestamp，中断时 count() 以最短列为准
+        for col in KLINE_COLUMNS + ["timestamp"]:
+            dtype = self.COLUMN_DTYPES[col]
+            path = self._column_path(key_dir, col)
+            mode = "r+b" if os.path.exists(path) else "wb"
+            with open(path, mode) as f:
+                f.truncate(pos * dtype.itemsize)
+                f.seek(pos * dtype.itemsize)
+                f.write(np.ascontiguousarray(new_cols[col], dtype=dtype).tobytes())
+        return pos + len(new_cols["timestamp"])
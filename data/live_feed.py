@@ -0,0 +1,414 @@
+import asyncio
+import contextlib
+import inspect
+import json
+from collections import deque
+
+import pandas as pd
+import websockets
+
+from data.bar_store import BAR_FIELDS, BarStore
+from utils.logger import get_logger
+from utils.timeframe import bar_delta
+
+logger = get_logger(__name__)
+
+OKX_PUBLIC_WS = "wss://ws.okx.com:8443/ws/v5/public"      # tickers
+OKX_BUSINESS_WS = "wss://ws.okx.com:8443/ws/v5/business"  # candles
+SUBSCRIBE_CHUNK = 100    # 每条订阅消息最多携带的频道数
+PING_INTERVAL = 25       # OKX 30 秒无消息会断开，定时发送 "ping"
+
+
+def parse_candle(row) -> dict:
+    """One OKX candle array [ts, o, h, l, c, vol, ..., confirm] -> bar dict."""
+    return {
+        "timestamp": pd.Timestamp(int(row[0]), unit="ms"),
+        "open": float(row[1]),
+        "high": float(row[2]),
+        "low": float(row[3]),
+        "close": float(row[4]),
+        "volume": float(row[5]),
+        "confirm": str(row[-1]) == "1",
+    }
+
+
+class OKXWebSocketSource:
+    """Connection factory for an OKX public WebSocket endpoint."""
+
+    def __init__(self, url=OKX_BUSINESS_WS):
+        self.url = url
+
+    def connect(self):
+        """Async context manager yielding a connection with send(text) and async iteration over messages."""
+        return websockets.connect(self.url, ping_interval=None, max_size=None)
+
+
+class LiveFeed:
+    """
+    Asyncio market-data feed over exchange WebSockets.
+
+    One connection subscribes to the candle channel (and optionally one to
+    tickers) for every symbol at once. Forming candles are tracked per
+    symbol; when a candle is confirmed closed it is appended to the
+    BarStore ring buffer and pushed to the on_bar callbacks. A dropped
+    connection is reopened with exponential backoff, and bars missed while
+    disconnected are backfilled from the REST fetcher before live messages
+    are dispatched again, so consumers always see every closed bar once and
+    in order.
+
+    Callbacks may be plain functions or coroutines; they run on a dispatcher
+    task, so slow consumers do not stall the socket reader.
+    """
+
+    def __init__(self, symbols, bar="1H", fetcher=None, candle_source=None, ticker_source=None,
+                 buffer_size=500, max_backoff=60, queue_size=10000):
+        """
+        Parameters:
+        - symbols (list): Instrument IDs, e.g. ['BTC-USDT-SWAP', ...]
+        - bar (str): Candle interval
+        - fetcher: REST fetcher with fetch_many(symbols, bar=, total=) for warm-up and gap backfill
+        - candle_source / ticker_source: Objects with connect(); defaults to OKX business / no tickers
+        - buffer_size (int): Closed bars kept per symbol
+        - max_backoff (float): Longest wait between reconnect attempts, in seconds
+        """
+        self.symbols = list(symbols)
+        self.bar = bar
+        self.fetcher = fetcher
+        self.candle_source = candle_source or OKXWebSocketSource(OKX_BUSINESS_WS)
+        self.ticker_source = ticker_source
+        self.buffers = BarStore(buffer_size, bar=bar, exchange="okx")
+        self.max_backoff = max_backoff
+        self.forming = {}
+        self.last_closed = {}
+        self.tickers = {}
+        self.reconnects = 0
+        self._bar_callbacks = []
+        self._ticker_callbacks = []
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._stopped = asyncio.Event()
+
+    # === 订阅回调 ===
+
+    def on_bar(self, callback):
+        """callback(symbol, bar: dict, buffers: BarStore) for every closed bar."""
+        self._bar_callbacks.append(callback)
+        return callback
+
+    def on_ticker(self, callback):
+        """callback(symbol, ticker: dict) for every ticker update."""
+        self._ticker_callbacks.append(callback)
+        return callback
+
+    # === 历史预热与断线补数 ===
+
+    async def warm_up(self, total=None):
+        """Fill the buffers with the latest `total` closed bars of every symbol (no callbacks)."""
+        if self.fetcher is None:
+            return
+        frames = await asyncio.to_thread(self.fetcher.fetch_many, self.symbols,
+                                         bar=self.bar, total=total or self.buffers.capacity)
+        for symbol, df in frames.items():
+            self.buffers.extend(symbol, self._closed_only(df))
+            if self.buffers.last_timestamp(symbol) is not None:
+                self.last_closed[symbol] = self.buffers.last_timestamp(symbol)
+
+    def _now(self):
+        # 回放时用回放时钟
+        if hasattr(self.fetcher, "now"):
+            return self.fetcher.now()
+        return pd.Timestamp.now("UTC").tz_localize(None)
+
+    def _closed_only(self, df):
+        # REST 返回的最后一根可能还未收盘
+        return df[df.index <= self._now() - bar_delta(self.bar)]
+
+    async def backfill(self):
+        """Fetch and dispatch the closed bars missed since each symbol's last buffered bar."""
+        if self.fetcher is None:
+            return
+        known = [self.last_closed[s] for s in self.symbols if s in self.last_closed]
+        if not known:
+            return
+        missing = int((self._now() - min(known)) / bar_delta(self.bar)) + 2
+        frames = await asyncio.to_thread(self.fetcher.fetch_many, self.symbols, bar=self.bar,
+                                         total=min(missing, self.buffers.capacity))
+        filled = 0
+        for symbol, df in frames.items():
+            prev = self.last_closed.get(symbol)
+            new = self._closed_only(df)
+            if prev is not None:
+                new = new[new.index > prev]
+            for ts, row in zip(new.index, new[BAR_FIELDS].to_numpy(dtype=float)):
+                await self._close_bar(symbol, {"timestamp": ts, **dict(zip(BAR_FIELDS, row))})
+                filled += 1
+        if filled:
+            logger.info(f"[LiveFeed] Backfilled {filled} bars after reconnect")
+
+    # === 消息处理 ===
+
+    def _subscribe_messages(self, channel):
+        args = [{"channel": channel, "instId": s} for s in self.symbols]
+        return [json.dumps({"op": "subscribe", "args": args[i:i + SUBSCRIBE_CHUNK]})
+                for i in range(0, len(args), SUBSCRIBE_CHUNK)]
+
+    async def _close_bar(self, symbol, bar):
+        last = self.last_closed.get(symbol)
+        if last is not None and bar["timestamp"] <= last:
+            return  # 补数与推送重叠的部分只处理一次
+        self.last_closed[symbol] = bar["timestamp"]
+        await self._queue.put(("bar", symbol, {k: bar[k] for k in ["timestamp"] + BAR_FIELDS}))
+
+    async def _handle(self, message):
+        if message == "pong":
+            return
+        msg = json.loads(message)
+        if "event" in msg:
+            if msg["event"] == "error":
+                logger.error(f"[LiveFeed] Subscription error: {msg.get('code')} {msg.get('msg')}")
+            return
+        channel = msg.get("arg", {}).get("channel", "")
+        symbol = msg.get("arg", {}).get("instId")
+        if channel.startswith("candle"):
+            for row in msg.get("data", []):
+                bar = parse_candle(row)
+                if bar["confirm"]:
+                    self.forming.pop(symbol, None)
+                    await self._close_bar(symbol, bar)
+                else:
+                    self.forming[symbol] = bar
+        elif channel == "tickers":
+            for tick in msg.get("data", []):
+                self.tickers[symbol] = tick
+                await self._queue.put(("ticker", symbol, tick))
+
+    async def _keepalive(self, conn):
+        while True:
+            await asyncio.sleep(PING_INTERVAL)
+            try:
+                await conn.send("ping")
+            except Exception as e:
+                # 连接已断开：交给读循环去重连，这里只记录并退出
+                logger.warning(f"[LiveFeed] ping failed: {e.__class__.__name__}: {e}")
+                return
+
+    async def _consume(self, source, channel, backfill=False):
+        """Connect, subscribe and read messages until stopped, reconnecting on errors."""
+        delay = min(1, self.max_backoff)
+        first = True
+        while not self._stopped.is_set():
+            try:
+                async with source.connect() as conn:
+                    for sub in self._subscribe_messages(channel):
+                        await conn.send(sub)
+                    if backfill and not first:
+                        await self.backfill()
+                    first, delay = False, min(1, self.max_backoff)
+                    keepalive = asyncio.create_task(self._keepalive(conn))
+                    try:
+                        async for message in conn:
+                            await self._handle(message)
+                            if self._stopped.is_set():
+                                break
+                    finally:
+                        keepalive.cancel()
+                        with contextlib.suppress(asyncio.CancelledError):
+                            await keepalive
+                if getattr(source, "exhausted", False):
+                    break  # 回放源数据已放完
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[LiveFeed] {channel}: {e.__class__.__name__}: {e}, reconnect in {delay}s")
+            if self._stopped.is_set():
+                break
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_backoff)
+
+    async def _dispatch(self):
+        while True:
+            kind, symbol, payload = await self._queue.get()
+            if kind == "bar":
+                # 在分发时才写入缓冲，回调看到的缓冲正好截止到这根K线
+                self.buffers.append(symbol, payload)
+            callbacks = self._bar_callbacks if kind == "bar" else self._ticker_callbacks
+            for cb in callbacks:
+                try:
+                    result = cb(symbol, payload, self.buffers) if kind == "bar" else cb(symbol, payload)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception:
+                    logger.exception(f"[LiveFeed] {kind} callback {getattr(cb, '__name__', cb)} failed on {symbol}")
+            self._queue.task_done()
+
+    async def run(self, warm_up=True):
+        """Run until stop() is called (or a replay source runs out)."""
+        self._stopped.clear()
+        if warm_up:
+            await self.warm_up()
+        dispatcher = asyncio.create_task(self._dispatch())
+        consumers = [self._consume(self.candle_source, f"candle{self.bar}", backfill=True)]
+        if self.ticker_source is not None:
+            consumers.append(self._consume(self.ticker_source, "tickers"))
+        try:
+            await asyncio.gather(*consumers)
+            await self._queue.join()  # 把已收到的收盘K线全部交给消费者
+        finally:
+            dispatcher.cancel()
+
+    def stop(self):
+        self._stopped.set()
+
+
+# === 本地回放：代替交易所 WebSocket，用于测试和离线演练 ===
+
+class _ReplayConnection:
+    def __init__(self, source):
+        self.source = source
+        self.subscribed = set()
+        self.pending = deque()
+
+    async def send(self, text):
+        if text == "ping":
+            self.pending.append("pong")
+            return
+        msg = json.loads(text)
+        for arg in msg.get("args", []):
+            self.subscribed.add((arg["channel"], arg["instId"]))
+        self.pending.append(json.dumps({"event": msg["op"], "args": msg.get("args", [])}))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.pending:
+            return self.pending.popleft()
+        return await self.source._next_message(self)
+
+
+class ReplaySource:
+    """
+    Stand-in for an exchange WebSocket that replays stored K-lines as OKX
+    candle / ticker pushes, in timestamp order across symbols.
+
+    Every bar is sent as `updates` forming-candle messages followed by the
+    confirmed one. drop_every / skip_on_reconnect simulate a dropped
+    connection that misses bars, and rest() returns a fetcher that serves
+    the bars replayed so far, so reconnect backfill can be exercised offline.
+    """
+
+    def __init__(self, frames: dict, bar="1H", start=0, interval=0.0, updates=1,
+                 drop_every=None, skip_on_reconnect=0, tickers=False):
+        """
+        Parameters:
+        - frames (dict): symbol -> OHLCV DataFrame indexed by timestamp
+        - start (int): Timestamps to skip at the beginning (they count as history for rest())
+        - interval (float): Seconds to wait between timestamps, 0 replays as fast as possible
+        - updates (int): Forming-candle messages per bar before the confirmed one
+        - drop_every (int): Close the connection after this many confirmed bars
+        - skip_on_reconnect (int): Timestamps lost while disconnected
+        - tickers (bool): Emit ticker pushes instead of candles
+        """
+        self.frames = frames
+        self.bar = bar
+        self.index = sorted(set().union(*(df.index for df in frames.values()))) if frames else []
+        self.position = start
+        self.interval = interval
+        self.updates = updates
+        self.drop_every = drop_every
+        self.skip_on_reconnect = skip_on_reconnect
+        self.tickers = tickers
+        self.exhausted = False
+        self._sent = 0
+        self._queue = deque()
+        self._dropped = False
+
+    def connect(self):
+        source = self
+
+        class _Ctx:
+            async def __aenter__(self):
+                if source._dropped:
+                    source._dropped = False
+                    source.position += source.skip_on_reconnect
+                return _ReplayConnection(source)
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Ctx()
+
+    def now(self):
+        """Replay clock: open time of the bar after the last one replayed."""
+        if not self.index:
+            return pd.Timestamp(0)
+        last = self.index[min(self.position, len(self.index)) - 1] if self.position else self.index[0]
+        return last + bar_delta(self.bar)
+
+    def _messages_at(self, ts, conn):
+        """(message, is_confirmed_candle) pairs for every subscribed symbol with a bar at ts."""
+        out = []
+        for symbol, df in self.frames.items():
+            if ts not in df.index:
+                continue
+            row = df.loc[ts]
+            ms = str(int(ts.value // 1_000_000))
+            if self.tickers:
+                if ("tickers", symbol) in conn.subscribed:
+                    data = [{"instId": symbol, "last": str(row["close"]), "ts": ms}]
+                    out.append((json.dumps({"arg": {"channel": "tickers", "instId": symbol}, "data": data}), False))
+                continue
+            channel = f"candle{self.bar}"
+            if (channel, symbol) not in conn.subscribed:
+                continue
+            for k in range(self.updates + 1):
+                confirm = "1" if k == self.updates else "0"
+                candle = [ms, str(row["open"]), str(row["high"]), str(row["low"]), str(row["close"]),
+                          str(row["volume"]), "0", "0", confirm]
+                out.append((json.dumps({"arg": {"channel": channel, "instId": symbol}, "data": [candle]}),
+                            confirm == "1"))
+        return out
+
+    async def _next_message(self, conn):
+        while not self._queue:
+            if self.position >= len(self.index):
+                self.exhausted = True
+                raise StopAsyncIteration
+            if self.interval:
+                await asyncio.sleep(self.interval)
+            self._queue.extend(self._messages_at(self.index[self.position], conn))
+            self.position += 1
+        message, confirmed = self._queue.popleft()
+        if confirmed:
+            self._sent += 1
+            if self.drop_every and self._sent % self.drop_every == 0:
+                # 断线：这条及本时刻剩余的推送都丢失，重连后还会再漏掉 skip_on_reconnect 个时刻
+                self._dropped = True
+                self._queue.clear()
+                raise ConnectionError("replay connection dropped")
+        return message
+
+    def rest(self):
+        return _ReplayFetcher(self)
+
+
+class _ReplayFetcher:
+    """REST stand-in for a ReplaySource: serves the bars up to the replay clock."""
+
+    def __init__(self, source):
+        self.source = source
+
+    def now(self):
+        return self.source.now()
+
+    def fetch_many(self, symbols, bar="1H", total=300, max_workers=None):
+        cutoff = self.source.now()
+        out = {}
+        for s in symbols:
+            df = self.source.frames.get(s)
+            if df is None:
+                continue
+            df = df[df.index < cutoff].tail(total)
+            if not df.empty:
+                out[s] = df
+        return out
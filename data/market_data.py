@@ -1,9 +1,37 @@
 import pandas as pd
 import okx.MarketData as MarketData
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from dateutil import tz
 from binance.client import Client
+from data.kline_store import KlineStore
+from utils.rate_limiter import get_limiter, call_with_retry, RateLimitedError
+
+# OKX 限频错误码
+OKX_RATE_LIMIT_CODES = {"50011", "50061"}
+
+
+def fetch_concurrently(fetch_fn, symbols, max_workers=16, **kwargs):
+    """
+    Run fetch_fn(symbol, **kwargs) for many symbols on a bounded thread pool.
+    Pacing is left to the fetcher's shared rate limiter, not to fixed sleeps.
+
+    Returns:
+    - dict: symbol -> DataFrame, symbols that failed or returned nothing are left out
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch_fn, symbol, **kwargs): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                df = future.result()
+            except Exception as e:
+                print(f"Error fetching {symbol}: {e}")
+                continue
+            if df is not None and not df.empty:
+                results[symbol] = df
+    return results
 
 
 class OKXDataFetcher:
@@ -11,14 +39,28 @@ class OKXDataFetcher:
     A class to interact with OKX Market Data API for fetching K-line and ticker information.
     """
 
-    def __init__(self, flag="0"):
+    def __init__(self, flag="0", store: KlineStore = None, offline=False):
         """
         Initialize the OKX Market Data API.
 
         Parameters:
         - flag (str): "0" for real trading, "1" for demo environment
+        - store (KlineStore): Optional local candle store; only newer candles are downloaded
+        - offline (bool): Replay mode, serve K-lines from the store without any network call
         """
         self.marketDataAPI = MarketData.MarketAPI(flag=flag)
+        self.store = store
+        self.offline = offline
+        self.limiter = get_limiter("okx")
+
+    def _request(self, endpoint, fn, **params):
+        """Call an OKX SDK method under the shared limiter, retrying rate-limit errors."""
+        def _call():
+            result = fn(**params)
+            if str(result.get("code")) in OKX_RATE_LIMIT_CODES:
+                raise RateLimitedError(f"OKX {endpoint}: {result.get('msg')}", status_code=429)
+            return result
+        return call_with_retry(_call, limiter=self.limiter, endpoint=endpoint)
 
     def list_of_dicts_to_df(self, data):
         if not isinstance(data, list) or len(data) == 0:
@@ -56,7 +98,7 @@ class OKXDataFetcher:
         return df
 
     def get_hist_kline(self, instId, bar='1m'):
-        result = self.marketDataAPI.get_history_candlesticks(instId=instId, bar=bar)
+        result = self._request("history_candles", self.marketDataAPI.get_history_candlesticks, instId=instId, bar=bar)
         return self.parse_okx_kline(result["data"])
 
     def get_kline(self, instId, bar='1m', total=300):
@@ -71,6 +113,27 @@ class OKXDataFetcher:
         Returns:
         - pd.DataFrame: Combined K-line data
         """
+        if self.store is not None:
+            df = self._get_kline_cached(instId, bar, total)
+        else:
+            df = self.parse_okx_kline(self._fetch_kline_pages(instId, bar, total))
+        df.attrs.update(exchange="okx", symbol=instId, bar=bar)  # 供指标缓存识别数据版本
+        return df
+
+    def _get_kline_cached(self, instId, bar, total):
+        if not self.offline:
+            since = None
+            if self.store.count("okx", instId, bar) >= total:
+                since = self.store.last_timestamp("okx", instId, bar)
+            data = self._fetch_kline_pages(instId, bar, total, since=since)
+            self.store.write("okx", instId, bar, self.parse_okx_kline(data))
+        return self.store.load("okx", instId, bar, total=total)
+
+    def _fetch_kline_pages(self, instId, bar, total, since=None):
+        """
+        Page backwards from the newest candle until `total` candles are fetched
+        or the page reaches `since` (ms timestamp already stored locally).
+        """
         all_data = []
         next_end = None
         fetched = 0
@@ -82,7 +145,7 @@ class OKXDataFetcher:
             if next_end:
                 params["after"] = next_end
 
-            result = self.marketDataAPI.get_candlesticks(**params)
+            result = self._request("candles", self.marketDataAPI.get_candlesticks, **params)
             batch = result.get("data", [])
 
             if not batch:
@@ -92,12 +155,51 @@ class OKXDataFetcher:
             fetched += len(batch)
 
             next_end = batch[-1][0]  # 最后一条的 timestamp
-            time.sleep(0.2)  # 防止频率限制
+            if since is not None and int(next_end) <= since:
+                break  # 已经接上本地数据
 
-        return self.parse_okx_kline(all_data)
+        return all_data
+
+    def get_kline_range(self, instId, bar='1m', start=None, end=None):
+        """
+        Fetch only the K-lines with start <= timestamp < end, paging back from
+        `end` through the history endpoint (e.g. to look inside one old bar).
+
+        Returns:
+        - pd.DataFrame: K-line data, empty if the exchange has none in the range
+        """
+        start_ms = pd.Timestamp(start).value // 10 ** 6
+        after = pd.Timestamp(end).value // 10 ** 6
+        all_data = []
+        while after > start_ms:
+            result = self._request("history_candles", self.marketDataAPI.get_history_candlesticks,
+                                   instId=instId, bar=bar, after=str(after), limit="100")
+            batch = result.get("data", [])
+            if not batch:
+                break
+            all_data += batch
+            after = int(batch[-1][0])  # 最早一条，下一页从它往前翻
+        df = self.parse_okx_kline([row for row in all_data if int(row[0]) >= start_ms])
+        df.attrs.update(exchange="okx", symbol=instId, bar=bar)
+        return df
+
+    def fetch_many(self, symbols, bar='1H', total=300, max_workers=16):
+        """
+        Fetch K-lines for many instruments concurrently.
+
+        Parameters:
+        - symbols (list): Instrument IDs
+        - bar (str): Time interval
+        - total (int): Candles per instrument
+        - max_workers (int): Requests kept in flight at once
+
+        Returns:
+        - dict: instId -> pd.DataFrame
+        """
+        return fetch_concurrently(self.get_kline, symbols, max_workers=max_workers, bar=bar, total=total)
 
     def get_all_tickers(self, instType="SWAP"):
-        result = self.marketDataAPI.get_tickers(instType=instType)
+        result = self._request("tickers", self.marketDataAPI.get_tickers, instType=instType)
         data = result["data"]
         df = self.list_of_dicts_to_df(data)
         df = df[df['instId'].str.contains('USDT')].copy()
@@ -115,30 +217,99 @@ class OKXDataFetcher:
         return df
 
 class BinanceDataFetcher:
-    def __init__(self):
-        self.client = Client()
+    def __init__(self, store: KlineStore = None, offline=False):
+        """
+        Parameters:
+        - store (KlineStore): Optional local candle store; only newer candles are downloaded
+        - offline (bool): Replay mode, serve K-lines from the store without any network call
+        """
+        self.client = None if offline else Client()
+        self.store = store
+        self.offline = offline
+        self.limiter = get_limiter("binance")
+        if self.client is not None:
+            # 响应钩子在发起请求的线程里拿到本次请求自己的响应；
+            # fetch_many 多线程共用一个 Client，client.response 可能是别的线程的
+            self.client.session.hooks["response"].append(self._on_response)
+
+    def _on_response(self, response, *args, **kwargs):
+        """requests hook: sync the shared weight budget with this response's used-weight / Retry-After headers."""
+        self.limiter.update_from_headers(response.headers)
+
+    def _request(self, endpoint, fn, **params):
+        """Call a Binance client method under the shared weight budget, retrying rate-limit errors."""
+        return call_with_retry(fn, limiter=self.limiter, endpoint=endpoint, **params)
 
     def get_all_usdt_pairs(self):
-        info = self.client.get_exchange_info()
+        info = self._request("exchange_info", self.client.get_exchange_info)
         symbols = [s['symbol'] for s in info['symbols'] if s['quoteAsset'] == 'USDT' and s['status'] == 'TRADING']
         return symbols
 
     def get_klines(self, symbol: str, interval: str = '1h', total: int = 300):
+        if self.store is not None:
+            df = self._get_klines_cached(symbol, interval, total)
+        else:
+            df = self.parse_binance_kline(self._fetch_klines_pages(symbol, interval, total))
+        df.attrs.update(exchange="binance", symbol=symbol, bar=interval)  # 供指标缓存识别数据版本
+        return df
+
+    def _get_klines_cached(self, symbol, interval, total):
+        if not self.offline:
+            since = None
+            if self.store.count("binance", symbol, interval) >= total:
+                since = self.store.last_timestamp("binance", symbol, interval)
+            data = self._fetch_klines_pages(symbol, interval, total, since=since)
+            self.store.write("binance", symbol, interval, self.parse_binance_kline(data))
+        return self.store.load("binance", symbol, interval, total=total)
+
+    def _fetch_klines_pages(self, symbol, interval, total, since=None):
         limit_per_call = 1000
         klines_all = []
         end_time = None
 
         while len(klines_all) < total:
             limit = min(limit_per_call, total - len(klines_all))
-            data = self.client.get_klines(symbol=symbol, interval=interval, endTime=end_time, limit=limit)
+            data = self._request("klines", self.client.get_klines,
+                                 symbol=symbol, interval=interval, endTime=end_time, limit=limit)
 
             if not data:
                 break
 
             klines_all.extend(data)
             end_time = data[0][0] - 1  # 下一轮以当前最早时间往前翻
-            time.sleep(0.5)  # 防止速率限制
+            if since is not None and data[0][0] <= since:
+                break  # 已经接上本地数据
+
+        return klines_all
+
+    def get_klines_range(self, symbol: str, interval: str = '1m', start=None, end=None):
+        """
+        Fetch only the K-lines with start <= timestamp < end, paging forward from `start`.
 
+        Returns:
+        - pd.DataFrame: K-line data, empty if the exchange has none in the range
+        """
+        start_time = pd.Timestamp(start).value // 10 ** 6
+        end_ms = pd.Timestamp(end).value // 10 ** 6
+        klines_all = []
+        while start_time < end_ms:
+            data = self._request("klines", self.client.get_klines, symbol=symbol, interval=interval,
+                                 startTime=start_time, endTime=end_ms - 1, limit=1000)
+            if not data:
+                break
+            klines_all.extend(data)
+            start_time = data[-1][0] + 1
+        df = self.parse_binance_kline(klines_all)
+        df.attrs.update(exchange="binance", symbol=symbol, bar=interval)
+        return df
+
+    def fetch_many(self, symbols, interval='1h', total=300, max_workers=16):
+        """
+        Fetch K-lines for many symbols concurrently, returns dict symbol -> DataFrame.
+        """
+        return fetch_concurrently(self.get_klines, symbols, max_workers=max_workers, interval=interval, total=total)
+
+    def parse_binance_kline(self, klines_all):
         # 转为 DataFrame
         df = pd.DataFrame(klines_all, columns=[
             "timestamp", "open", "high", "low", "close",
@@ -152,8 +323,9 @@ class BinanceDataFetcher:
         df.set_index("timestamp", inplace=True)
         df.sort_index(inplace=True)
         return df
+
     def get_top_usdt_pairs_by_volume(self, top_n=50):
-        tickers = self.client.get_ticker()
+        tickers = self._request("ticker_24hr", self.client.get_ticker)
         df = pd.DataFrame(tickers)
         df = df[df['symbol'].str.endswith('USDT')].copy()
         df['quoteVolume'] = pd.to_numeric(df['quoteVolume'], errors='coerce')
@@ -1,16 +1,14 @@
-import requests
-import time
+from utils.rate_limiter import get_limiter, http_get_json
 
 class SectorFetcher:
     def __init__(self):
+        self.limiter = get_limiter("coingecko")
         self.symbol_to_id = self._fetch_coin_list()
 
     def _fetch_coin_list(self):
         """Fetches the list of all coins from CoinGecko"""
         url = "https://api.coingecko.com/api/v3/coins/list"
-        response = requests.get(url)
-        response.raise_for_status()
-        coins = response.json()
+        coins = http_get_json(url, limiter=self.limiter)
 
         # Build mapping from lowercase symbol to list of ids (可能重复)
         mapping = {}
@@ -27,13 +25,7 @@ class SectorFetcher:
         for coin_id in possible_ids:
             try:
                 url = f"https://api.coingecko.com/api/v3/coins/{coin_id}"
-                response = requests.get(url)
-                if response.status_code == 429:
-                    print("Rate limited. Sleeping...")
-                    time.sleep(2)
-                    continue
-                response.raise_for_status()
-                data = response.json()
+                data = http_get_json(url, limiter=self.limiter)
                 return data.get("categories", [])
             except Exception as e:
                 continue  # Try next id if this one fails
@@ -0,0 +1,94 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of SQLite connections to one database file.
+
+    Connections are opened lazily, configured once (WAL, synchronous=NORMAL,
+    a large prepared-statement cache) and handed back to the pool after use,
+    so callers stop paying sqlite3.connect() and PRAGMA setup per operation.
+    Use ConnectionPool.for_path() to share one pool per database file.
+    """
+
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, db_path: str, max_size: int = 8, cached_statements: int = 256):
+        """
+        Parameters:
+        - db_path (str): SQLite database file
+        - max_size (int): Maximum number of open connections
+        - cached_statements (int): Prepared statements cached per connection
+        """
+        self.db_path = db_path
+        self.max_size = max_size
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self.initialized = False  # schema checks done for this file
+
+    @classmethod
+    def for_path(cls, db_path: str, **kwargs) -> "ConnectionPool":
+        """Return the process-wide pool for `db_path`."""
+        with cls._pools_lock:
+            if db_path not in cls._pools:
+                cls._pools[db_path] = cls(db_path, **kwargs)
+            return cls._pools[db_path]
+
+    @classmethod
+    def close_all(cls):
+        """Close every pooled connection (call at process shutdown)."""
+        with cls._pools_lock:
+            for pool in cls._pools.values():
+                pool.close()
+            cls._pools.clear()
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.max_size:
+                self._opened += 1
+                try:
+                    return self._open()
+                except Exception:
+                    self._opened -= 1
+                    raise
+        return self._idle.get()
+
+    def release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._opened = 0
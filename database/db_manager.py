@@ -1,112 +1,428 @@
-import sqlite3
+import threading
+import numpy as np
 import pandas as pd
 import os
+from contextlib import contextmanager
 from typing import Optional
 from datetime import datetime
+from database.connection_pool import ConnectionPool
 
 
 class DBManager:
+    """
+    SQLite access layer.
+
+    Connections come from a shared per-file ConnectionPool. Every method
+    commits on its own unless it runs inside `with db.batch():`, in which
+    case all writes on that thread share one transaction and one commit.
+    """
+
     def __init__(self, db_path: str = None):
         if db_path is None:
             # 自动定位到 database 文件夹里的数据库
             db_path = os.path.join(os.path.dirname(__file__), "taotrader.db")
-        self.conn = sqlite3.connect(db_path)
-        self.cursor = self.conn.cursor()
+        self.db_path = db_path
+        self.pool = ConnectionPool.for_path(db_path)
+        self._local = threading.local()
+        if not self.pool.initialized:
+            with self._connection() as conn:
+                self._ensure_kline_schema(conn)
+                self._ensure_score_schema(conn)
+            self.pool.initialized = True
+
+    @contextmanager
+    def _connection(self):
+        """
+        Yield a connection. Outside a batch the statement block is committed
+        (or rolled back) on exit; inside a batch the batch's connection is reused.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+        with self.pool.connection() as conn:
+            with conn:
+                yield conn
+
+    @contextmanager
+    def batch(self):
+        """
+        Unit of work: all DBManager writes on this thread inside the block
+        run in one transaction, committed once at the end (rolled back on error).
+
+            with db.batch():
+                db.insert_ticker(...)
+                db.insert_categories(...)
+        """
+        if getattr(self._local, "conn", None) is not None:
+            yield self  # 嵌套 batch 并入外层事务
+            return
+        with self.pool.connection() as conn:
+            self._local.conn = conn
+            try:
+                with conn:
+                    yield self
+            finally:
+                self._local.conn = None
 
     def get_ticker(self, symbol: str) -> Optional[dict]:
-        self.cursor.execute("SELECT * FROM tickers WHERE symbol = ?", (symbol,))
-        row = self.cursor.fetchone()
-        if row:
-            columns = [desc[0] for desc in self.cursor.description]
-            return dict(zip(columns, row))
+        with self._connection() as conn:
+            cursor = conn.execute("SELECT * FROM tickers WHERE symbol = ?", (symbol,))
+            row = cursor.fetchone()
+            if row:
+                columns = [desc[0] for desc in cursor.description]
+                return dict(zip(columns, row))
         return None
 
     def get_all_categories(self) -> pd.DataFrame:
         query = "SELECT symbol, category FROM categories"
-        return pd.read_sql_query(query, self.conn)
+        with self._connection() as conn:
+            return pd.read_sql_query(query, conn)
 
     def insert_ticker(self, symbol, base_asset, quote_asset, coingecko_id, category=None, logo_url=None):
         now = datetime.utcnow().isoformat()
-        self.cursor.execute("""
-            INSERT OR IGNORE INTO tickers (symbol, base_asset, quote_asset, coingecko_id, category, logo_url, last_updated)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (symbol, base_asset, quote_asset, coingecko_id, category, logo_url, now))
-        self.conn.commit()
+        with self._connection() as conn:
+            conn.execute("""
+                INSERT OR IGNORE INTO tickers (symbol, base_asset, quote_asset, coingecko_id, category, logo_url, last_updated)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (symbol, base_asset, quote_asset, coingecko_id, category, logo_url, now))
 
     def insert_ticker_if_missing(self, symbol, base_asset, quote_asset, coingecko_id, categories=None, logo_url=None):
         existing = self.get_ticker(symbol)
         if existing:
             return
         now = datetime.utcnow().isoformat()
-        self.cursor.execute("""
-            INSERT INTO tickers (symbol, base_asset, quote_asset, coingecko_id, logo_url, last_updated)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (symbol, base_asset, quote_asset, coingecko_id, logo_url, now))
-        self.conn.commit()
-
-        # Insert into ticker_category if categories exist
-        if categories:
-            for cat in categories:
-                self.cursor.execute("""
+        with self._connection() as conn:
+            conn.execute("""
+                INSERT INTO tickers (symbol, base_asset, quote_asset, coingecko_id, logo_url, last_updated)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (symbol, base_asset, quote_asset, coingecko_id, logo_url, now))
+
+            # Insert into ticker_category if categories exist
+            if categories:
+                conn.executemany("""
                     INSERT OR IGNORE INTO ticker_category (symbol, category)
                     VALUES (?, ?)
-                """, (symbol, cat))
-            self.conn.commit()
+                """, [(symbol, cat) for cat in categories])
 
     def get_tickers_missing_category(self):
-        self.cursor.execute("SELECT symbol, base_asset FROM tickers WHERE category IS NULL")
-        rows = self.cursor.fetchall()
-        return [dict(zip([desc[0] for desc in self.cursor.description], row)) for row in rows]
+        with self._connection() as conn:
+            cursor = conn.execute("SELECT symbol, base_asset FROM tickers WHERE category IS NULL")
+            rows = cursor.fetchall()
+            return [dict(zip([desc[0] for desc in cursor.description], row)) for row in rows]
 
     def update_last_updated(self, symbol: str):
         now = datetime.utcnow().isoformat()
-        self.cursor.execute("UPDATE tickers SET last_updated = ? WHERE symbol = ?", (now, symbol))
-        self.conn.commit()
+        with self._connection() as conn:
+            conn.execute("UPDATE tickers SET last_updated = ? WHERE symbol = ?", (now, symbol))
 
     def insert_categories(self, symbol: str, categories: list[str]):
-        for category in categories:
-            self.cursor.execute("""
+        with self._connection() as conn:
+            conn.executemany("""
                 INSERT OR IGNORE INTO categories (symbol, category)
                 VALUES (?, ?)
-            """, (symbol, category))
-        self.conn.commit()
+            """, [(symbol, category) for category in categories])
 
     def get_symbols_by_category(self, category: str) -> list[str]:
-        self.cursor.execute("""
-            SELECT symbol FROM categories WHERE category = ?
-        """, (category,))
-        rows = self.cursor.fetchall()
+        with self._connection() as conn:
+            rows = conn.execute("""
+                SELECT symbol FROM categories WHERE category = ?
+            """, (category,)).fetchall()
         return [row[0] for row in rows]
 
+    KLINE_VALUE_COLUMNS = ["open", "high", "low", "close", "volume", "quote_volume"]
+
+    def _ensure_kline_schema(self, conn):
+        """
+        Create kline_data if missing and migrate the old layout
+        (timestamp TEXT, rowid table) to integer millisecond timestamps
+        clustered on (symbol, interval, timestamp).
+        """
+        columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(kline_data)")}
+        if columns and columns.get("timestamp", "").upper() == "INTEGER":
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_kline_interval_ts ON kline_data (interval, timestamp)")
+            return
+
+        if columns:
+            conn.execute("ALTER TABLE kline_data RENAME TO kline_data_legacy")
+        conn.execute("""
+            CREATE TABLE kline_data (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                timestamp INTEGER NOT NULL,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                volume REAL,
+                quote_volume REAL,
+                PRIMARY KEY (symbol, interval, timestamp)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_kline_interval_ts ON kline_data (interval, timestamp)")
+        if columns:
+            conn.execute("""
+                INSERT OR REPLACE INTO kline_data
+                SELECT symbol, interval, CAST(strftime('%s', timestamp) AS INTEGER) * 1000,
+                       open, high, low, close, volume, quote_volume
+                FROM kline_data_legacy
+                WHERE symbol IS NOT NULL AND interval IS NOT NULL AND strftime('%s', timestamp) IS NOT NULL
+            """)
+            conn.execute("DROP TABLE kline_data_legacy")
+
+    def _ensure_score_schema(self, conn):
+        """
+        Create coin_scores if missing and migrate the old layout (timestamp TEXT)
+        to integer millisecond run times, like kline_data.
+        """
+        columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(coin_scores)")}
+        if not columns or columns.get("timestamp", "").upper() != "INTEGER":
+            if columns:
+                conn.execute("ALTER TABLE coin_scores RENAME TO coin_scores_legacy")
+            conn.execute("""
+                CREATE TABLE coin_scores (
+                    symbol TEXT NOT NULL,
+                    factor_name TEXT NOT NULL,
+                    score REAL,
+                    timestamp INTEGER NOT NULL,
+                    PRIMARY KEY (symbol, factor_name, timestamp)
+                ) WITHOUT ROWID
+            """)
+            if columns:
+                conn.execute("""
+                    INSERT OR REPLACE INTO coin_scores
+                    SELECT symbol, factor_name, score, CAST(strftime('%s', timestamp) AS INTEGER) * 1000
+                    FROM coin_scores_legacy
+                    WHERE symbol IS NOT NULL AND factor_name IS NOT NULL AND strftime('%s', timestamp) IS NOT NULL
+                """)
+                conn.execute("DROP TABLE coin_scores_legacy")
+        # 主键覆盖按币种查轨迹；截面查询（某因子、某时间段内排名）走这个覆盖索引
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_scores_factor_ts ON coin_scores (factor_name, timestamp, symbol, score)")
+
+    @staticmethod
+    def _to_epoch_ms(value):
+        if value is None:
+            return None
+        if isinstance(value, (int, np.integer)):
+            return int(value)
+        return int(pd.Timestamp(value).value // 1_000_000)
+
+    def _kline_rows(self, symbol: str, interval: str, df: pd.DataFrame):
+        if "timestamp" in df.columns:
+            ts = pd.to_datetime(df["timestamp"])
+        else:
+            ts = pd.Series(pd.DatetimeIndex(df.index))
+        ts_ms = pd.DatetimeIndex(ts).as_unit("ms").asi8
+        n = len(df)
+        values = [
+            df[col].to_numpy(dtype="f8") if col in df.columns else np.full(n, np.nan)
+            for col in self.KLINE_VALUE_COLUMNS
+        ]
+        # SQLite 会把 NaN 存成 NULL
+        return zip([symbol] * n, [interval] * n, ts_ms.tolist(), *(v.tolist() for v in values))
+
+    _UPSERT_KLINE_SQL = """
+        INSERT INTO kline_data (symbol, interval, timestamp, open, high, low, close, volume, quote_volume)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (symbol, interval, timestamp) DO UPDATE SET
+            open = excluded.open,
+            high = excluded.high,
+            low = excluded.low,
+            close = excluded.close,
+            volume = excluded.volume,
+            quote_volume = excluded.quote_volume
+    """
+
     def insert_kline(self, symbol: str, interval: str, df: pd.DataFrame):
-        df["symbol"] = symbol
-        df["interval"] = interval
-        df.to_sql("kline_data", self.conn, if_exists="append", index=False)
+        """
+        Upsert one symbol's K-lines in a single transaction.
+        The caller's DataFrame is not modified.
+        """
+        self.insert_klines_bulk({symbol: df}, interval)
 
-    def query_kline(self, symbol: str, interval: str) -> pd.DataFrame:
-        query = """
-            SELECT * FROM kline_data
-            WHERE symbol = ? AND interval = ?
-            ORDER BY timestamp ASC
+    def insert_klines_bulk(self, frames: dict, interval: str) -> int:
         """
-        return pd.read_sql_query(query, self.conn, params=(symbol, interval))
+        Upsert K-lines for many symbols in a single transaction.
 
-    def insert_score(self, symbol: str, factor_name: str, score: float):
-        self.cursor.execute("""
-            INSERT INTO coin_scores (symbol, factor_name, score, timestamp)
-            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-        """, (symbol, factor_name, score))
-        self.conn.commit()
+        Parameters:
+        - frames (dict): symbol -> OHLCV DataFrame (timestamp index or 'timestamp' column)
+        - interval (str): Bar interval, e.g. '1m', '1H'
+
+        Returns:
+        - int: Number of rows written
+        """
+        written = 0
+        with self._connection() as conn:
+            for symbol, df in frames.items():
+                if df is None or df.empty:
+                    continue
+                conn.executemany(self._UPSERT_KLINE_SQL, self._kline_rows(symbol, interval, df))
+                written += len(df)
+        return written
+
+    def query_kline(self, symbol: str, interval: str, start=None, end=None, limit: int = None) -> pd.DataFrame:
+        """
+        Range query on the clustered (symbol, interval, timestamp) key.
+
+        Parameters:
+        - start, end: Inclusive bounds (datetime, str, or ms int), optional
+        - limit (int): Only return the newest `limit` rows within the range
+
+        Returns:
+        - pd.DataFrame: Timestamp-indexed float columns, oldest first
+        """
+        query = "SELECT timestamp, open, high, low, close, volume, quote_volume FROM kline_data WHERE symbol = ? AND interval = ?"
+        params = [symbol, interval]
+        if start is not None:
+            query += " AND timestamp >= ?"
+            params.append(self._to_epoch_ms(start))
+        if end is not None:
+            query += " AND timestamp <= ?"
+            params.append(self._to_epoch_ms(end))
+        if limit is not None:
+            query += " ORDER BY timestamp DESC LIMIT ?"
+            params.append(int(limit))
+        else:
+            query += " ORDER BY timestamp ASC"
+
+        with self._connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        data = np.array(rows, dtype="f8").reshape(-1, 7)
+        if limit is not None:
+            data = data[::-1]
+        index = pd.to_datetime(data[:, 0].astype("i8"), unit="ms")
+        df = pd.DataFrame(data[:, 1:], index=index, columns=self.KLINE_VALUE_COLUMNS)
+        df.index.name = "timestamp"
+        return df
+
+    _INSERT_SCORE_SQL = """
+        INSERT OR REPLACE INTO coin_scores (symbol, factor_name, score, timestamp)
+        VALUES (?, ?, ?, ?)
+    """
+
+    @classmethod
+    def _score_timestamp(cls, scan_time=None):
+        # 评分时间统一为 UTC 毫秒整数
+        return cls._to_epoch_ms(datetime.utcnow() if scan_time is None else scan_time)
+
+    def insert_score(self, symbol: str, factor_name: str, score: float, scan_time=None):
+        with self._connection() as conn:
+            conn.execute(self._INSERT_SCORE_SQL,
+                         (symbol, factor_name, score, self._score_timestamp(scan_time)))
+
+    def insert_scores_bulk(self, scores, scan_time=None, symbol_col: str = "symbol") -> int:
+        """
+        Write a whole scoring run to coin_scores in one transaction.
+
+        Parameters:
+        - scores: DataFrame or list of dicts in the scorer's wide layout
+          (one row per symbol, one numeric column per factor)
+        - scan_time: Run timestamp shared by all rows, defaults to now (UTC)
+
+        Returns:
+        - int: Number of (symbol, factor) rows written
+        """
+        df = scores if isinstance(scores, pd.DataFrame) else pd.DataFrame(list(scores))
+        if df.empty:
+            return 0
+        ts = self._score_timestamp(scan_time)
+        factors = [c for c in df.columns if c != symbol_col and pd.api.types.is_numeric_dtype(df[c])]
+        long_df = df.melt(id_vars=[symbol_col], value_vars=factors, var_name="factor_name", value_name="score")
+        rows = zip(long_df[symbol_col].tolist(), long_df["factor_name"].tolist(),
+                   long_df["score"].astype(float).tolist(), [ts] * len(long_df))
+        with self._connection() as conn:
+            conn.executemany(self._INSERT_SCORE_SQL, rows)
+        return len(long_df)
+
+    def query_scores(self, factor_name=None, symbols=None, start=None, end=None) -> pd.DataFrame:
+        """
+        Read score history in the long layout.
+
+        Parameters:
+        - factor_name (str | list): Factor(s) to read, all if None
+        - symbols (list): Symbols to read, all if None
+        - start, end: Inclusive run-time bounds (datetime or str), optional
+
+        Returns:
+        - pd.DataFrame: symbol, factor_name, score, timestamp (datetime64), oldest first
+        """
+        query = "SELECT symbol, factor_name, score, timestamp FROM coin_scores WHERE 1 = 1"
+        params = []
+        if factor_name is not None:
+            factors = [factor_name] if isinstance(factor_name, str) else list(factor_name)
+            query += f" AND factor_name IN ({', '.join('?' * len(factors))})"
+            params += factors
+        if symbols is not None:
+            symbols = list(symbols)
+            query += f" AND symbol IN ({', '.join('?' * len(symbols))})"
+            params += symbols
+        if start is not None:
+            query += " AND timestamp >= ?"
+            params.append(self._score_timestamp(start))
+        if end is not None:
+            query += " AND timestamp <= ?"
+            params.append(self._score_timestamp(end))
+        query += " ORDER BY timestamp ASC"
+
+        with self._connection() as conn:
+            df = pd.read_sql_query(query, conn, params=params)
+        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
+        return df
+
+    def top_scores(self, factor_name: str, start=None, end=None, limit: int = 20, how: str = "mean") -> pd.DataFrame:
+        """
+        Rank symbols by one factor over the runs in [start, end].
+
+        Parameters:
+        - how (str): 'mean', 'max', 'min' over the runs, or 'last' for each symbol's latest run
+
+        Returns:
+        - pd.DataFrame: symbol, score, runs (number of runs in range), best first
+        """
+        where = "factor_name = ?"
+        params = [factor_name]
+        if start is not None:
+            where += " AND timestamp >= ?"
+            params.append(self._score_timestamp(start))
+        if end is not None:
+            where += " AND timestamp <= ?"
+            params.append(self._score_timestamp(end))
+
+        if how == "last":
+            # SQLite: 与 MAX() 同一行的裸列取该行的值
+            query = f"""
+                SELECT symbol, score, runs FROM (
+                    SELECT symbol, score, MAX(timestamp) AS ts, COUNT(*) AS runs
+                    FROM coin_scores WHERE {where} GROUP BY symbol
+                ) ORDER BY score DESC LIMIT ?
+            """
+        elif how in ("mean", "max", "min"):
+            agg = {"mean": "AVG", "max": "MAX", "min": "MIN"}[how]
+            query = f"""
+                SELECT symbol, {agg}(score) AS score, COUNT(*) AS runs
+                FROM coin_scores WHERE {where}
+                GROUP BY symbol ORDER BY score DESC LIMIT ?
+            """
+        else:
+            raise ValueError(f"Unknown aggregation: {how}")
+        params.append(int(limit))
+
+        with self._connection() as conn:
+            return pd.read_sql_query(query, conn, params=params)
 
     def get_categories_for_symbol(self, symbol: str) -> list:
-        self.cursor.execute("SELECT category FROM ticker_category WHERE symbol = ?", (symbol,))
-        rows = self.cursor.fetchall()
+        with self._connection() as conn:
+            rows = conn.execute("SELECT category FROM ticker_category WHERE symbol = ?", (symbol,)).fetchall()
         return [r[0] for r in rows]
 
     def get_symbols_for_category(self, category: str) -> list:
-        self.cursor.execute("SELECT symbol FROM ticker_category WHERE category = ?", (category,))
-        rows = self.cursor.fetchall()
+        with self._connection() as conn:
+            rows = conn.execute("SELECT symbol FROM ticker_category WHERE category = ?", (category,)).fetchall()
         return [r[0] for r in rows]
 
     def close(self):
-        self.conn.close()
+        """
+        Kept for compatibility: connections stay in the shared pool for reuse.
+        Call ConnectionPool.close_all() at process shutdown to release them.
+        """
+        pass
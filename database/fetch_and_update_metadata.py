@@ -1,12 +1,11 @@
-import time
 from data.market_data import OKXDataFetcher
 from database.db_manager import DBManager
 from utils.coingecko_helper import query_coin_info_from_coingecko
 
 
-def update_all_okx_metadata():
-    fetcher = OKXDataFetcher()
-    db = DBManager()
+def update_all_okx_metadata(fetcher: OKXDataFetcher = None, db: DBManager = None):
+    fetcher = fetcher or OKXDataFetcher()
+    db = db or DBManager()
 
     try:
         tickers_df = fetcher.get_all_tickers()
@@ -34,23 +33,24 @@ def update_all_okx_metadata():
                 skipped += 1
                 continue
 
-            # 插入主表，category 保持为空
-            db.insert_ticker(
-                symbol=symbol,
-                base_asset=base_asset,
-                quote_asset="USDT",
-                coingecko_id=info["id"],
-                category=None,
-                logo_url=info.get("logo")
-            )
+            # 主表和副表在同一个事务里写入
+            with db.batch():
+                # 插入主表，category 保持为空
+                db.insert_ticker(
+                    symbol=symbol,
+                    base_asset=base_asset,
+                    quote_asset="USDT",
+                    coingecko_id=info["id"],
+                    category=None,
+                    logo_url=info.get("logo")
+                )
 
-            # 插入副表 categories
-            if info.get("categories"):
-                db.insert_categories(symbol, info["categories"])
+                # 插入副表 categories
+                if info.get("categories"):
+                    db.insert_categories(symbol, info["categories"])
 
             print(f"插入: {symbol} -> {info['name']}")
             updated += 1
-            time.sleep(1.2)  # 避免 CoinGecko API 限速
 
         except Exception as e:
             print(f"[ERROR] 插入 {symbol} 时出错: {e}")
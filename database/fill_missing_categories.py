@@ -1,4 +1,3 @@
-import time
 from database.db_manager import DBManager
 from utils.coingecko_helper import query_coin_info_from_coingecko
 
@@ -19,11 +18,11 @@ def fill_missing_categories():
                 print(f"[跳过] 未找到分类: {symbol}")
                 continue
 
-            db.insert_categories(symbol, info["categories"])
-            db.update_last_updated(symbol)
+            with db.batch():
+                db.insert_categories(symbol, info["categories"])
+                db.update_last_updated(symbol)
             print(f"[更新] {symbol} -> 插入 {len(info['categories'])} 个分类")
             updated += 1
-            time.sleep(10)  # 避免触发 CoinGecko 限流
 
         except Exception as e:
             print(f"[错误] {symbol}: {e}")
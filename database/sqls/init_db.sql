@@ -9,11 +9,11 @@ CREATE TABLE IF NOT EXISTS tickers (
     last_updated TEXT
 );
 
--- 本地缓存的 K 线数据
+-- 本地缓存的 K 线数据（timestamp 为毫秒时间戳，按主键聚簇存储）
 CREATE TABLE IF NOT EXISTS kline_data (
-    symbol TEXT,
-    interval TEXT,
-    timestamp TEXT,
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
     open REAL,
     high REAL,
     low REAL,
@@ -21,7 +21,10 @@ CREATE TABLE IF NOT EXISTS kline_data (
     volume REAL,
     quote_volume REAL,
     PRIMARY KEY (symbol, interval, timestamp)
-);
+) WITHOUT ROWID;
+
+-- 按时间横截面读取全市场 K 线
+CREATE INDEX IF NOT EXISTS idx_kline_interval_ts ON kline_data (interval, timestamp);
 
 -- 币种评分结果
 CREATE TABLE IF NOT EXISTS score_result (
@@ -61,3 +64,15 @@ CREATE TABLE IF NOT EXISTS categories (
     PRIMARY KEY (symbol, category)
 );
 
+
+-- 每次评分的分因子得分（长表：symbol × factor × 评分时间）
+CREATE TABLE IF NOT EXISTS coin_scores (
+    symbol TEXT NOT NULL,
+    factor_name TEXT NOT NULL,
+    score REAL,
+    timestamp INTEGER NOT NULL,  -- UTC 毫秒
+    PRIMARY KEY (symbol, factor_name, timestamp)
+) WITHOUT ROWID;
+
+-- 截面查询：某因子在某段时间内的排名
+CREATE INDEX IF NOT EXISTS idx_scores_factor_ts ON coin_scores (factor_name, timestamp, symbol, score);
@@ -0,0 +1,134 @@
+import itertools
+
+ORDER_TYPES = ("market", "limit", "stop")
+SIDES = ("buy", "sell")
+TIME_IN_FORCE = ("gtc", "ioc")
+# 订单状态：pending = 延迟中尚未到达交易所；open = 在簿上等待成交
+OPEN_STATUSES = ("pending", "open", "partially_filled")
+
+_order_ids = itertools.count(1)
+
+
+def make_order(symbol, side, qty, order_type="market", price=None, stop_price=None, tif="gtc", tag=None) -> dict:
+    """
+    Build an order record.
+
+    Parameters:
+    - side (str): 'buy' or 'sell'
+    - qty (float): Quantity in base units, > 0
+    - order_type (str): 'market', 'limit' (needs price) or 'stop' (stop-market, needs stop_price)
+    - tif (str): 'gtc' keeps the unfilled rest working, 'ioc' cancels it after the first fill attempt
+    - tag: Free-form label (e.g. the strategy signal), copied onto the fills
+
+    Returns:
+    - dict: Order with id, status 'pending', filled_qty 0
+    """
+    if side not in SIDES:
+        raise ValueError(f"Unknown side: {side}")
+    if order_type not in ORDER_TYPES:
+        raise ValueError(f"Unknown order type: {order_type}")
+    if tif not in TIME_IN_FORCE:
+        raise ValueError(f"Unknown time in force: {tif}")
+    if not qty > 0:
+        raise ValueError(f"Order qty must be positive: {qty}")
+    if order_type == "limit" and price is None:
+        raise ValueError("Limit order needs a price")
+    if order_type == "stop" and stop_price is None:
+        raise ValueError("Stop order needs a stop_price")
+    return {
+        'id': next(_order_ids),
+        'symbol': symbol,
+        'side': side,
+        'type': order_type,
+        'qty': float(qty),
+        'price': price,
+        'stop_price': stop_price,
+        'tif': tif,
+        'tag': tag,
+        'status': 'pending',
+        'filled_qty': 0.0,
+        'avg_price': None,
+        'fee': 0.0,
+        'created_at': None,
+        'updated_at': None,
+    }
+
+
+def is_open(order: dict) -> bool:
+    return order['status'] in OPEN_STATUSES
+
+
+class BrokerInterface:
+    """
+    Common interface for the simulated and the real broker.
+
+    Orders and fills are plain dicts (see make_order()). A fill is
+    {order_id, symbol, side, qty, price, fee, liquidity ('maker' / 'taker'),
+    timestamp, tag}. Strategy code only talks to an OrderExecutor, which
+    talks to a broker through these methods, so the same order path runs in
+    backtests, paper trading and live trading.
+    """
+
+    def __init__(self):
+        self.positions = {}  # symbol -> 带符号持仓数量，多为正、空为负
+        self._fill_callbacks = []
+
+    def submit_order(self, order: dict) -> dict:
+        """Send an order; returns the same record, updated in place as it fills."""
+        raise NotImplementedError
+
+    def cancel_order(self, order_id) -> bool:
+        """Cancel the unfilled rest of an order; returns False if it was no longer open."""
+        raise NotImplementedError
+
+    def get_order(self, order_id) -> dict:
+        raise NotImplementedError
+
+    def open_orders(self, symbol=None) -> list:
+        raise NotImplementedError
+
+    def process_bar(self, symbol, bar: dict) -> list:
+        """
+        Feed one closed bar (timestamp, open, high, low, close, volume) of a
+        symbol. Brokers that execute against a market model use it to fill
+        working orders; a real broker only uses it to poll its fills.
+
+        Returns:
+        - list: Fills produced by this bar
+        """
+        return []
+
+    def position(self, symbol) -> float:
+        return self.positions.get(symbol, 0.0)
+
+    def on_fill(self, callback):
+        """Register callback(fill); usable as a decorator."""
+        self._fill_callbacks.append(callback)
+        return callback
+
+    def _record_fill(self, order, qty, price, fee, liquidity, timestamp) -> dict:
+        """Apply one fill to the order and the position, then notify the callbacks."""
+        filled = order['filled_qty'] + qty
+        order['avg_price'] = price if not order['filled_qty'] else \
+            (order['avg_price'] * order['filled_qty'] + price * qty) / filled
+        order['filled_qty'] = filled
+        order['fee'] += fee
+        order['updated_at'] = timestamp
+        order['status'] = 'filled' if filled >= order['qty'] * (1 - 1e-12) else 'partially_filled'
+
+        sign = 1.0 if order['side'] == 'buy' else -1.0
+        self.positions[order['symbol']] = self.positions.get(order['symbol'], 0.0) + sign * qty
+        fill = {
+            'order_id': order['id'],
+            'symbol': order['symbol'],
+            'side': order['side'],
+            'qty': qty,
+            'price': price,
+            'fee': fee,
+            'liquidity': liquidity,
+            'timestamp': timestamp,
+            'tag': order['tag'],
+        }
+        for callback in self._fill_callbacks:
+            callback(fill)
+        return fill
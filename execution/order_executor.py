@@ -0,0 +1,66 @@
+from execution.broker_interface import BrokerInterface, is_open, make_order
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+ENTRY_SIDES = {'long': 'buy', 'short': 'sell'}
+EXIT_SIDES = {'long': 'sell', 'short': 'buy'}
+
+
+class OrderExecutor:
+    """
+    The one order path shared by the backtest engine and live trading.
+
+    Strategy decisions (open / close a long or short position, or place
+    limit / stop orders) become order records sent to a BrokerInterface;
+    the broker is a SimulatedBroker in backtests and paper trading and an
+    exchange adapter in live trading. Bars are forwarded with on_bar() so a
+    simulated broker can fill working orders.
+    """
+
+    def __init__(self, broker: BrokerInterface):
+        self.broker = broker
+
+    def submit(self, symbol, side, qty, order_type="market", price=None, stop_price=None,
+               tif="gtc", tag=None) -> dict:
+        order = make_order(symbol, side, qty, order_type, price, stop_price, tif, tag)
+        logger.debug(f"Submitting order: {order}")
+        return self.broker.submit_order(order)
+
+    def market(self, symbol, side, qty, tif="gtc", tag=None) -> dict:
+        return self.submit(symbol, side, qty, "market", tif=tif, tag=tag)
+
+    def limit(self, symbol, side, qty, price, tif="gtc", tag=None) -> dict:
+        return self.submit(symbol, side, qty, "limit", price=price, tif=tif, tag=tag)
+
+    def stop(self, symbol, side, qty, stop_price, tif="gtc", tag=None) -> dict:
+        return self.submit(symbol, side, qty, "stop", stop_price=stop_price, tif=tif, tag=tag)
+
+    def open_position(self, symbol, direction, qty, tag=None) -> dict:
+        """
+        Market entry for 'long' / 'short'. Sent IOC: whatever cannot fill right
+        away (e.g. beyond the volume cap) is dropped instead of chasing the price.
+        """
+        return self.market(symbol, ENTRY_SIDES[direction], qty, tif="ioc", tag=tag)
+
+    def close_position(self, symbol, direction, qty, tag=None) -> dict:
+        """Market exit of a 'long' / 'short' position; kept working until fully filled."""
+        return self.market(symbol, EXIT_SIDES[direction], qty, tif="gtc", tag=tag)
+
+    def close_at(self, symbol, direction, qty, price, reason) -> dict:
+        """Resting exit at a price level: a stop order for 'stop_loss', a limit order for 'take_profit'."""
+        side = EXIT_SIDES[direction]
+        if reason == 'stop_loss':
+            return self.stop(symbol, side, qty, price, tag=reason)
+        return self.limit(symbol, side, qty, price, tag=reason)
+
+    def cancel(self, order_id) -> bool:
+        return self.broker.cancel_order(order_id)
+
+    def on_bar(self, symbol, bar: dict) -> list:
+        """Forward a closed bar to the broker; returns the fills it produced."""
+        return self.broker.process_bar(symbol, bar)
+
+    @staticmethod
+    def done(order) -> bool:
+        return not is_open(order)
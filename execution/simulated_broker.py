@@ -0,0 +1,358 @@
+import heapq
+import itertools
+import math
+import random
+
+import pandas as pd
+
+from execution.broker_interface import BrokerInterface, is_open
+
+
+# === Slippage / latency models ===
+
+class FixedSlippage:
+    """Taker fills are `pct` worse than the reference price."""
+
+    def __init__(self, pct=0.0):
+        self.pct = pct
+
+    def _pct(self, qty, volume):
+        return self.pct
+
+    def price(self, side, price, qty, volume) -> float:
+        """
+        Parameters:
+        - side (str): 'buy' pays more, 'sell' receives less
+        - price (float): Reference price (last close / bar open / stop level)
+        - qty (float): Quantity of this fill
+        - volume (float): Volume of the bar it fills in
+
+        Returns:
+        - float: Fill price
+        """
+        pct = self._pct(qty, volume)
+        return price * (1 + pct) if side == 'buy' else price * (1 - pct)
+
+
+class VolumeSlippage(FixedSlippage):
+    """
+    Fixed spread plus square-root market impact:
+    pct + impact * sqrt(qty / bar volume).
+    """
+
+    def __init__(self, pct=0.0, impact=0.1):
+        super().__init__(pct)
+        self.impact = impact
+
+    def _pct(self, qty, volume):
+        if not volume or not math.isfinite(volume):
+            return self.pct
+        return self.pct + self.impact * math.sqrt(qty / volume)
+
+
+class FixedLatency:
+    """Every order reaches the exchange `seconds` after it is submitted."""
+
+    def __init__(self, seconds=0.0):
+        self.seconds = seconds
+
+    def delay(self) -> float:
+        return self.seconds
+
+
+class UniformLatency:
+    """Random delay in [low, high] seconds (seeded, so backtests stay reproducible)."""
+
+    def __init__(self, low=0.0, high=1.0, seed=None):
+        self.low = low
+        self.high = high
+        self.rng = random.Random(seed)
+
+    def delay(self) -> float:
+        return self.rng.uniform(self.low, self.high)
+
+
+def slippage_from_config(spec, default_pct=0.0):
+    """{model: fixed, pct: 0.0005} or {model: volume, pct: 0.0002, impact: 0.1}; pct defaults to default_pct."""
+    spec = spec or {}
+    pct = spec.get('pct')
+    pct = default_pct if pct is None else pct
+    model = spec.get('model', 'fixed')
+    if model == 'fixed':
+        return FixedSlippage(pct)
+    if model == 'volume':
+        return VolumeSlippage(pct, spec.get('impact', 0.1))
+    raise ValueError(f"Unknown slippage model: {model}")
+
+
+def latency_from_config(spec):
+    """{model: fixed, seconds: 0.2} or {model: uniform, low: 0.05, high: 0.5, seed: 7}."""
+    spec = spec or {}
+    model = spec.get('model', 'fixed')
+    if model == 'fixed':
+        return FixedLatency(spec.get('seconds', 0.0))
+    if model == 'uniform':
+        return UniformLatency(spec.get('low', 0.0), spec.get('high', 1.0), spec.get('seed'))
+    raise ValueError(f"Unknown latency model: {model}")
+
+
+# === Order book of one symbol ===
+
+class _Book:
+    """
+    Working orders of one symbol. Each heap holds (key, seq, order_id) so the
+    order closest to triggering is on top and ties keep submission order;
+    cancelled / filled orders are dropped lazily when they reach the top.
+    """
+
+    def __init__(self):
+        self.pending = []      # (active_at, seq, id)：延迟中，尚未到达
+        self.markets = {}      # id -> None：未成交完的市价单（按提交顺序）
+        self.buy_limits = []   # (-price, seq, id)：最高买价在顶
+        self.sell_limits = []  # (price, seq, id)：最低卖价在顶
+        self.buy_stops = []    # (stop, seq, id)：最低触发价在顶
+        self.sell_stops = []   # (-stop, seq, id)：最高触发价在顶
+
+    def __bool__(self):
+        return bool(self.pending or self.markets or self.buy_limits or self.sell_limits
+                    or self.buy_stops or self.sell_stops)
+
+
+class SimulatedBroker(BrokerInterface):
+    """
+    Bar-driven exchange simulator for backtests and paper trading.
+
+    Supports market, limit and stop-market orders with GTC / IOC time in
+    force. Each process_bar() call works the symbol's orders against that bar:
+    unfinished market orders fill at the open, orders whose latency has
+    elapsed arrive at the open, stops trigger when the bar trades through
+    them (gaps fill at the open) and resting limits fill at their price when
+    the bar reaches it. Taker fills pay slippage and the taker fee, resting
+    limit fills the maker fee.
+
+    With max_participation set, fills in one bar are capped to that share of
+    the bar's volume and the rest of an order stays working (partial fills).
+
+    Orders submitted between bars are stamped with the last processed bar;
+    with zero latency a market order fills at once against that bar's close.
+    Triggers are kept in heaps keyed by price, so a bar only touches the
+    orders it actually fills and 100k+ working orders stay cheap.
+    """
+
+    def __init__(self, slippage=None, latency=None, maker_fee=0.0002, taker_fee=0.0005,
+                 max_participation=None, keep_fills=True):
+        """
+        Parameters:
+        - slippage: FixedSlippage / VolumeSlippage, defaults to no slippage
+        - latency: FixedLatency / UniformLatency, defaults to no latency
+        - maker_fee / taker_fee (float): Fee rates on filled notional
+        - max_participation (float): Max share of a bar's volume filled in that bar, None = unlimited
+        - keep_fills (bool): Keep every fill in self.fills
+        """
+        super().__init__()
+        self.slippage = slippage or FixedSlippage(0.0)
+        self.latency = latency or FixedLatency(0.0)
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.max_participation = max_participation
+        self.keep_fills = keep_fills
+
+        self.orders = {}   # id -> order（全部订单）
+        self._open = {}    # id -> order（未完结订单）
+        self.books = {}
+        self.quotes = {}   # symbol -> 最近处理的 K 线：timestamp / close / volume / 剩余可成交量
+        self.fills = []
+        self._seq = itertools.count()
+        self._out = []
+
+    @classmethod
+    def from_config(cls, cfg: dict, backtest_config: dict = None) -> "SimulatedBroker":
+        """
+        Build from configs/execution/simulated.yaml; slippage pct and fees left
+        empty there fall back to slippage_pct / commission_pct of configs/backtest.yaml.
+        """
+        cfg = cfg or {}
+        backtest_config = backtest_config or {}
+        fees = cfg.get('fees') or {}
+        # commission_pct 在旧引擎中按一次往返收取，拆成每边一半
+        commission = backtest_config.get('commission_pct', 0.001) / 2
+        return cls(
+            slippage=slippage_from_config(cfg.get('slippage'), backtest_config.get('slippage_pct', 0.0)),
+            latency=latency_from_config(cfg.get('latency')),
+            maker_fee=commission if fees.get('maker') is None else fees['maker'],
+            taker_fee=commission if fees.get('taker') is None else fees['taker'],
+            max_participation=cfg.get('max_participation'),
+            keep_fills=cfg.get('keep_fills', True),
+        )
+
+    # === BrokerInterface ===
+
+    def submit_order(self, order: dict) -> dict:
+        symbol = order['symbol']
+        quote = self.quotes.get(symbol)
+        now = quote['timestamp'] if quote else None
+        order['created_at'] = now
+        self.orders[order['id']] = order
+        self._open[order['id']] = order
+        book = self._book(symbol)
+
+        delay = self.latency.delay()
+        if quote is None or delay > 0:
+            # 尚无行情或有网络延迟：等到 active_at 之后的第一根 K 线开盘时到达
+            active_at = pd.Timestamp.min if now is None else now + pd.Timedelta(seconds=delay)
+            heapq.heappush(book.pending, (active_at, next(self._seq), order['id']))
+            return order
+
+        self._out = []
+        self._arrive(book, order, quote['close'], now)
+        self._finish_fills()
+        return order
+
+    def cancel_order(self, order_id) -> bool:
+        order = self._open.pop(order_id, None)
+        if order is None:
+            return False
+        order['status'] = 'cancelled'
+        self.books[order['symbol']].markets.pop(order_id, None)
+        return True
+
+    def get_order(self, order_id) -> dict:
+        return self.orders.get(order_id)
+
+    def open_orders(self, symbol=None) -> list:
+        return [o for o in self._open.values() if symbol is None or o['symbol'] == symbol]
+
+    def process_bar(self, symbol, bar: dict) -> list:
+        ts = bar['timestamp']
+        quote = self.quotes.get(symbol)
+        if quote is not None and quote['timestamp'] == ts:
+            return []  # 同一根 K 线只撮合一次
+        volume = bar.get('volume', math.inf)
+        budget = volume * self.max_participation \
+            if self.max_participation is not None and math.isfinite(volume) else math.inf
+        self.quotes[symbol] = {'timestamp': ts, 'close': bar['close'], 'volume': volume, 'budget': budget}
+
+        book = self.books.get(symbol)
+        if not book:
+            return []
+        self._out = []
+        open_, high, low = bar['open'], bar['high'], bar['low']
+
+        # 1. 上一根未成交完的市价单按开盘价继续成交
+        for order_id in list(book.markets):
+            self._take(book, self._open[order_id], open_, ts)
+
+        # 2. 延迟结束的订单在开盘时到达
+        while book.pending and book.pending[0][0] <= ts:
+            order = self._open.get(heapq.heappop(book.pending)[2])
+            if order is not None:
+                self._arrive(book, order, open_, ts)
+
+        # 3. 止损单：K 线穿过触发价后按市价成交，跳空则按开盘价
+        while book.buy_stops and book.buy_stops[0][0] <= high:
+            stop, _, order_id = heapq.heappop(book.buy_stops)
+            if order_id in self._open:
+                self._trigger(book, self._open[order_id], max(open_, stop), ts)
+        while book.sell_stops and -book.sell_stops[0][0] >= low:
+            stop, _, order_id = heapq.heappop(book.sell_stops)
+            if order_id in self._open:
+                self._trigger(book, self._open[order_id], min(open_, -stop), ts)
+
+        # 4. 挂单：价格触及即按限价成交（maker）
+        self._match_limits(book, book.buy_limits, lambda key: -key >= low, ts)
+        self._match_limits(book, book.sell_limits, lambda key: key <= high, ts)
+
+        self._finish_fills()
+        return self._out
+
+    # === Matching ===
+
+    def _book(self, symbol) -> _Book:
+        if symbol not in self.books:
+            self.books[symbol] = _Book()
+        return self.books[symbol]
+
+    def _budget(self, symbol, qty) -> float:
+        quote = self.quotes[symbol]
+        qty = min(qty, quote['budget'])
+        quote['budget'] -= qty
+        return qty
+
+    def _fill(self, order, qty, price, liquidity, ts):
+        fee = qty * price * (self.maker_fee if liquidity == 'maker' else self.taker_fee)
+        self._out.append(self._record_fill(order, qty, price, fee, liquidity, ts))
+        if not is_open(order):
+            self._open.pop(order['id'], None)
+
+    def _take(self, book, order, ref_price, ts, limit=None):
+        """Taker fill of as much of the order as this bar allows; the rest keeps working unless IOC."""
+        symbol = order['symbol']
+        qty = self._budget(symbol, order['qty'] - order['filled_qty'])
+        if qty > 0:
+            price = self.slippage.price(order['side'], ref_price, qty, self.quotes[symbol]['volume'])
+            if limit is not None:
+                price = min(price, limit) if order['side'] == 'buy' else max(price, limit)
+            self._fill(order, qty, price, 'taker', ts)
+        if not is_open(order):
+            book.markets.pop(order['id'], None)
+        elif order['tif'] == 'ioc':
+            self.cancel_order(order['id'])
+        elif limit is None:
+            book.markets[order['id']] = None
+        return is_open(order)
+
+    def _arrive(self, book, order, price, ts):
+        """Order reaches the exchange while the market trades at `price`."""
+        order['status'] = 'open' if not order['filled_qty'] else order['status']
+        side, seq = order['side'], next(self._seq)
+        if order['type'] == 'market':
+            self._take(book, order, price, ts)
+        elif order['type'] == 'limit':
+            limit = order['price']
+            marketable = price <= limit if side == 'buy' else price >= limit
+            if marketable and not self._take(book, order, price, ts, limit=limit):
+                return
+            if order['tif'] == 'ioc':
+                self.cancel_order(order['id'])
+            elif side == 'buy':
+                heapq.heappush(book.buy_limits, (-limit, seq, order['id']))
+            else:
+                heapq.heappush(book.sell_limits, (limit, seq, order['id']))
+        else:
+            stop = order['stop_price']
+            if (price >= stop) if side == 'buy' else (price <= stop):
+                self._trigger(book, order, price, ts)
+            elif side == 'buy':
+                heapq.heappush(book.buy_stops, (stop, seq, order['id']))
+            else:
+                heapq.heappush(book.sell_stops, (-stop, seq, order['id']))
+
+    def _trigger(self, book, order, price, ts):
+        # 触发后等同市价单，未成交部分下一根继续
+        self._take(book, order, price, ts)
+
+    def _match_limits(self, book, heap, touched, ts):
+        while heap and touched(heap[0][0]):
+            key, seq, order_id = heap[0]
+            order = self._open.get(order_id)
+            if order is None:
+                heapq.heappop(heap)
+                continue
+            qty = self._budget(order['symbol'], order['qty'] - order['filled_qty'])
+            if qty <= 0:
+                return  # 本根成交量已用完，剩余挂单留在簿上
+            self._fill(order, qty, order['price'], 'maker', ts)
+            if not is_open(order):
+                heapq.heappop(heap)
+
+    def _finish_fills(self):
+        if self.keep_fills:
+            self.fills.extend(self._out)
+
+    # === Reporting ===
+
+    def fee_rate(self, liquidity='taker') -> float:
+        return self.maker_fee if liquidity == 'maker' else self.taker_fee
+
+    def fills_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.fills)
@@ -1,32 +1,24 @@
 import pandas as pd
+from indicators.vol_heatmap import classify_volume
 
 def calculate_volume_heatmap(df, length=610, slength=610,
                               threshold_extra_high=4.0,
                               threshold_high=2.5,
                               threshold_medium=1.0,
                               threshold_normal=-0.5):
-    df = df.copy()
+    df = df.copy(deep=False)
     df["vol_ma"] = df["volume"].rolling(window=length, min_periods=1).mean()
     df["vol_std"] = df["volume"].rolling(window=slength, min_periods=1).std()
     df["stdbar"] = (df["volume"] - df["vol_ma"]) / df["vol_std"]
 
-    def classify_volume(stdbar):
-        if pd.isna(stdbar):
-            return "unknown", -1
-        elif stdbar > threshold_extra_high:
-            return "extra_high", 4
-        elif stdbar > threshold_high:
-            return "high", 3
-        elif stdbar > threshold_medium:
-            return "medium", 2
-        elif stdbar > threshold_normal:
-            return "normal", 1
-        else:
-            return "low", 0
-
-    result = df["stdbar"].apply(lambda x: classify_volume(x))
-    df["volume_category"] = result.apply(lambda x: x[0])
-    df["volume_rank"] = result.apply(lambda x: x[1])
+    category, rank = classify_volume(df["stdbar"], {
+        "extra_high": threshold_extra_high,
+        "high": threshold_high,
+        "medium": threshold_medium,
+        "normal": threshold_normal,
+    })
+    df["volume_category"] = pd.Series(category, index=df.index)
+    df["volume_rank"] = rank
     return df
 
 import pandas as pd
@@ -55,7 +47,7 @@ def generate_luxalgo_sr_breaks(df, left_bars=15, right_bars=15, volume_thresh=20
             - vol_osc (volume oscillator %)
             - resistance_break, support_break (bool)
     """
-    df = df.copy()
+    df = df.copy(deep=False)
 
     def find_pivot_high(series):
         return series == series.rolling(window=left_bars + right_bars + 1, center=True).max()
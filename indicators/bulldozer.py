@@ -3,23 +3,32 @@ import numpy as np
 import mplfinance as mpf
 from indicators.vol_heatmap import VolumeHeatmapIndicator
 from indicators.base_indicator import BaseIndicator
+from indicators.cache import get_indicator_cache
 
 class BulldozerV2Pattern(BaseIndicator):
+    CONSOLIDATION_MAX_LENGTH = 100  # 整理段最多向后扫描的K线数
+
     def __init__(self):
         self.heatmap = VolumeHeatmapIndicator()
         self.init_segments = []
         self.consolidation_segments = []
         self.breakout_points = []
+        self._df = None
+        self._consolidation_by_init = []  # 每个启动段对应的整理段（或 None）
+        self._open_scans = set()  # 扫描到数据末尾仍未结束的启动段下标，新K线到来时需要重扫
 
     def calculate_atr(self, df, period=14):
+        return get_indicator_cache().get_or_compute(df, ["high", "low", "close"], "atr", {"period": period},
+                                                    lambda: self._atr(df, period))
+
+    def _atr(self, df, period):
         high_low = df['high'] - df['low']
         high_close = np.abs(df['high'] - df['close'].shift(1))
         low_close = np.abs(df['low'] - df['close'].shift(1))
         tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
         return tr.rolling(window=period).mean()
 
-    def calculate(self, df):
-        df = df.copy()
+    def _features(self, df):
         df = self.heatmap.calculate(df)
         df['return'] = df['close'].pct_change()
         df['atr'] = self.calculate_atr(df, period=14)
@@ -29,40 +38,92 @@ class BulldozerV2Pattern(BaseIndicator):
             (df['is_bullish'])
         )
         df['is_volume_hot'] = df['volume_category'].isin(["medium", "high", "extra_high"])
+        return df
 
-        # 启动段识别
+    @property
+    def lookback(self):
+        """Bars of history needed to recompute the feature columns of a new bar."""
+        return max(self.heatmap.length, self.heatmap.slength, 15) + 1
+
+    def calculate(self, df):
+        df = self._features(df.copy(deep=False))  # 只新增列，不改动输入数据
         self.init_segments = []
-        for i in range(len(df) - 4):
-            window = df.iloc[i:i+4]
-            bullish_count = window['is_bullish'].sum()
-            strong_up_count = window['is_strong_up'].sum()
-            hot_vol_count = window['is_volume_hot'].sum()
+        self._consolidation_by_init = []
+        self._open_scans = set()
+        self._scan(df, 0)
+        self._df = df
+        return df
 
-            if bullish_count >= 3 and hot_vol_count >= 2 and strong_up_count >= 3:
-                self.init_segments.append((i, i+3))
+    def update(self, df):
+        """
+        Incremental calculate() for a frame that extends the previous one with new bars.
+
+        Only the new bars' features are computed (from a lookback tail), new
+        init segments are searched in the windows touching new bars, and only
+        consolidation scans that had run into the end of the data are redone.
+        Falls back to a full calculate() if the history does not match.
+        """
+        n_old = 0 if self._df is None else len(self._df)
+        if n_old == 0 or len(df) < n_old or not df.index[:n_old].equals(self._df.index):
+            return self.calculate(df)
+        if len(df) == n_old:
+            return self._df
+
+        start = max(0, n_old - self.lookback)
+        tail = self._features(df.iloc[start:].copy(deep=False))
+        df = pd.concat([self._df, tail.iloc[n_old - start:]])
+        self._scan(df, n_old)
+        self._df = df
+        return df
 
-        # 整理段识别（结构型整理段）
-        self.consolidation_segments = []
-        for (start_idx, end_idx) in self.init_segments:
-            init_high = df.iloc[start_idx:end_idx+1]['high'].max()
-            init_low = df.iloc[start_idx:end_idx+1]['low'].min()
+    def _scan(self, df, n_old):
+        """Detect init segments in windows not seen before and (re)scan open consolidations."""
+        n = len(df)
+        is_bullish = df['is_bullish'].to_numpy(dtype=bool)
+        is_strong_up = df['is_strong_up'].to_numpy(dtype=bool)
+        is_volume_hot = df['is_volume_hot'].to_numpy(dtype=bool)
+        high = df['high'].to_numpy(dtype=float)
+        low = df['low'].to_numpy(dtype=float)
+
+        # 启动段识别：4 根K线窗口内的计数，用累计和相减得到
+        first = max(0, n_old - 4)
+        if n - 4 > first:
+            def window_count(flags):
+                c = np.concatenate([[0], np.cumsum(flags[first:], dtype=np.int64)])
+                return c[4:] - c[:-4]
+            bullish_count = window_count(is_bullish)[:n - 4 - first]
+            strong_up_count = window_count(is_strong_up)[:n - 4 - first]
+            hot_vol_count = window_count(is_volume_hot)[:n - 4 - first]
+            hits = np.flatnonzero((bullish_count >= 3) & (hot_vol_count >= 2) & (strong_up_count >= 3)) + first
+            for i in hits:
+                self.init_segments.append((int(i), int(i) + 3))
+                self._consolidation_by_init.append(None)
+                self._open_scans.add(len(self.init_segments) - 1)
+
+        # 整理段识别（结构型整理段）：每个启动段在数组上找第一根结束整理的K线
+        for k in sorted(self._open_scans):
+            start_idx, end_idx = self.init_segments[k]
+            init_high = np.fmax.reduce(high[start_idx:end_idx + 1])
+            init_low = np.fmin.reduce(low[start_idx:end_idx + 1])
             resistance = init_high
-            max_length = 100
             cons_start = end_idx + 1
-            cons_end = cons_start
-
-            for i in range(cons_start, min(len(df), cons_start + max_length)):
-                bar = df.iloc[i]
-                if bar['high'] > resistance*1.1 and bar['is_volume_hot'] and bar['is_bullish']:
-                    break  # 整理结束
-                if bar['low'] < init_low * 0.9:
-                    break  # 跌太深，不算整理
-                cons_end = i
-
-            if cons_end > cons_start:
-                self.consolidation_segments.append((cons_start, cons_end))
-
-        return df
+            limit = min(n, cons_start + self.CONSOLIDATION_MAX_LENGTH)
+
+            stop = (
+                ((high[cons_start:limit] > resistance * 1.1) & is_volume_hot[cons_start:limit] &
+                 is_bullish[cons_start:limit]) |  # 整理结束
+                (low[cons_start:limit] < init_low * 0.9)  # 跌太深，不算整理
+            )
+            if stop.any():
+                cons_end = max(cons_start, cons_start + int(stop.argmax()) - 1)
+                self._open_scans.discard(k)
+            else:
+                cons_end = max(cons_start, limit - 1)
+                if limit == cons_start + self.CONSOLIDATION_MAX_LENGTH:
+                    self._open_scans.discard(k)
+            self._consolidation_by_init[k] = (cons_start, cons_end) if cons_end > cons_start else None
+
+        self.consolidation_segments = [seg for seg in self._consolidation_by_init if seg is not None]
 
     def plot(self, df):
         apds = []
@@ -0,0 +1,120 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def _nbytes(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    return 64
+
+
+def fingerprint(df: pd.DataFrame, columns) -> tuple:
+    """
+    Identify the version of the input data an indicator is computed from.
+
+    Frames tagged by the fetchers with df.attrs["symbol"] / ["bar"] (and
+    ["exchange"]) and a
+    DatetimeIndex are identified cheaply by (symbol, bar, length, first and
+    last timestamp, last row of the input columns); the last row catches an
+    updated, still-forming candle. Anything else falls back to a content
+    hash of the input columns and the index.
+    """
+    columns = [columns] if isinstance(columns, str) else list(columns)
+    symbol, bar = df.attrs.get("symbol"), df.attrs.get("bar")
+    if symbol is not None and bar is not None and isinstance(df.index, pd.DatetimeIndex) and len(df):
+        last = tuple(float(df[c].iloc[-1]) for c in columns)
+        return ("ts", df.attrs.get("exchange"), symbol, bar, len(df), df.index[0].value, df.index[-1].value, last)
+
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(df.index, pd.RangeIndex):
+        h.update(repr((df.index.start, df.index.stop, df.index.step)).encode())
+    else:
+        h.update(pd.util.hash_pandas_object(df.index, index=False).to_numpy().tobytes())
+    for c in columns:
+        h.update(c.encode())
+        h.update(np.ascontiguousarray(df[c].to_numpy(dtype=float)).tobytes())
+    return ("hash", symbol, bar, len(df), h.hexdigest())
+
+
+class IndicatorCache:
+    """
+    Process-wide memo of indicator results.
+
+    Keys are (data fingerprint, indicator name, params); values are the
+    computed Series / DataFrame / arrays. Least recently used entries are
+    evicted once the total size exceeds max_bytes. Cached values are shared
+    between callers and must be treated as read-only: callers assign them
+    into their own frames (which copies) rather than modifying them in place.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, df: pd.DataFrame, columns, name: str, params: dict, compute):
+        """
+        Parameters:
+        - df (pd.DataFrame): Input data
+        - columns (str | list): Input columns the indicator reads
+        - name (str): Indicator name
+        - params (dict): Indicator parameters
+        - compute (callable): () -> result, called on a miss
+
+        Returns:
+        - The cached or freshly computed result
+        """
+        key = (fingerprint(df, columns), name, tuple(sorted(params.items())))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+
+        value = compute()
+        size = _nbytes(value)
+        with self._lock:
+            if key not in self._entries and size <= self.max_bytes:
+                self._entries[key] = (value, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self._bytes -= evicted
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+_cache = IndicatorCache()
+
+
+def get_indicator_cache() -> IndicatorCache:
+    return _cache
+
+
+def cached_ema(df: pd.DataFrame, span: int, adjust=True, column="close") -> pd.Series:
+    """df[column].ewm(span=span, adjust=adjust).mean(), computed once per data version."""
+    return _cache.get_or_compute(df, column, "ema", {"span": span, "adjust": adjust},
+                                 lambda: df[column].ewm(span=span, adjust=adjust).mean())
@@ -1,4 +1,5 @@
 from indicators.base_indicator import BaseIndicator
+from indicators.cache import cached_ema
 import mplfinance as mpf
 class EMAIndicator(BaseIndicator):
     def __init__(self, spans):
@@ -7,7 +8,7 @@ class EMAIndicator(BaseIndicator):
 
     def calculate(self, df):
         for span in self.spans:
-            df[f'EMA{span}'] = df['close'].ewm(span=span).mean()
+            df[f'EMA{span}'] = cached_ema(df, span)
         return df
 
     def plot(self, df):
@@ -1,14 +1,20 @@
 # file: indicators/rsi.py
 
 import pandas as pd
+from indicators.cache import get_indicator_cache
 
 class RSIIndicator:
     def __init__(self, period: int = 14):
         self.period = period
 
     def calculate(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
-        delta = df["close"].diff()
+        df = df.copy(deep=False)
+        df["rsi"] = get_indicator_cache().get_or_compute(
+            df, "close", "rsi", {"period": self.period}, lambda: self._rsi(df["close"]))
+        return df  # ✅ 保留所有原始列，包括 timestamp
+
+    def _rsi(self, close: pd.Series) -> pd.Series:
+        delta = close.diff()
 
         gain = delta.where(delta > 0, 0)
         loss = -delta.where(delta < 0, 0)
@@ -17,6 +23,4 @@ class RSIIndicator:
         avg_loss = loss.rolling(window=self.period, min_periods=self.period).mean()
 
         rs = avg_gain / (avg_loss + 1e-10)  # 防止除以0
-        df["rsi"] = 100 - (100 / (1 + rs))
-
-        return df  # ✅ 保留所有原始列，包括 timestamp
+        return 100 - (100 / (1 + rs))
@@ -0,0 +1,311 @@
+import copy
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from indicators.vol_heatmap import VOLUME_CATEGORIES
+
+
+class StreamingIndicator:
+    """
+    Incremental counterpart of BaseIndicator.
+
+    update(bar) consumes one closed candle and returns the latest value using
+    constant-size state, so live code only processes the newest bar instead of
+    recomputing over the whole frame. Values match the batch indicators
+    (pandas rolling / ewm) for the same bars up to float rounding.
+    """
+
+    def update(self, bar):
+        raise NotImplementedError
+
+    @property
+    def value(self):
+        raise NotImplementedError
+
+    def warm_up(self, df: pd.DataFrame):
+        """Feed historical bars in order; returns the value after the last one."""
+        for bar in df.to_dict("records"):
+            self.update(bar)
+        return self.value
+
+    def snapshot(self) -> dict:
+        """Copy of the internal state (plain Python types, safe to pickle / JSON)."""
+        state = {}
+        for key, val in self.__dict__.items():
+            if isinstance(val, deque):
+                state[key] = {"deque": list(val), "maxlen": val.maxlen}
+            elif isinstance(val, StreamingIndicator):
+                state[key] = {"indicator": val.snapshot()}
+            else:
+                state[key] = copy.deepcopy(val)
+        return state
+
+    def restore(self, state: dict):
+        for key, val in state.items():
+            if isinstance(val, dict) and "deque" in val:
+                setattr(self, key, deque(val["deque"], maxlen=val["maxlen"]))
+            elif isinstance(val, dict) and "indicator" in val:
+                getattr(self, key).restore(val["indicator"])
+            else:
+                setattr(self, key, copy.deepcopy(val))
+        return self
+
+
+class StreamingEMA(StreamingIndicator):
+    """
+    Same as Series.ewm(span=span).mean() (adjust=True): keeps the weighted
+    sum and the sum of weights, y_t = num_t / den_t.
+    """
+
+    def __init__(self, span, field="close"):
+        self.span = span
+        self.field = field
+        self.decay = 1 - 2 / (span + 1)
+        self.num = 0.0
+        self.den = 0.0
+
+    def update(self, bar):
+        x = float(bar[self.field])
+        self.num *= self.decay
+        self.den *= self.decay
+        if not math.isnan(x):  # NaN 不参与加权，但旧权重照常衰减（ignore_na=False）
+            self.num += x
+            self.den += 1.0
+        return self.value
+
+    @property
+    def value(self):
+        return self.num / self.den if self.den > 0 else float("nan")
+
+
+class RollingStats(StreamingIndicator):
+    """
+    Rolling mean / sample std over the last `window` values with a ring
+    buffer and Welford add/remove updates. The moments are rebuilt from the
+    buffer once per window to keep rounding drift bounded.
+    """
+
+    def __init__(self, window, min_periods=None, field="volume"):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.field = field
+        self.buffer = deque(maxlen=window)
+        self.count = 0
+        self.mean_ = 0.0
+        self.m2 = 0.0
+        self.updates = 0
+
+    def _add(self, x):
+        self.count += 1
+        delta = x - self.mean_
+        self.mean_ += delta / self.count
+        self.m2 += delta * (x - self.mean_)
+
+    def _remove(self, x):
+        if self.count == 1:
+            self.count, self.mean_, self.m2 = 0, 0.0, 0.0
+            return
+        self.count -= 1
+        delta = x - self.mean_
+        self.mean_ -= delta / self.count
+        self.m2 -= delta * (x - self.mean_)
+
+    def _rebuild(self):
+        values = np.array([v for v in self.buffer if not math.isnan(v)], dtype=float)
+        self.count = len(values)
+        self.mean_ = float(values.mean()) if self.count else 0.0
+        self.m2 = float(((values - self.mean_) ** 2).sum()) if self.count else 0.0
+
+    def update(self, bar):
+        x = float(bar[self.field]) if not isinstance(bar, (int, float)) else float(bar)
+        if len(self.buffer) == self.window:
+            old = self.buffer[0]
+            if not math.isnan(old):
+                self._remove(old)
+        self.buffer.append(x)
+        if not math.isnan(x):
+            self._add(x)
+        self.updates += 1
+        if self.updates % self.window == 0:
+            self._rebuild()
+        return self.value
+
+    @property
+    def mean(self):
+        return self.mean_ if self.count >= max(self.min_periods, 1) else float("nan")
+
+    @property
+    def std(self):
+        if self.count < max(self.min_periods, 2):
+            return float("nan")
+        return math.sqrt(max(self.m2, 0.0) / (self.count - 1))
+
+    @property
+    def value(self):
+        return self.mean
+
+
+class StreamingRSI(StreamingIndicator):
+    """Same as RSIIndicator: simple rolling means of gains / losses over `period` bars."""
+
+    def __init__(self, period=14, field="close"):
+        self.period = period
+        self.field = field
+        self.prev = None
+        self.gains = RollingStats(period, field="gain")
+        self.losses = RollingStats(period, field="loss")
+
+    def update(self, bar):
+        x = float(bar[self.field])
+        delta = float("nan") if self.prev is None else x - self.prev
+        self.prev = x
+        # 与 Series.where 一致：NaN 的差值当作 0
+        self.gains.update(delta if delta > 0 else 0.0)
+        self.losses.update(-delta if delta < 0 else 0.0)
+        return self.value
+
+    @property
+    def value(self):
+        rs = self.gains.mean / (self.losses.mean + 1e-10)  # 防止除以0
+        return 100 - (100 / (1 + rs))
+
+
+class StreamingATR(StreamingIndicator):
+    """Same as BulldozerV2Pattern.calculate_atr(): rolling mean of the true range."""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_close = None
+        self.tr = RollingStats(period, field="tr")
+
+    def update(self, bar):
+        high, low, close = float(bar["high"]), float(bar["low"]), float(bar["close"])
+        ranges = [high - low]
+        if self.prev_close is not None:
+            ranges += [abs(high - self.prev_close), abs(low - self.prev_close)]
+        ranges = [r for r in ranges if not math.isnan(r)]
+        self.prev_close = close
+        return self.tr.update(max(ranges) if ranges else float("nan"))
+
+    @property
+    def value(self):
+        return self.tr.mean
+
+
+class StreamingVolumeHeatmap(StreamingIndicator):
+    """Same as VolumeHeatmapIndicator.calculate() for the latest bar."""
+
+    def __init__(self, length=610, slength=610,
+                 threshold_extra_high=4.0, threshold_high=2.5,
+                 threshold_medium=1.0, threshold_normal=-0.5):
+        self.thresholds = {
+            "extra_high": threshold_extra_high,
+            "high": threshold_high,
+            "medium": threshold_medium,
+            "normal": threshold_normal
+        }
+        self.ma = RollingStats(length, min_periods=1, field="volume")
+        self.sd = self.ma if slength == length else RollingStats(slength, min_periods=1, field="volume")
+        self.last = {}
+
+    def update(self, bar):
+        volume = float(bar["volume"])
+        self.ma.update(volume)
+        if self.sd is not self.ma:
+            self.sd.update(volume)
+        vol_ma, vol_std = self.ma.mean, self.sd.std
+        if vol_std != 0 or math.isnan(vol_std):
+            stdbar = (volume - vol_ma) / vol_std
+        else:
+            stdbar = math.copysign(math.inf, volume - vol_ma) if volume != vol_ma else float("nan")
+        # 单个值直接比较阈值，与 classify_volume() 的分箱相同
+        rank = -1 if math.isnan(stdbar) else 0
+        if rank == 0:
+            for k, cat in enumerate(("extra_high", "high", "medium", "normal")):
+                if stdbar > self.thresholds[cat]:
+                    rank = 4 - k
+                    break
+        self.last = {
+            "vol_ma": vol_ma,
+            "vol_std": vol_std,
+            "stdbar": stdbar,
+            "volume_category": VOLUME_CATEGORIES[rank + 1],
+            "volume_rank": rank,
+        }
+        return self.last
+
+    def snapshot(self) -> dict:
+        state = super().snapshot()
+        state["shared_window"] = self.sd is self.ma
+        if state["shared_window"]:
+            state.pop("sd")
+        return state
+
+    def restore(self, state: dict):
+        state = dict(state)
+        shared = state.pop("shared_window", False)
+        super().restore(state)
+        if shared:
+            self.sd = self.ma
+        return self
+
+    @property
+    def value(self):
+        return self.last
+
+
+class IndicatorStreams:
+    """
+    Streaming indicators for many symbols.
+
+    update_frame() feeds only the bars newer than the last one seen for a
+    symbol, so an hourly rescoring pass over a refreshed K-line frame costs
+    one update per new bar instead of a full recomputation.
+    """
+
+    def __init__(self, factory):
+        """
+        Parameters:
+        - factory (callable): () -> dict name -> StreamingIndicator, called once per symbol
+        """
+        self.factory = factory
+        self.indicators = {}
+        self.last_timestamp = {}
+
+    def update(self, symbol, bar, timestamp=None) -> dict:
+        if symbol not in self.indicators:
+            self.indicators[symbol] = self.factory()
+        values = {name: ind.update(bar) for name, ind in self.indicators[symbol].items()}
+        if timestamp is not None:
+            self.last_timestamp[symbol] = timestamp
+        return values
+
+    def update_frame(self, symbol, df: pd.DataFrame) -> dict:
+        """Feed the rows of df (indexed by timestamp) that are newer than the last seen one."""
+        last = self.last_timestamp.get(symbol)
+        new = df if last is None else df[df.index > last]
+        for timestamp, bar in zip(new.index, new.to_dict("records")):
+            self.update(symbol, bar, timestamp)
+        return self.latest(symbol)
+
+    def latest(self, symbol) -> dict:
+        return {name: ind.value for name, ind in self.indicators.get(symbol, {}).items()}
+
+    def snapshot(self) -> dict:
+        return {
+            "indicators": {s: {name: ind.snapshot() for name, ind in inds.items()}
+                           for s, inds in self.indicators.items()},
+            "last_timestamp": dict(self.last_timestamp),
+        }
+
+    def restore(self, state: dict):
+        self.indicators = {}
+        for symbol, inds in state["indicators"].items():
+            self.indicators[symbol] = self.factory()
+            for name, ind_state in inds.items():
+                self.indicators[symbol][name].restore(ind_state)
+        self.last_timestamp = dict(state["last_timestamp"])
+        return self
@@ -1,6 +1,38 @@
 from indicators.base_indicator import BaseIndicator
+from indicators.cache import get_indicator_cache
 import mplfinance as mpf
+import numpy as np
 import pandas as pd
+
+# 按 volume_rank 排序：unknown=-1, low=0, normal=1, medium=2, high=3, extra_high=4
+VOLUME_CATEGORIES = ["unknown", "low", "normal", "medium", "high", "extra_high"]
+
+
+def classify_volume(stdbar, thresholds: dict):
+    """
+    Bin volume z-scores into heatmap categories in one vectorized pass.
+
+    Parameters:
+    - stdbar (pd.Series | np.ndarray): (volume - vol_ma) / vol_std
+    - thresholds (dict): extra_high / high / medium / normal lower bounds (strict >)
+
+    Returns:
+    - (pd.Categorical, np.ndarray): ordered category per bar and its int8 rank (-1 for NaN)
+    """
+    values = np.asarray(stdbar, dtype=float)
+    rank = np.select(
+        [np.isnan(values),
+         values > thresholds["extra_high"],
+         values > thresholds["high"],
+         values > thresholds["medium"],
+         values > thresholds["normal"]],
+        [-1, 4, 3, 2, 1],
+        default=0
+    ).astype(np.int8)
+    category = pd.Categorical.from_codes(rank + 1, categories=VOLUME_CATEGORIES, ordered=True)
+    return category, rank
+
+
 class VolumeHeatmapIndicator(BaseIndicator):
     def __init__(self, length=610, slength=610,
                  threshold_extra_high=4.0, threshold_high=2.5,
@@ -23,24 +55,27 @@ class VolumeHeatmapIndicator(BaseIndicator):
         }
 
     def calculate(self, df):
-        df["vol_ma"] = df["volume"].rolling(window=self.length, min_periods=1).mean()
-        df["vol_std"] = df["volume"].rolling(window=self.slength, min_periods=1).std()
-        df["stdbar"] = (df["volume"] - df["vol_ma"]) / df["vol_std"]
-
-        def classify(std):
-            if pd.isna(std):
-                return "unknown"
-            for cat, th in self.thresholds.items():
-                if std > th:
-                    return cat
-            return "low"
-
-        df["volume_category"] = df["stdbar"].apply(classify)
+        params = {"length": self.length, "slength": self.slength, **self.thresholds}
+        result = get_indicator_cache().get_or_compute(df, "volume", "volume_heatmap", params,
+                                                      lambda: self._compute(df["volume"]))
+        for col in result.columns:
+            df[col] = result[col]
         return df
 
+    def _compute(self, volume: pd.Series) -> pd.DataFrame:
+        result = pd.DataFrame(index=volume.index)
+        result["vol_ma"] = volume.rolling(window=self.length, min_periods=1).mean()
+        result["vol_std"] = volume.rolling(window=self.slength, min_periods=1).std()
+        result["stdbar"] = (volume - result["vol_ma"]) / result["vol_std"]
+
+        category, rank = classify_volume(result["stdbar"], self.thresholds)
+        result["volume_category"] = pd.Series(category, index=volume.index)
+        result["volume_rank"] = rank
+        return result
+
     def plot(self, df):
         if 'volume_category' not in df.columns:
             return []
-        colors = df['volume_category'].map(self.color_map).fillna("#CCCCCC").tolist()
+        colors = df['volume_category'].astype(object).map(self.color_map).fillna("#CCCCCC").tolist()
         return [mpf.make_addplot(df['volume'], type='bar', panel=1, color=colors, width=0.5, ylabel='Volume')]
 
@@ -3,8 +3,36 @@ class RiskChecker:
         self.max_loss_pct = context.risk_config.get("max_single_trade_loss_pct", 0.02)
         self.max_drawdown_pct = context.risk_config.get("max_total_drawdown_pct", 0.2)
         self.max_daily_loss_pct = context.risk_config.get("max_daily_loss_pct", 0.05)
+        # 组合层面的限制（多币种回测）
+        self.max_open_positions = context.risk_config.get("max_open_positions", 10)
+        self.max_gross_exposure_pct = context.risk_config.get("max_gross_exposure_pct", 1.0)
 
     def block_entry(self, size: float) -> bool:
         # 暂时简化，只实现单笔最大亏损
         # 实际应接入账户总权益、当日损失、累计回撤等
-        return False  # 不拦截任何交易，后续可增强
\ No newline at end of file
+        return False  # 不拦截任何交易，后续可增强
+
+    def block_portfolio_entry(self, size: float, book: dict) -> bool:
+        """
+        Book-level entry check for the portfolio engine.
+
+        Parameters:
+        - size (float): Capital of the new position
+        - book (dict): equity, peak_equity, day_start_equity, daily_loss,
+          open_positions, gross_exposure
+
+        Returns:
+        - bool: True if the entry must be blocked
+        """
+        if self.block_entry(size):
+            return True
+        equity = book['equity']
+        if book['open_positions'] >= self.max_open_positions:
+            return True
+        if book['gross_exposure'] + size > equity * self.max_gross_exposure_pct:
+            return True
+        if book['daily_loss'] > book['day_start_equity'] * self.max_daily_loss_pct:
+            return True
+        if book['peak_equity'] > 0 and 1 - equity / book['peak_equity'] > self.max_drawdown_pct:
+            return True
+        return False
@@ -1,8 +1,10 @@
 import pandas as pd
 from data.market_data import OKXDataFetcher
+from data.kline_store import KlineStore
 from core.context import BacktestContext
 from core.strategy_registry import StrategyRegistry
 from backtest.backtest_engine import BacktestEngine
+from backtest.intrabar import IntrabarExits, LowerTimeframe
 from backtest.performance_metrics import analyze_performance
 from execution.trade_logger import TradeLogger
 from risk_management.risk_checker import RiskChecker
@@ -13,11 +15,11 @@ from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-def run():
+def run(offline=False):
     logger.info("Starting backtest run...")
 
-    # 1. 获取K线数据
-    fetcher = OKXDataFetcher()
+    # 1. 获取K线数据（本地缓存，offline 模式下不访问网络）
+    fetcher = OKXDataFetcher(store=KlineStore(), offline=offline)
     df = fetcher.get_kline('BTC-USDT-SWAP', bar='1H')
     logger.info(f"Fetched {len(df)} rows of K-line data.")
 
@@ -38,28 +40,41 @@ def run():
     risk_checker = RiskChecker(ctx)
     logger.info("Initialized trade logger and risk checker.")
 
-    # 5. 初始化并运行回测
+    # 5. 盘中止盈止损：同一根内两个价位都触及时，下钻到低周期K线判断先后
+    intrabar = None
+    bt_cfg = ctx.backtest_config
+    if bt_cfg.get('intrabar_exits'):
+        sub_bar = bt_cfg.get('intrabar_sub_bar')
+        lower = LowerTimeframe.from_fetcher(fetcher, 'BTC-USDT-SWAP', sub_bar) if sub_bar else None
+        intrabar = IntrabarExits(df, lower, bar='1H', ambiguous=bt_cfg.get('intrabar_ambiguous', 'stop_loss'))
+        logger.info(f"Intrabar exits enabled (drill-down: {sub_bar or 'off'}).")
+
+    # 6. 初始化并运行回测
     engine = BacktestEngine(
         strategy_class=strategy_cls,
         data=df,
         context=ctx,
         trade_logger=trade_logger,
-        risk_checker=risk_checker
+        risk_checker=risk_checker,
+        intrabar=intrabar
     )
     logger.info("Backtest engine initialized. Starting engine run...")
     engine.run()
     unrealized = engine.get_unrealized()
+    if intrabar is not None:
+        logger.info(f"Intrabar exits: {intrabar.resolved} bars resolved on lower-timeframe candles, "
+                    f"{intrabar.unresolved} by the '{intrabar.ambiguous}' rule.")
 
-    # 6. 分析绩效
+    # 7. 分析绩效
     trades_df = trade_logger.to_dataframe()
     perf = analyze_performance(trades_df, unrealized=unrealized)
     logger.info("Performance analysis complete.")
 
-    # 7. 输出结果
+    # 8. 输出结果
     logger.info("==== Performance Summary ====")
     logger.info(perf)
 
-    # 8. 可视化（买卖点、收益曲线）
+    # 9. 可视化（买卖点、收益曲线）
     if not trades_df.empty:
         plot_signals_on_price(df, trades_df)
         plot_pnl_curve(trades_df)
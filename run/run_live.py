@@ -0,0 +1,131 @@
+import asyncio
+
+from data.market_data import OKXDataFetcher
+from data.kline_store import KlineStore
+from data.live_feed import LiveFeed, OKXWebSocketSource, ReplaySource, OKX_PUBLIC_WS
+from core.context import BacktestContext
+from core.strategy_loader import load_all_strategies
+from core.strategy_registry import StrategyRegistry
+from execution.order_executor import OrderExecutor
+from execution.simulated_broker import SimulatedBroker
+from indicators.streaming import IndicatorStreams, StreamingATR, StreamingEMA, StreamingRSI
+from utils.config_loader import ConfigLoader
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def run(config_path='configs/live/ma_crossover.yaml', offline=False):
+    """
+    Stream closed candles for the whole universe and evaluate the strategy on
+    every new bar. offline=True replays K-lines from the local KlineStore
+    through ReplaySource instead of connecting to the exchange.
+
+    Entries and exits go through the same OrderExecutor path as the backtest
+    engine, here against a SimulatedBroker fed with the live bars (paper trading).
+    """
+    logger.info("Starting live feed...")
+    load_all_strategies()
+    cfg = ConfigLoader.load(config_path)
+    bar, buffer_size = cfg['bar'], cfg.get('buffer_size', 500)
+
+    ctx = BacktestContext(
+        strategy_config_path=cfg['strategy_config'],
+        backtest_config_path='configs/backtest.yaml',
+        risk_config_path='configs/risk.yaml'
+    )
+    strategy_cls = StrategyRegistry.get(cfg['strategy'])
+
+    # 1. 订阅范围：配置中的币种，或按成交额取前 top_n
+    store = KlineStore()
+    fetcher = OKXDataFetcher(store=store, offline=offline)
+    symbols = cfg.get('symbols') or (
+        store.symbols("okx", bar) if offline else fetcher.get_all_tickers()['instId'].tolist()
+    )[:cfg.get('top_n', 300)]
+    logger.info(f"Subscribing to {len(symbols)} symbols on {bar}")
+
+    # 2. 数据源：交易所 WebSocket，或离线回放本地K线
+    if offline:
+        frames = fetcher.fetch_many(symbols, bar=bar, total=buffer_size + cfg.get('replay_bars', 200))
+        longest = max(len(df) for df in frames.values())
+        source = ReplaySource(frames, bar, start=max(0, longest - cfg.get('replay_bars', 200)),
+                              interval=cfg.get('replay_interval', 0))
+        feed = LiveFeed(symbols, bar, fetcher=source.rest(), candle_source=source, buffer_size=buffer_size)
+    else:
+        ticker_source = OKXWebSocketSource(OKX_PUBLIC_WS) if cfg.get('tickers') else None
+        feed = LiveFeed(symbols, bar, fetcher=fetcher, ticker_source=ticker_source, buffer_size=buffer_size)
+
+    # 3. 下单通道：与回测引擎相同的 OrderExecutor，模拟撮合（纸面交易）
+    broker = SimulatedBroker.from_config(ConfigLoader.load(cfg['execution_config']), ctx.backtest_config)
+    executor = OrderExecutor(broker)
+    capital = cfg.get('capital_per_symbol', 1000)
+    positions = {}  # symbol -> 开仓订单
+
+    @broker.on_fill
+    def on_fill(fill):
+        logger.info(f"[{fill['symbol']}] {fill['timestamp']} fill {fill['side']} {fill['qty']:.6g} "
+                    f"@ {fill['price']:.6g} ({fill['liquidity']}, fee {fill['fee']:.4g}, {fill['tag']})")
+
+    # 策略只在最近 lookback 根上计算指标，而不是整个缓冲区
+    lookback = strategy_cls.lookback(ctx.strategy_config)
+
+    # 4. 每个币种一组流式指标，每根新K线 O(1) 更新
+    streams = IndicatorStreams(lambda: {
+        'ema_fast': StreamingEMA(ctx.strategy_config['short_window']),
+        'ema_slow': StreamingEMA(ctx.strategy_config['long_window']),
+        'rsi': StreamingRSI(14),
+        'atr': StreamingATR(14),
+    })
+
+    @feed.on_bar
+    def on_bar(symbol, bar_data, buffers):
+        executor.on_bar(symbol, bar_data)
+        values = streams.update(symbol, bar_data, bar_data['timestamp'])
+        df = buffers.to_frame(symbol, n=lookback)
+        strategy = strategy_cls(df, config_path=None)
+        strategy.config = ctx.strategy_config
+        strategy.prepare()
+        i, price = len(df) - 1, bar_data['close']
+
+        entry = positions.get(symbol)
+        if entry is not None:
+            # 与回测引擎相同的平仓规则：止盈 / 止损 / 离场信号
+            if entry['filled_qty'] <= 0:
+                if executor.done(entry):
+                    positions.pop(symbol)
+                return
+            entry_price, direction = entry['avg_price'], ('long' if entry['side'] == 'buy' else 'short')
+            long = direction == 'long'
+            take_profit = strategy.take_profit(entry_price, price) if long else strategy.take_profit(price, entry_price)
+            stop_loss = strategy.stop_loss(entry_price, price) if long else strategy.stop_loss(price, entry_price)
+            reason = 'take_profit' if take_profit else 'stop_loss' if stop_loss else \
+                'exit_signal' if strategy.exit_signal(i, entry_price) else None
+            if reason:
+                executor.close_position(symbol, direction, entry['filled_qty'], tag=reason)
+                positions.pop(symbol)
+            return
+
+        signal = strategy.entry_signal(i)
+        if signal:
+            logger.info(f"[{symbol}] {bar_data['timestamp']} {signal} close={price:.6g} "
+                        f"rsi={values['rsi']:.1f} atr={values['atr']:.6g}")
+        score, direction = strategy.entry_score(signal), strategy.entry_direction(signal)
+        if score > 0 and direction in ['long', 'short']:
+            positions[symbol] = executor.open_position(symbol, direction, capital * score / price, tag=signal)
+
+    async def main():
+        await feed.warm_up()
+        for symbol in symbols:
+            streams.update_frame(symbol, feed.buffers.to_frame(symbol))
+        logger.info(f"Warm-up done: {len(feed.buffers)} symbols buffered")
+        await feed.run(warm_up=False)
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("Live feed stopped.")
+    return feed
+
+
+if __name__ == "__main__":
+    run()
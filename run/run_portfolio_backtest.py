@@ -0,0 +1,57 @@
+from data.market_data import OKXDataFetcher
+from data.kline_store import KlineStore
+from core.context import BacktestContext
+from core.strategy_registry import StrategyRegistry
+from core.strategy_loader import load_all_strategies
+from backtest.portfolio_engine import PortfolioBacktestEngine
+from backtest.performance_metrics import analyze_performance
+from execution.trade_logger import TradeLogger
+from risk_management.risk_checker import RiskChecker
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def run(symbols=None, bar='1H', total=8760, offline=False):
+    logger.info("Starting portfolio backtest run...")
+
+    # 1. 获取所有币种的K线（未指定时使用本地缓存里已有的币种）
+    store = KlineStore()
+    fetcher = OKXDataFetcher(store=store, offline=offline)
+    symbols = symbols or store.symbols('okx', bar)
+    frames = {s: df for s, df in fetcher.fetch_many(symbols, bar=bar, total=total).items()
+              if df is not None and not df.empty}
+    logger.info(f"Fetched K-lines for {len(frames)} symbols.")
+
+    # 2. 加载配置
+    ctx = BacktestContext(
+        strategy_config_path='configs/strategy/ma_crossover.yaml',
+        backtest_config_path='configs/backtest.yaml',
+        risk_config_path='configs/risk.yaml'
+    )
+
+    # 3. 运行组合回测
+    trade_logger = TradeLogger()
+    engine = PortfolioBacktestEngine(
+        strategy_class=StrategyRegistry.get("MA_Crossover"),
+        data=frames,
+        context=ctx,
+        trade_logger=trade_logger,
+        risk_checker=RiskChecker(ctx)
+    )
+    engine.run()
+
+    # 4. 分析绩效
+    trades_df = trade_logger.to_dataframe()
+    perf = analyze_performance(trades_df, unrealized=engine.get_unrealized())
+    logger.info("==== Portfolio Performance Summary ====")
+    logger.info(perf)
+    if not trades_df.empty:
+        logger.info("\n" + trades_df.groupby('symbol')['pnl_dollar'].agg(['count', 'sum'])
+                    .sort_values('sum', ascending=False).head(20).to_string())
+    return trades_df, engine.equity_curve()
+
+
+if __name__ == "__main__":
+    load_all_strategies()
+    run()
@@ -0,0 +1,62 @@
+from core.scheduler import Scheduler, trigger_from_config
+from core.strategy_loader import load_all_strategies
+from data.market_data import OKXDataFetcher, BinanceDataFetcher
+from data.kline_store import KlineStore
+from database.db_manager import DBManager
+from utils.config_loader import ConfigLoader
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def build_jobs(scheduler: Scheduler) -> dict:
+    """
+    Job name -> callable. Clients are scheduler resources, created once and
+    shared by every run, so each firing starts with warm connections,
+    rate limiters and K-line stores.
+    """
+    from score_system.scanner import get_top_coins
+    from database.fetch_and_update_metadata import update_all_okx_metadata
+
+    store = scheduler.resource("kline_store", KlineStore)
+    binance = lambda: scheduler.resource("binance", lambda: BinanceDataFetcher(store=store))
+    okx = lambda: scheduler.resource("okx", lambda: OKXDataFetcher(store=store))
+    db = lambda: scheduler.resource("db", DBManager)
+
+    return {
+        'score_scan': lambda: get_top_coins(fetcher=binance()),
+        'okx_metadata': lambda: update_all_okx_metadata(fetcher=okx(), db=db()),
+        'backtest': _run_backtest,
+    }
+
+
+def _run_backtest():
+    # 按需导入：回测依赖的绘图模块较重，未启用该任务时不加载
+    from run.run_backtest import run
+    run()
+
+
+def run(config_path='configs/scheduler.yaml'):
+    logger.info("Starting scheduler...")
+    load_all_strategies()
+    cfg = ConfigLoader.load(config_path)
+
+    scheduler = Scheduler(max_workers=cfg.get('max_workers', 4))
+    jobs = build_jobs(scheduler)
+    for name, job_cfg in cfg['jobs'].items():
+        if not job_cfg.get('enabled', True):
+            continue
+        if name not in jobs:
+            raise ValueError(f"Unknown job in {config_path}: {name}")
+        scheduler.add_job(name, jobs[name], trigger_from_config(job_cfg['trigger']))
+
+    try:
+        scheduler.run_forever(metrics_interval=cfg.get('metrics_interval', 3600))
+    except KeyboardInterrupt:
+        logger.info("Scheduler stopped.")
+        logger.info("\n" + scheduler.metrics().to_string())
+    return scheduler
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,53 @@
+import os
+
+from data.market_data import OKXDataFetcher
+from data.kline_store import KlineStore
+from core.context import BacktestContext
+from core.strategy_loader import load_all_strategies
+from backtest.param_sweep import ParameterSweep
+from utils.config_loader import ConfigLoader
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def run(sweep_config_path='configs/sweep/ma_crossover.yaml', offline=False):
+    logger.info("Starting parameter sweep...")
+    cfg = ConfigLoader.load(sweep_config_path)
+
+    # 1. 获取K线数据（只取一次，之后放入共享内存给所有进程）
+    fetcher = OKXDataFetcher(store=KlineStore(), offline=offline)
+    df = fetcher.get_kline(cfg['symbol'], bar=cfg['bar'])
+    logger.info(f"Fetched {len(df)} rows of K-line data.")
+
+    # 2. 基础配置，网格中的参数覆盖 strategy_config
+    ctx = BacktestContext(
+        strategy_config_path=cfg['strategy_config'],
+        backtest_config_path='configs/backtest.yaml',
+        risk_config_path='configs/risk.yaml'
+    )
+
+    # 3. 并行回测
+    sweep = ParameterSweep(
+        strategy_name=cfg['strategy'],
+        data=df,
+        context=ctx,
+        param_grid=cfg['grid'],
+        constraint=lambda p: p.get('short_window', 0) < p.get('long_window', float('inf')),
+        max_workers=cfg.get('max_workers')
+    )
+    results = sweep.run(rank_by=cfg.get('rank_by', 'total_pnl'))
+
+    # 4. 输出排名
+    os.makedirs('run/reports', exist_ok=True)
+    path = f"run/reports/sweep_{cfg['strategy']}.csv"
+    results.to_csv(path)
+    logger.info(f"==== Top {cfg.get('top_n', 20)} parameter sets ====")
+    logger.info("\n" + results.head(cfg.get('top_n', 20)).to_string())
+    logger.info(f"Full sweep results saved to {path}")
+    return results
+
+
+if __name__ == "__main__":
+    load_all_strategies()
+    run()
@@ -0,0 +1,56 @@
+import os
+
+from data.market_data import OKXDataFetcher
+from data.kline_store import KlineStore
+from core.context import BacktestContext
+from core.strategy_loader import load_all_strategies
+from backtest.walk_forward import WalkForward
+from utils.config_loader import ConfigLoader
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def run(config_path='configs/walk_forward/ma_crossover.yaml', offline=False):
+    logger.info("Starting walk-forward analysis...")
+    cfg = ConfigLoader.load(config_path)
+
+    # 1. 获取一次完整历史，所有窗口共用
+    fetcher = OKXDataFetcher(store=KlineStore(), offline=offline)
+    df = fetcher.get_kline(cfg['symbol'], bar=cfg['bar'], total=cfg.get('total', 8760))
+    logger.info(f"Fetched {len(df)} rows of K-line data.")
+
+    ctx = BacktestContext(
+        strategy_config_path=cfg['strategy_config'],
+        backtest_config_path='configs/backtest.yaml',
+        risk_config_path='configs/risk.yaml'
+    )
+
+    # 2. 滚动窗口：样本内寻优，样本外验证
+    wf = WalkForward(
+        strategy_name=cfg['strategy'],
+        data=df,
+        context=ctx,
+        param_grid=cfg['grid'],
+        in_sample=cfg['in_sample'],
+        out_sample=cfg['out_sample'],
+        step=cfg.get('step'),
+        anchored=cfg.get('anchored', False),
+        constraint=lambda p: p.get('short_window', 0) < p.get('long_window', float('inf')),
+        max_workers=cfg.get('max_workers')
+    )
+    results = wf.run(rank_by=cfg.get('rank_by', 'total_pnl'))
+
+    # 3. 输出
+    os.makedirs('run/reports', exist_ok=True)
+    path = f"run/reports/walk_forward_{cfg['strategy']}.csv"
+    results.to_csv(path, index=False)
+    logger.info("\n" + results.to_string())
+    logger.info(f"==== Out-of-sample summary ==== {wf.summary()}")
+    logger.info(f"Walk-forward results saved to {path}")
+    return results
+
+
+if __name__ == "__main__":
+    load_all_strategies()
+    run()
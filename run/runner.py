@@ -2,11 +2,17 @@ import argparse
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
-    parser.add_argument('--mode', choices=['backtest', 'live'], default='backtest')
+    parser.add_argument('--mode', choices=['backtest', 'sweep', 'walk_forward', 'live', 'scheduler'], default='backtest')
     args = parser.parse_args()
 
     if args.mode == 'backtest':
         from run.run_backtest import run
+    elif args.mode == 'sweep':
+        from run.run_sweep import run
+    elif args.mode == 'walk_forward':
+        from run.run_walk_forward import run
+    elif args.mode == 'scheduler':
+        from run.run_scheduler import run
     else:
         from run.run_live import run
 
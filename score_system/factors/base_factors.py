@@ -1,10 +1,12 @@
 import numpy as np
 from indicators.vol_heatmap import VolumeHeatmapIndicator
+from indicators.cache import cached_ema
+from score_system.factors import panel
 from utils.file_helper import DataIO
+from score_system.score_history import ScoreHistory
 from data.market_data import OKXDataFetcher
-from tqdm import tqdm
+from data.kline_store import KlineStore
 import pandas as pd
-import time
 
 VOLUME_SCORE_MAP = {
     'extra_high': 1.0,
@@ -39,10 +41,10 @@ class EnhancedStrengthScorer:
         return (score / total_weight + 1) / 2 if total_weight > 0 else 0.5
 
     def compute_ema_score(self, df):
-        df = df.copy()
-        df['ema5'] = df['close'].ewm(span=5).mean()
-        df['ema10'] = df['close'].ewm(span=10).mean()
-        df['ema20'] = df['close'].ewm(span=20).mean()
+        df = df.copy(deep=False)
+        df['ema5'] = cached_ema(df, 5)
+        df['ema10'] = cached_ema(df, 10)
+        df['ema20'] = cached_ema(df, 20)
         latest = df.iloc[-1]
 
         if latest['ema5'] > latest['ema10'] > latest['ema20']:
@@ -62,7 +64,7 @@ class EnhancedStrengthScorer:
             if len(df) < p:
                 continue
             segment = df.iloc[-p:]
-            mapped_scores = segment['volume_category'].map(VOLUME_SCORE_MAP).dropna()
+            mapped_scores = segment['volume_category'].astype(object).map(VOLUME_SCORE_MAP).dropna()
             if not mapped_scores.empty:
                 score += mapped_scores.mean()
                 total_weight += 1
@@ -130,32 +132,81 @@ class EnhancedStrengthScorer:
             'enhanced_score': round(total_score, 3)
         }
 
-def get_top_coins(read_cache=False):
+    def score_panel(self, close, volume, symbols, lengths=None) -> pd.DataFrame:
+        """
+        Score many symbols in one vectorized pass.
+
+        Parameters:
+        - close, volume (np.ndarray): time x symbols arrays, right-aligned so the last
+          row is each symbol's latest bar (see panel.build_panel)
+        - symbols (list): Column labels
+        - lengths (np.ndarray): Bars available per symbol, defaults to the non-NaN tail length
+
+        Returns:
+        - pd.DataFrame: Same columns as score(), one row per symbol
+        """
+        close = np.asarray(close, dtype=float)
+        volume = np.asarray(volume, dtype=float)
+        lengths = panel._lengths(close, lengths)
+
+        # 收益 / 动量：1、4、24 根K线收益，只平均有足够历史的周期
+        clipped = [np.clip(panel.lagged_return(close, lengths, p) * 10, -1, 1) for p in (1, 4, 24)]
+        has = [lengths > p for p in (1, 4, 24)]
+        total = sum(np.where(h, c, 0.0) for h, c in zip(has, clipped))
+        count = sum(h.astype(int) for h in has)
+        with np.errstate(invalid="ignore"):
+            return_score = np.where(count > 0, (total / np.maximum(count, 1) + 1) / 2, 0.5)
+        momentum_score = return_score
+
+        ema_score = panel.ema_score(close)
+        volume_score = panel.volume_score(volume, lengths, VOLUME_SCORE_MAP)
+
+        rsi = panel.latest_rsi(close, lengths, eps=1e-6)
+        rsi_score = np.select([rsi >= 70, rsi >= 60, rsi >= 50, rsi >= 40], [1.0, 0.8, 0.6, 0.4], 0.2)
+
+        total_score = (
+            return_score * self.weights['return'] +
+            ema_score * self.weights['ema'] +
+            volume_score * self.weights['volume'] +
+            rsi_score * self.weights['rsi'] +
+            momentum_score * self.weights['momentum']
+        )
+        return pd.DataFrame({
+            'symbol': list(symbols),
+            'return_score': return_score.round(3),
+            'ema_score': ema_score.round(3),
+            'volume_score': volume_score.round(3),
+            'rsi_score': rsi_score.round(3),
+            'momentum_score': momentum_score.round(3),
+            'enhanced_score': total_score.round(3)
+        })
+
+    def score_many(self, frames: dict) -> pd.DataFrame:
+        """score_panel() over a dict of symbol -> K-line DataFrame."""
+        p = panel.build_panel(frames)
+        return self.score_panel(p["close"], p["volume"], p["symbols"], p["lengths"])
+
+
+def get_top_coins(read_cache=False, offline=False):
     if read_cache:
         return DataIO.load("score_result")
-    fetcher = OKXDataFetcher()
+    store = KlineStore()
+    fetcher = OKXDataFetcher(store=store, offline=offline)
     scorer = EnhancedStrengthScorer()
-    tickers = fetcher.get_all_tickers()['instId'].tolist()[:100]
-
-    results = []
-
-    for symbol in tqdm(tickers, desc="Scoring Tickers"):
-        try:
-            df = fetcher.get_kline(symbol, bar="1H", total=100)
-            score_dict = scorer.score(df, symbol)
-            if isinstance(score_dict, dict) and "basic_score" in score_dict:
-                results.append(score_dict)
-            else:
-                print(f"{symbol}: no score")
-            time.sleep(0.2)
+    if offline:
+        tickers = store.symbols("okx", "1H")[:100]
+    else:
+        tickers = fetcher.get_all_tickers()['instId'].tolist()[:100]
 
-        except Exception as e:
-            print(f"Error processing {symbol}: {e}")
-            continue
+    # 并发拉取全部 K 线，速率由共享的 token bucket 控制
+    klines = fetcher.fetch_many(tickers, bar="1H", total=100)
 
-    df_result = pd.DataFrame(results).sort_values(by="basic_score", ascending=False)
+    # 所有币种拼成一个面板，一次向量化打分
+    df_result = scorer.score_many(klines).sort_values(by="enhanced_score", ascending=False)
     # 保存评分数据
     DataIO.save(df_result, "score_result")
+    # 每次评分追加到历史表，便于研究因子衰减
+    ScoreHistory().record(df_result)
     return df_result
 
 
@@ -174,7 +225,7 @@ def get_top_categories(df_score):
     df_category = (
         df_merged.groupby("category")
         .agg(
-            avg_score=("basic_score", "mean"),
+            avg_score=("enhanced_score", "mean"),
             count=("symbol", "count")
         )
         .sort_values(by="avg_score", ascending=False)
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+from indicators.vol_heatmap import VOLUME_CATEGORIES, VolumeHeatmapIndicator
+from score_system.factors.relative_momentum import log_returns, momentum_score, regress_on_benchmark
+
+NO_TIMESTAMP = np.iinfo(np.int64).min
+
+
+def build_panel(frames: dict, rows=None) -> dict:
+    """
+    Stack per-symbol K-line frames into time x symbol arrays for panel scoring.
+
+    Each symbol's last `rows` bars are right-aligned so the last row is every
+    symbol's latest bar; shorter histories are padded with NaN at the top.
+    This matches what the per-symbol scorers see when they use iloc[-k].
+
+    Parameters:
+    - frames (dict): symbol -> DataFrame with close/volume, indexed by timestamp
+    - rows (int): Bars per symbol, defaults to the longest history
+
+    Returns:
+    - dict: symbols, close, volume (float64, T x N), timestamps (int64 ns, T x N),
+      lengths (bars available per symbol)
+    """
+    symbols = [s for s, df in frames.items() if df is not None and not df.empty]
+    rows = rows or max((len(frames[s]) for s in symbols), default=0)
+    close = np.full((rows, len(symbols)), np.nan)
+    volume = np.full((rows, len(symbols)), np.nan)
+    timestamps = np.full((rows, len(symbols)), NO_TIMESTAMP, dtype=np.int64)
+    lengths = np.zeros(len(symbols), dtype=np.int64)
+
+    for k, s in enumerate(symbols):
+        tail = frames[s].iloc[-rows:]
+        m = len(tail)
+        close[rows - m:, k] = tail["close"].to_numpy(dtype=float)
+        volume[rows - m:, k] = tail["volume"].to_numpy(dtype=float)
+        if isinstance(tail.index, pd.DatetimeIndex):
+            timestamps[rows - m:, k] = tail.index.as_unit("ns").asi8
+        lengths[k] = m
+    return {"symbols": symbols, "close": close, "volume": volume, "timestamps": timestamps, "lengths": lengths}
+
+
+def _lengths(close, lengths):
+    if lengths is not None:
+        return np.asarray(lengths)
+    # 默认：每列从第一个非 NaN 开始到最后都是该币种的数据
+    valid = ~np.isnan(close)
+    first = np.where(valid.any(axis=0), valid.argmax(axis=0), close.shape[0])
+    return close.shape[0] - first
+
+
+def lagged_return(close, lengths, lag):
+    """close[-1] / close[-lag - 1] - 1 per symbol, NaN where the history is too short."""
+    if close.shape[0] <= lag:
+        return np.full(close.shape[1], np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ret = (close[-1] - close[-lag - 1]) / close[-lag - 1]
+    return np.where(lengths > lag, ret, np.nan)
+
+
+def ema_score(close):
+    """1.0 if EMA5 > EMA10 > EMA20, 0.6 if either pair is in order, else 0.2 (latest bar)."""
+    frame = pd.DataFrame(close)
+    ema5, ema10, ema20 = (frame.ewm(span=span).mean().to_numpy()[-1] for span in (5, 10, 20))
+    return np.select([(ema5 > ema10) & (ema10 > ema20), (ema5 > ema10) | (ema10 > ema20)], [1.0, 0.6], 0.2)
+
+
+def volume_score(volume, lengths, score_map, periods=(1, 4, 24), heatmap=None):
+    """Mean heatmap score over the last 1 / 4 / 24 bars, averaged over the periods each symbol has."""
+    heatmap = heatmap or VolumeHeatmapIndicator()
+    frame = pd.DataFrame(volume)
+    vol_ma = frame.rolling(window=heatmap.length, min_periods=1).mean().to_numpy()
+    vol_std = frame.rolling(window=heatmap.slength, min_periods=1).std().to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stdbar = (volume - vol_ma) / vol_std
+
+    th = heatmap.thresholds
+    rank = np.select(
+        [np.isnan(stdbar), stdbar > th["extra_high"], stdbar > th["high"], stdbar > th["medium"], stdbar > th["normal"]],
+        [-1, 4, 3, 2, 1],
+        default=0
+    )
+    lut = np.array([score_map[c] for c in VOLUME_CATEGORIES])
+    bar_score = lut[rank + 1]
+
+    score = np.zeros(volume.shape[1])
+    count = np.zeros(volume.shape[1])
+    for p in periods:
+        if p > volume.shape[0]:
+            continue
+        has = lengths >= p
+        score += np.where(has, bar_score[-p:].mean(axis=0), 0.0)
+        count += has
+    with np.errstate(invalid="ignore"):
+        return np.where(count > 0, score / np.maximum(count, 1), 0.5)
+
+
+def latest_rsi(close, lengths, period=14, eps=1e-10):
+    """Latest simple-moving-average RSI (same as RSIIndicator), NaN before `period` bars."""
+    delta = np.diff(close, axis=0, prepend=np.nan)
+    gain = np.where(delta > 0, delta, 0.0)[-period:]
+    loss = np.where(delta < 0, -delta, 0.0)[-period:]
+    if gain.shape[0] < period:
+        return np.full(close.shape[1], np.nan)
+    rs = gain.mean(axis=0) / (loss.mean(axis=0) + eps)
+    rsi = 100 - (100 / (1 + rs))
+    return np.where(lengths >= period, rsi, np.nan)
+
+
+def alpha_vs_benchmark(close, timestamps, lengths, benchmark: pd.DataFrame, min_obs=10, min_len=25):
+    """
+    Regression alpha of each symbol's log returns on the benchmark's, over the
+    bars where both have a return (matched by timestamp), mapped to [0, 1].
+    """
+    n = close.shape[1]
+    if benchmark is None or len(benchmark) < min_len:
+        return np.full(n, 0.5)
+
+    asset = log_returns(close)
+    bench_ret = log_returns(benchmark["close"].to_numpy(dtype=float))
+    bench_ts = pd.DatetimeIndex(benchmark.index).as_unit("ns").asi8
+    order = np.argsort(bench_ts, kind="stable")
+    pos = np.clip(np.searchsorted(bench_ts[order], timestamps), 0, len(bench_ts) - 1)
+    matched = bench_ts[order][pos] == timestamps
+    bench = np.where(matched, bench_ret[order][pos], np.nan)
+
+    alpha = regress_on_benchmark(asset, bench, min_obs)["alpha"]
+    return np.where(lengths >= min_len, momentum_score(alpha), 0.5)
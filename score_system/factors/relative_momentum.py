@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+
+
+def log_returns(close):
+    """log(close_t / close_t-1) along axis 0, NaN on the first row."""
+    close = np.asarray(close, dtype=float)
+    prev = np.concatenate([np.full((1,) + close.shape[1:], np.nan), close[:-1]])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.log(close / prev)
+
+
+def align_to_benchmark(frames: dict, benchmark: pd.DataFrame):
+    """
+    Put every symbol's log returns on the benchmark's timestamps.
+
+    Returns are taken on each symbol's own bars first (as the per-symbol
+    scorer does) and then placed on the benchmark index; bars the benchmark
+    does not have are dropped, missing ones stay NaN.
+
+    Returns:
+    - symbols (list): Column order
+    - asset (np.ndarray): benchmark bars x symbols log returns
+    - bench (np.ndarray): Benchmark log returns
+    - lengths (np.ndarray): Bars per symbol before alignment
+    """
+    symbols = [s for s, df in frames.items() if df is not None and not df.empty]
+    index = pd.DatetimeIndex(benchmark.index)
+    asset = np.full((len(index), len(symbols)), np.nan)
+    lengths = np.zeros(len(symbols), dtype=np.int64)
+    for k, s in enumerate(symbols):
+        df = frames[s]
+        rows = index.get_indexer(df.index)
+        found = rows >= 0
+        asset[rows[found], k] = log_returns(df["close"].to_numpy(dtype=float))[found]
+        lengths[k] = len(df)
+    return symbols, asset, log_returns(benchmark["close"].to_numpy(dtype=float)), lengths
+
+
+def regress_on_benchmark(asset, bench, min_obs=10) -> dict:
+    """
+    OLS of each symbol's returns on the benchmark's: asset = alpha + beta * bench + e.
+
+    Only bars where both returns exist are used, per symbol. Same numbers as
+    Series.cov / Series.var on the merged, dropna'd pair.
+
+    Parameters:
+    - asset (np.ndarray): bars x symbols returns
+    - bench (np.ndarray): Benchmark returns, either one column (bars,) or bars x symbols
+    - min_obs (int): Fewer common bars than this gives NaN
+
+    Returns:
+    - dict: beta, alpha, residual_vol (per-bar std of e), obs, one value per symbol
+    """
+    asset = np.asarray(asset, dtype=float)
+    if asset.ndim == 1:
+        asset = asset[:, None]
+    bench = np.broadcast_to(np.asarray(bench, dtype=float).reshape(len(asset), -1), asset.shape)
+
+    both = ~np.isnan(asset) & ~np.isnan(bench)
+    obs = both.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_a = np.where(both, asset, 0.0).sum(axis=0) / obs
+        mean_b = np.where(both, bench, 0.0).sum(axis=0) / obs
+        da = np.where(both, asset - mean_a, 0.0)
+        db = np.where(both, bench - mean_b, 0.0)
+        s_ab = (da * db).sum(axis=0)
+        s_bb = (db * db).sum(axis=0)
+        s_aa = (da * da).sum(axis=0)
+        beta = np.where(s_bb != 0, s_ab / s_bb, 0.0)
+        alpha = mean_a - beta * mean_b
+        ssr = np.maximum(s_aa - beta * s_ab, 0.0)
+        residual_vol = np.where(obs > 2, np.sqrt(ssr / (obs - 2)), np.nan)
+
+    valid = obs >= max(min_obs, 2)
+    return {
+        "beta": np.where(valid, beta, np.nan),
+        "alpha": np.where(valid, alpha, np.nan),
+        "residual_vol": np.where(valid, residual_vol, np.nan),
+        "obs": obs,
+    }
+
+
+def rolling_regression(asset, bench, window, min_obs=None) -> dict:
+    """
+    regress_on_benchmark() over every trailing `window` bars, for all symbols at once.
+
+    Window sums are taken from cumulative sums of the de-meaned returns
+    (cov / var do not depend on the shift), so the cost is O(bars x symbols)
+    whatever the window length.
+
+    Returns:
+    - dict: beta, alpha, residual_vol, obs, each bars x symbols (NaN until min_obs)
+    """
+    asset = np.asarray(asset, dtype=float)
+    if asset.ndim == 1:
+        asset = asset[:, None]
+    bench = np.broadcast_to(np.asarray(bench, dtype=float).reshape(len(asset), -1), asset.shape)
+    min_obs = window if min_obs is None else min_obs
+
+    both = ~np.isnan(asset) & ~np.isnan(bench)
+    # 先减去全样本均值，降低累加和相减时的精度损失
+    with np.errstate(invalid="ignore"):
+        shift_a = np.nanmean(np.where(both, asset, np.nan), axis=0)
+        shift_b = np.nanmean(np.where(both, bench, np.nan), axis=0)
+    a = np.where(both, asset - np.nan_to_num(shift_a), 0.0)
+    b = np.where(both, bench - np.nan_to_num(shift_b), 0.0)
+
+    def window_sum(x):
+        c = np.cumsum(x, axis=0)
+        out = c.copy()
+        out[window:] -= c[:-window]
+        return out
+
+    n = window_sum(both.astype(float))
+    s_a, s_b = window_sum(a), window_sum(b)
+    s_ab, s_bb, s_aa = window_sum(a * b), window_sum(b * b), window_sum(a * a)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        c_ab = s_ab - s_a * s_b / n
+        c_bb = s_bb - s_b * s_b / n
+        c_aa = s_aa - s_a * s_a / n
+        beta = np.where(c_bb > 0, c_ab / c_bb, 0.0)
+        alpha = (s_a - beta * s_b) / n + np.nan_to_num(shift_a) - beta * np.nan_to_num(shift_b)
+        residual_vol = np.sqrt(np.maximum(c_aa - beta * c_ab, 0.0) / (n - 2))
+
+    valid = n >= max(min_obs, 3)
+    return {
+        "beta": np.where(valid, beta, np.nan),
+        "alpha": np.where(valid, alpha, np.nan),
+        "residual_vol": np.where(valid, residual_vol, np.nan),
+        "obs": n.astype(np.int64),
+    }
+
+
+def momentum_score(alpha):
+    """Alpha per bar mapped to [0, 1] the same way as compute_relative_momentum(); NaN -> 0.5."""
+    alpha = np.asarray(alpha, dtype=float)
+    return np.where(np.isnan(alpha), 0.5, np.clip(alpha * 100, -1, 1) * 0.5 + 0.5)
+
+
+class RelativeMomentum:
+    """
+    Beta / alpha / residual volatility of a whole universe against one benchmark.
+
+    The benchmark's returns are computed once; every symbol is aligned to the
+    benchmark index and regressed with array operations, instead of building
+    a merged DataFrame and calling cov / var per symbol.
+    """
+
+    def __init__(self, benchmark_df: pd.DataFrame, min_obs=10, min_len=25):
+        """
+        Parameters:
+        - benchmark_df (pd.DataFrame): Benchmark (e.g., BTC) K-lines indexed by timestamp
+        - min_obs (int): Minimum common bars for a regression
+        - min_len (int): Minimum bars for both the symbol and the benchmark, else score 0.5
+        """
+        self.benchmark_df = benchmark_df
+        self.min_obs = min_obs
+        self.min_len = min_len
+
+    def fit(self, frames: dict) -> pd.DataFrame:
+        """
+        Returns:
+        - pd.DataFrame: symbol, beta, alpha, residual_vol, obs, momentum_score
+        """
+        symbols, asset, bench, lengths = align_to_benchmark(frames, self.benchmark_df)
+        stats = regress_on_benchmark(asset, bench, self.min_obs)
+        usable = (lengths >= self.min_len) & (len(self.benchmark_df) >= self.min_len)
+        return pd.DataFrame({
+            "symbol": symbols,
+            **stats,
+            "momentum_score": np.where(usable, momentum_score(stats["alpha"]), 0.5),
+        })
+
+    def rolling(self, frames: dict, window, min_obs=None) -> dict:
+        """
+        Returns:
+        - dict: beta / alpha / residual_vol -> DataFrame (benchmark index x symbols)
+        """
+        symbols, asset, bench, _ = align_to_benchmark(frames, self.benchmark_df)
+        stats = rolling_regression(asset, bench, window, min_obs)
+        return {k: pd.DataFrame(stats[k], index=self.benchmark_df.index, columns=symbols)
+                for k in ("beta", "alpha", "residual_vol")}
@@ -1,7 +1,9 @@
 import pandas as pd
 import numpy as np
 from indicators.vol_heatmap import VolumeHeatmapIndicator
+from indicators.cache import cached_ema
 from indicators.rsi import RSIIndicator
+from score_system.factors import panel
 
 VOLUME_SCORE_MAP = {
     'extra_high': 1.0,
@@ -24,7 +26,7 @@ class EnhancedStrengthScorer:
         }
 
     def compute_log_return_score(self, df, benchmark_df=None):
-        df = df.copy()
+        df = df.copy(deep=False)
         df['log_return'] = np.log(df['close'] / df['close'].shift(1))
 
         returns = {
@@ -40,9 +42,9 @@ class EnhancedStrengthScorer:
         return (score + 1) / 2
 
     def compute_ema_score(self, df):
-        df['ema5'] = df['close'].ewm(span=5).mean()
-        df['ema10'] = df['close'].ewm(span=10).mean()
-        df['ema20'] = df['close'].ewm(span=20).mean()
+        df['ema5'] = cached_ema(df, 5)
+        df['ema10'] = cached_ema(df, 10)
+        df['ema20'] = cached_ema(df, 20)
         latest = df.iloc[-1]
         if latest['ema5'] > latest['ema10'] > latest['ema20']:
             return 1.0
@@ -60,7 +62,7 @@ class EnhancedStrengthScorer:
             if len(df) < p:
                 continue
             segment = df.iloc[-p:]
-            mapped_scores = segment['volume_category'].map(VOLUME_SCORE_MAP).dropna()
+            mapped_scores = segment['volume_category'].astype(object).map(VOLUME_SCORE_MAP).dropna()
             if not mapped_scores.empty:
                 score += mapped_scores.mean()
                 total_weight += 1
@@ -132,3 +134,62 @@ class EnhancedStrengthScorer:
             print(f"Error scoring {symbol}: {e}")
             return None
 
+    def score_panel(self, close, volume, symbols, timestamps=None, lengths=None) -> pd.DataFrame:
+        """
+        Score many symbols in one vectorized pass.
+
+        Parameters:
+        - close, volume (np.ndarray): time x symbols arrays, right-aligned so the last
+          row is each symbol's latest bar (see panel.build_panel)
+        - symbols (list): Column labels
+        - timestamps (np.ndarray): int64 ns time x symbols, used to match the benchmark
+        - lengths (np.ndarray): Bars available per symbol, defaults to the non-NaN tail length
+
+        Returns:
+        - pd.DataFrame: Same columns as score(), one row per symbol
+        """
+        close = np.asarray(close, dtype=float)
+        volume = np.asarray(volume, dtype=float)
+        lengths = panel._lengths(close, lengths)
+        if timestamps is None:
+            timestamps = np.full(close.shape, panel.NO_TIMESTAMP, dtype=np.int64)
+
+        # 1h 对数收益、4h / 24h 简单收益（历史不足时记 0）
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_1h = np.where(lengths >= 2, np.log(close[-1] / close[-2]), np.nan) if len(close) >= 2 \
+                else np.full(close.shape[1], np.nan)
+        ret_4h = np.where(lengths >= 5, panel.lagged_return(close, lengths, 4), 0.0)
+        ret_24h = np.where(lengths >= 25, panel.lagged_return(close, lengths, 24), 0.0)
+        return_score = (np.clip(log_1h * 10, -1, 1) * 0.5 + np.clip(ret_4h * 10, -1, 1) * 0.3 +
+                        np.clip(ret_24h * 10, -1, 1) * 0.2 + 1) / 2
+
+        ema_score = panel.ema_score(close)
+        volume_score = panel.volume_score(volume, lengths, VOLUME_SCORE_MAP)
+
+        rsi = panel.latest_rsi(close, lengths)
+        rsi_score = np.select([rsi >= 70, rsi <= 30, (rsi >= 50) & (rsi < 70), (rsi > 30) & (rsi < 50)],
+                              [0.3, 1.0, 0.8, 0.6], 0.5)
+
+        momentum_score = panel.alpha_vs_benchmark(close, timestamps, lengths, self.benchmark_df)
+
+        total_score = (
+            return_score * self.weights['return'] +
+            ema_score * self.weights['ema'] +
+            volume_score * self.weights['volume'] +
+            rsi_score * self.weights['rsi'] +
+            momentum_score * self.weights['momentum']
+        )
+        return pd.DataFrame({
+            'symbol': list(symbols),
+            'return_score': return_score.round(3),
+            'ema_score': ema_score.round(3),
+            'volume_score': volume_score.round(3),
+            'rsi_score': rsi_score.round(3),
+            'momentum_score': momentum_score.round(3),
+            'final_score': total_score.round(3)
+        })
+
+    def score_many(self, frames: dict) -> pd.DataFrame:
+        """score_panel() over a dict of symbol -> K-line DataFrame."""
+        p = panel.build_panel(frames)
+        return self.score_panel(p["close"], p["volume"], p["symbols"], p["timestamps"], p["lengths"])
@@ -1,37 +1,35 @@
 from utils.file_helper import DataIO
+from score_system.score_history import ScoreHistory
 from data.market_data import OKXDataFetcher, BinanceDataFetcher
-from factors.scorer import EnhancedStrengthScorer
-from tqdm import tqdm
+from data.kline_store import KlineStore
+from score_system.factors.scorer import EnhancedStrengthScorer
 import pandas as pd
-import time
 
 
-def get_top_coins(read_cache=False):
+def get_top_coins(read_cache=False, offline=False, fetcher: BinanceDataFetcher = None):
+    """
+    Score all USDT pairs. Candles go through the local KlineStore so repeated
+    scans only download new bars; offline=True scores from the store alone.
+    Pass `fetcher` to reuse an already-initialized client (e.g. from the scheduler).
+    """
     if read_cache:
         return DataIO.load("score_result")
-    fetcher = BinanceDataFetcher()
+    if fetcher is None:
+        fetcher = BinanceDataFetcher(store=KlineStore(), offline=offline)
+    store = fetcher.store or KlineStore()
     df_btc = fetcher.get_klines('BTCUSDT', interval="1h", total=100)
     scorer = EnhancedStrengthScorer(df_btc)
-    tickers = fetcher.get_all_usdt_pairs()
-    results = []
+    tickers = store.symbols("binance", "1h") if offline else fetcher.get_all_usdt_pairs()
 
-    for symbol in tqdm(tickers, desc="Scoring Tickers"):
-        try:
-            df = fetcher.get_klines(symbol, interval="1h", total=100)
-            score_dict = scorer.score(df, symbol)
-            if isinstance(score_dict, dict) and "final_score" in score_dict:
-                results.append(score_dict)
-            else:
-                print(f"{symbol}: no score")
-            time.sleep(0.2)
+    # 并发拉取全部 K 线，速率由共享的 token bucket 控制
+    klines = fetcher.fetch_many(tickers, interval="1h", total=100)
 
-        except Exception as e:
-            print(f"Error processing {symbol}: {e}")
-            continue
-
-    df_result = pd.DataFrame(results).sort_values(by="final_score", ascending=False)
+    # 所有币种拼成一个面板，一次向量化打分
+    df_result = scorer.score_many(klines).sort_values(by="final_score", ascending=False)
     # 保存评分数据
     DataIO.save(df_result, "score_result")
+    # 每次评分追加到历史表，便于研究因子衰减
+    ScoreHistory().record(df_result)
     return df_result
 
 
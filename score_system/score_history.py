@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from database.db_manager import DBManager
+
+
+class ScoreHistory:
+    """
+    Append-only history of scoring runs, kept in the coin_scores table
+    (one row per symbol x factor x run time).
+
+    get_top_coins() records every run here in addition to the latest
+    score_result snapshot, so factor behaviour over time can be studied
+    without rescoring from raw candles.
+    """
+
+    def __init__(self, db: DBManager = None):
+        self.db = db or DBManager()
+
+    def record(self, df_score: pd.DataFrame, scan_time=None) -> int:
+        """
+        Append one scoring run.
+
+        Parameters:
+        - df_score (pd.DataFrame): Scorer output, one row per symbol, one column per factor
+        - scan_time: Run timestamp, defaults to now (UTC)
+
+        Returns:
+        - int: Number of (symbol, factor) rows written
+        """
+        return self.db.insert_scores_bulk(df_score, scan_time)
+
+    @staticmethod
+    def _window(days=None, start=None, end=None):
+        if days is not None and start is None:
+            start = (pd.Timestamp(end) if end is not None else datetime.utcnow()) - timedelta(days=days)
+        return start, end
+
+    def top(self, n=20, factor="final_score", days=7, start=None, end=None, how="mean") -> pd.DataFrame:
+        """
+        Top `n` symbols by a factor over the last `days` (or [start, end]).
+
+        Parameters:
+        - how (str): 'mean' / 'max' / 'min' over the runs in range, or 'last' for the latest run
+
+        Returns:
+        - pd.DataFrame: symbol, score, runs, best first
+        """
+        start, end = self._window(days, start, end)
+        return self.db.top_scores(factor, start, end, limit=n, how=how)
+
+    def trajectory(self, symbol, factors=None, days=None, start=None, end=None) -> pd.DataFrame:
+        """
+        Score trajectory of one symbol.
+
+        Returns:
+        - pd.DataFrame: Run timestamps x factors
+        """
+        start, end = self._window(days, start, end)
+        df = self.db.query_scores(factors, [symbol], start, end)
+        return df.pivot(index="timestamp", columns="factor_name", values="score").rename_axis(columns=None)
+
+    def panel(self, factor="final_score", symbols=None, days=None, start=None, end=None) -> pd.DataFrame:
+        """
+        One factor for many symbols, e.g. to measure how fast a factor's
+        ranking decays from one run to the next.
+
+        Returns:
+        - pd.DataFrame: Run timestamps x symbols
+        """
+        start, end = self._window(days, start, end)
+        df = self.db.query_scores(factor, symbols, start, end)
+        return df.pivot(index="timestamp", columns="symbol", values="score").rename_axis(columns=None)
+
@@ -1,5 +1,9 @@
+import copy
 from abc import ABC, abstractmethod
 from utils.config_loader import ConfigLoader
+from strategies.stop_loss import StopLossStrategy
+from strategies.take_profit import TakeProfitStrategy
+import numpy as np
 import pandas as pd
 
 class BaseStrategy(ABC):
@@ -11,6 +15,71 @@ class BaseStrategy(ABC):
         self.config = {}
         if config_path:
             self.config = ConfigLoader.load(config_path)
+        self.indicators = {}
+        self._before = {}  # window() 视图：窗口前一根K线的指标值
+        self._prepared = False
+
+    def compute_indicators(self) -> dict:
+        """
+        Compute every indicator the strategy needs over the whole data set.
+        Override in subclasses; return a dict of name -> np.ndarray aligned with self.data.
+        """
+        return {}
+
+    def prepare(self):
+        """
+        Prepare phase: compute and cache all indicator arrays once, after data and
+        config are set. Per-bar methods then only read self.indicators[name][index].
+        Call again if data or config change.
+        """
+        self.indicators = self.compute_indicators() or {}
+        self._before = {}
+        self._prepared = True
+        return self
+
+    def indicator(self, name: str) -> np.ndarray:
+        """Cached indicator array, preparing the strategy on first access."""
+        if not self._prepared:
+            self.prepare()
+        return self.indicators[name]
+
+    def prior(self, name: str, index: int) -> float:
+        """
+        Indicator value on the bar before `index`. For bar 0 of a window()
+        view this is the bar preceding the window, NaN at the start of the data.
+        """
+        if index > 0:
+            return self.indicator(name)[index - 1]
+        self.indicator(name)
+        return self._before.get(name, np.nan)
+
+    def previous(self, name: str) -> np.ndarray:
+        """Indicator array shifted one bar back, element i = prior(name, i)."""
+        values = self.indicator(name)
+        shifted = np.empty(len(values), dtype=float)
+        if len(values):
+            shifted[0] = self._before.get(name, np.nan)
+            shifted[1:] = values[:-1]
+        return shifted
+
+    def window(self, start: int, stop: int) -> "BaseStrategy":
+        """
+        View of this prepared strategy over data.iloc[start:stop].
+
+        The cached indicator arrays are sliced, not recomputed, so many
+        overlapping windows (walk-forward, rolling re-tests) share one prepare
+        and each window keeps the warm-up history that preceded it: indicators
+        are valid from the first bar of the window, and prior() / previous()
+        see the bar before it. Strategies should gate signals on indicator
+        availability (NaN), not on the absolute bar index.
+        """
+        if not self._prepared:
+            self.prepare()
+        view = copy.copy(self)
+        view.data = self.data.iloc[start:stop]
+        view.indicators = {name: values[start:stop] for name, values in self.indicators.items()}
+        view._before = {name: values[start - 1] for name, values in self.indicators.items()} if start > 0 else {}
+        return view
 
     @abstractmethod
     def entry_signal(self, index: int) -> str:
@@ -48,4 +117,71 @@ class BaseStrategy(ABC):
         """
         if signal is None:
             return None
-        return signal.split('_')[0]
\ No newline at end of file
+        return signal.split('_')[0]
+
+    @classmethod
+    def lookback(cls, config: dict):
+        """
+        Bars of history prepare() needs so the signals on the last bar match
+        the ones computed on the full history (live feeds prepare on that
+        tail only). None = use all available bars.
+        """
+        return None
+
+    def exit_levels(self, index: int, entry_price: float, direction: str):
+        """
+        Stop-loss and take-profit price levels of a position opened on bar
+        `index`, for engines that check exits against high / low (intrabar).
+
+        stop_loss_method / take_profit_method in the config select
+        StopLossStrategy / TakeProfitStrategy levels; otherwise stop_loss_pct /
+        take_profit_pct give fixed percentages from the entry price.
+
+        Returns:
+        - (float, float): stop and take-profit level, either may be None;
+          None if the strategy defines no levels (exits stay close-based)
+        """
+        short = direction == 'short'
+        cfg = self.config
+        stop = take = None
+        # ATR 只依赖最近 2 * atr_period 根，截取一段避免每笔交易都重算全量
+        period = cfg.get('atr_period', 14)
+        recent = self.data.iloc[max(0, index - 2 * period + 2):index + 1]
+        if 'stop_loss_method' in cfg:
+            stop = StopLossStrategy(cfg).compute_stoploss(recent, len(recent) - 1, entry_price, short)
+        elif 'stop_loss_pct' in cfg:
+            stop = entry_price * (1 + cfg['stop_loss_pct'] if short else 1 - cfg['stop_loss_pct'])
+        if 'take_profit_method' in cfg:
+            take = TakeProfitStrategy(cfg).compute_take_profit(recent, len(recent) - 1, entry_price, short)
+        elif 'take_profit_pct' in cfg:
+            take = entry_price * (1 - cfg['take_profit_pct'] if short else 1 + cfg['take_profit_pct'])
+        if stop is None and take is None:
+            return None
+        return stop, take
+
+    # === Array-level interface used by the vectorized backtest engine ===
+    # 默认实现逐根调用上面的单 bar 方法，结果与循环引擎一致；
+    # 子类可以用数组运算覆盖这些方法来获得向量化速度。
+
+    def entry_signals(self) -> np.ndarray:
+        """
+        Entry signal for every bar at once (object array of signal strings / None),
+        element i must equal entry_signal(i).
+        """
+        return np.array([self.entry_signal(i) for i in range(len(self.data))], dtype=object)
+
+    def exit_signals(self):
+        """
+        Boolean array of bars where exit_signal() fires, for strategies whose exit
+        signal does not depend on the entry price. Return None (default) to let the
+        engine call exit_signal(index, entry_price) bar by bar while a position is open.
+        """
+        return None
+
+    def stop_loss_array(self, entry_price, current_price) -> np.ndarray:
+        """Element-wise stop_loss(); either argument may be an array."""
+        return np.vectorize(self.stop_loss, otypes=[bool])(entry_price, current_price)
+
+    def take_profit_array(self, entry_price, current_price) -> np.ndarray:
+        """Element-wise take_profit(); either argument may be an array."""
+        return np.vectorize(self.take_profit, otypes=[bool])(entry_price, current_price)
@@ -1,17 +1,65 @@
+import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 
 
 class BuySignal:
     def __init__(self):
         pass
 
-    def detect_pullback_entry(self, df):
+    def detect_pullback_entry(self, df, method="vectorized"):
         """
         Detect potential entry signals based on:
         - Prior uptrend
         - 2–3 wave pullback (higher low or double bottom)
         - Bullish reversal candle
+
+        method="vectorized" evaluates every bar with array operations,
+        method="loop" is the original bar-by-bar version. Both give the same
+        entry_signal column (rows are addressed by position, as with a RangeIndex).
         """
+        if method == "loop":
+            return self._detect_pullback_entry_loop(df)
+
+        df = df.copy(deep=False)
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+        df["entry_signal"] = False
+        df["trend_return"] = df["close"].pct_change(periods=20)
+
+        n = len(df)
+        if n < 27:
+            return df
+
+        open_ = df["open"].to_numpy(dtype=float)
+        close = df["close"].to_numpy(dtype=float)
+        high = df["high"].to_numpy(dtype=float)
+        low = df["low"].to_numpy(dtype=float)
+        idx = np.arange(25, n - 1)
+
+        # Step 1: 21 根（i-20..i）trend_return 之和，逐窗口求和以保持与 Series.sum() 相同的数值
+        trend = np.nan_to_num(df["trend_return"].to_numpy(dtype=float), nan=0.0)
+        recent_trend = sliding_window_view(trend, 21).sum(axis=1)[idx - 20]
+        keep = ~(recent_trend < 0.02)
+
+        # Step 2: 前 5 根低点的振幅
+        prev_lows = df["low"].shift(1)
+        lows_max = prev_lows.rolling(5, min_periods=1).max().to_numpy()[idx]
+        lows_min = prev_lows.rolling(5, min_periods=1).min().to_numpy()[idx]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            keep &= ~((lows_max - lows_min) / lows_min > 0.02)
+
+        # Step 3: Bullish reversal candle
+        o, c, pc = open_[idx], close[idx], close[idx - 1]
+        is_bullish_engulf = (c > o) & (c > pc) & (o < pc)
+        is_big_bull = (c > o) & ((c - o) > (high[idx] - low[idx]) * 0.6)
+
+        signal = np.zeros(n, dtype=bool)
+        signal[idx] = keep & (is_bullish_engulf | is_big_bull)
+        df["entry_signal"] = signal
+        return df
+
+    def _detect_pullback_entry_loop(self, df):
+        """Bar-by-bar reference implementation of detect_pullback_entry()."""
         df = df.copy()
         df["timestamp"] = pd.to_datetime(df["timestamp"])
         df["entry_signal"] = False
@@ -44,13 +92,68 @@ class BuySignal:
 
         return df
 
-    def detect_dizijue_entry(self, df, trend_window=20, pullback_range=0.015):
+    def detect_dizijue_entry(self, df, trend_window=20, pullback_range=0.015, method="vectorized"):
         """
         Detect Dizijue-style low absorption entries:
         - Identify strong upward trend (A wave)
         - Detect second pullback (B wave) to a key support zone (recent mini bottom)
         - Confirm with bullish candle structure at that support
+
+        method="vectorized" evaluates every bar with array operations,
+        method="loop" is the original bar-by-bar version; both give the same entry_signal column.
         """
+        if method == "loop":
+            return self._detect_dizijue_entry_loop(df, trend_window, pullback_range)
+
+        df = df.copy(deep=False)
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+        df["entry_signal"] = False
+        df["EMA20"] = df["close"].ewm(span=20).mean()
+
+        n = len(df)
+        start = trend_window + 10
+        if n <= start:
+            return df
+
+        close = df["close"].to_numpy(dtype=float)
+        low = df["low"].to_numpy(dtype=float)
+        idx = np.arange(start, n)
+
+        # A 浪窗口为 [i - trend_window - 10, i - 10)
+        price_start = close[idx - trend_window - 10]
+        price_peak = df["close"].rolling(trend_window, min_periods=1).max().to_numpy()[idx - 11]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            keep = ~(price_peak / price_start < 1.05)
+
+        # 窗口内 rolling(3, center=True) 的局部低点只出现在窗口内部（两端为 NaN），
+        # 与全序列上的 rolling(3, center=True) 在这些位置相同：
+        # 取 [i - trend_window - 9, i - 12] 中最后一个局部低点作为支撑
+        local_lows = df["low"].rolling(3, center=True).min().to_numpy()
+        is_support = local_lows == low
+        last_support = np.where(is_support, np.arange(n), -1)
+        last_support = np.maximum.accumulate(last_support)[idx - 12] if n > 12 else np.full(len(idx), -1)
+        has_support = last_support >= idx - trend_window - 9
+        keep &= has_support
+        support_level = low[np.where(has_support, last_support, 0)]
+
+        # Step 3: Check if current low revisits support zone
+        with np.errstate(divide="ignore", invalid="ignore"):
+            keep &= ~(np.abs(low[idx] - support_level) / support_level > pullback_range)
+
+        # Step 4: Confirm with bullish structure (long body green candle)
+        o = df["open"].to_numpy(dtype=float)[idx]
+        c = close[idx]
+        h = df["high"].to_numpy(dtype=float)[idx]
+        lo = low[idx]
+        is_bullish = (c > o) & ((c - o) > (h - lo) * 0.5)
+
+        signal = np.zeros(n, dtype=bool)
+        signal[idx] = keep & is_bullish
+        df["entry_signal"] = signal
+        return df
+
+    def _detect_dizijue_entry_loop(self, df, trend_window, pullback_range):
+        """Bar-by-bar reference implementation of detect_dizijue_entry()."""
         df = df.copy()
         df["timestamp"] = pd.to_datetime(df["timestamp"])
         df["entry_signal"] = False
@@ -91,6 +194,26 @@ class BuySignal:
 
         return df
 
+    def scan_many(self, frames: dict, detector="pullback", **kwargs) -> dict:
+        """
+        Run one detector over many symbols in a single call.
+
+        Parameters:
+        - frames (dict): symbol -> K-line DataFrame
+        - detector (str): "pullback" or "dizijue"
+        - kwargs: Passed to the detector (trend_window, pullback_range, method)
+
+        Returns:
+        - dict: symbol -> DataFrame with the entry_signal column
+        """
+        detect = {"pullback": self.detect_pullback_entry, "dizijue": self.detect_dizijue_entry}[detector]
+        return {symbol: detect(df, **kwargs) for symbol, df in frames.items() if df is not None and not df.empty}
+
+    def latest_signals(self, frames: dict, detector="pullback", lookback=1, **kwargs) -> list:
+        """Symbols whose entry_signal fired within the last `lookback` bars."""
+        results = self.scan_many(frames, detector, **kwargs)
+        return [symbol for symbol, df in results.items() if df["entry_signal"].iloc[-lookback:].any()]
+
 
 if __name__ == "__main__":
     from data.market_data import get_kline
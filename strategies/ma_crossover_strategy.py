@@ -1,3 +1,5 @@
+import logging
+import numpy as np
 from strategies.base_strategy import BaseStrategy
 from core.strategy_registry import StrategyRegistry
 from utils.logger import get_logger
@@ -25,32 +27,77 @@ class MovingAverageCrossoverStrategy(BaseStrategy):
     def __init__(self, data, config_path=None):
         super().__init__(data, config_path)
 
+    @classmethod
+    def lookback(cls, config: dict):
+        # 最后一根需要前一根的长均线（long_window 根）和 10 根成交量均值
+        return max(config['long_window'], 10) + 1
+
+    def compute_indicators(self) -> dict:
+        close = self.data['close']
+        volume = self.data['volume']
+        return {
+            'short_ma': close.rolling(self.config['short_window']).mean().to_numpy(),
+            'long_ma': close.rolling(self.config['long_window']).mean().to_numpy(),
+            'vol': volume.to_numpy(),
+            'vol_mean': volume.rolling(10).mean().to_numpy(),
+        }
+
     def entry_signal(self, index: int) -> str:
-        if index < self.config['long_window']:
+        # 前一根的长均线还没算出来（预热期）时不出信号；按指标是否可用判断，window() 视图里也成立
+        prev_long = self.prior('long_ma', index)
+        if np.isnan(prev_long):
             return None
+        prev_short = self.prior('short_ma', index)
 
-        short_ma = self.data['close'].rolling(self.config['short_window']).mean()
-        long_ma = self.data['close'].rolling(self.config['long_window']).mean()
-        vol = self.data['volume']
-        vol_mean = vol.rolling(10).mean()
+        short_ma = self.indicator('short_ma')
+        long_ma = self.indicator('long_ma')
+        vol = self.indicator('vol')
+        vol_mean = self.indicator('vol_mean')
 
-        logger.debug(
-            f"[index={index}] short_ma={short_ma.iloc[index]:.2f}, long_ma={long_ma.iloc[index]:.2f}, vol={vol.iloc[index]:.2f}, mean_vol={vol_mean.iloc[index]:.2f}"
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"[index={index}] short_ma={short_ma[index]:.2f}, long_ma={long_ma[index]:.2f}, vol={vol[index]:.2f}, mean_vol={vol_mean[index]:.2f}"
+            )
 
-        if (short_ma.iloc[index - 1] < long_ma.iloc[index - 1] and
-                short_ma.iloc[index] > long_ma.iloc[index] and
-                vol.iloc[index] > vol_mean.iloc[index] * self.config['volume_multiplier']):
+        if (prev_short < prev_long and
+                short_ma[index] > long_ma[index] and
+                vol[index] > vol_mean[index] * self.config['volume_multiplier']):
             logger.info(f"[Signal] Strong crossover at index {index} → long_strong")
             return 'long_strong'
 
-        if (short_ma.iloc[index - 1] < long_ma.iloc[index - 1] and
-                short_ma.iloc[index] > long_ma.iloc[index]):
+        if (prev_short < prev_long and
+                short_ma[index] > long_ma[index]):
             logger.info(f"[Signal] Medium crossover at index {index} → long_medium")
             return 'long_medium'
 
         return None
 
+    def entry_signals(self) -> np.ndarray:
+        short_ma = self.indicator('short_ma')
+        long_ma = self.indicator('long_ma')
+        vol = self.indicator('vol')
+        vol_mean = self.indicator('vol_mean')
+
+        prev_short = self.previous('short_ma')
+        prev_long = self.previous('long_ma')
+
+        cross = ~np.isnan(prev_long) & (prev_short < prev_long) & (short_ma > long_ma)
+        strong = cross & (vol > vol_mean * self.config['volume_multiplier'])
+
+        signals = np.full(len(short_ma), None, dtype=object)
+        signals[cross] = 'long_medium'
+        signals[strong] = 'long_strong'
+        return signals
+
+    def exit_signals(self) -> np.ndarray:
+        return np.zeros(len(self.data), dtype=bool)
+
+    def stop_loss_array(self, entry_price, current_price) -> np.ndarray:
+        return np.asarray(current_price < entry_price * (1 - self.config['stop_loss_pct']))
+
+    def take_profit_array(self, entry_price, current_price) -> np.ndarray:
+        return np.asarray(current_price > entry_price * (1 + self.config['take_profit_pct']))
+
     def stop_loss(self, entry_price: float, current_price: float) -> bool:
         loss_triggered = current_price < entry_price * (1 - self.config['stop_loss_pct'])
         if loss_triggered:
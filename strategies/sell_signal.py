@@ -1,3 +1,7 @@
+import math
+from collections import deque
+
+import numpy as np
 import pandas as pd
 import mplfinance as mpf
 
@@ -10,7 +14,8 @@ class SellSignal:
             df,
             volume_window=20,
             price_jump_threshold=0.03,
-            volume_spike_multiplier=2
+            volume_spike_multiplier=2,
+            method="vectorized"
     ):
         """
         Detect three types of exit signals in a price time series DataFrame.
@@ -30,6 +35,10 @@ class SellSignal:
         volume_spike_multiplier : float, default=2
             A multiplier on average volume to define what counts as a volume spike
 
+        method : str, default="vectorized"
+            "vectorized" computes all signals with rolling/shifted array operations,
+            "loop" is the original bar-by-bar implementation (same output, much slower)
+
         Returns:
         -------
         pd.DataFrame
@@ -39,6 +48,46 @@ class SellSignal:
             - 'exit_signal_3' : True when price makes higher highs with lower volume (volume-price divergence)
             - 'exit_signal'   : True if any of the above conditions are met
         """
+        if method == "loop":
+            return self._detect_exit_signal_loop(df, volume_window, price_jump_threshold, volume_spike_multiplier)
+
+        df = df.copy(deep=False)
+        df["timestamp"] = pd.to_datetime(df["timestamp"])
+        avg_volume = df["volume"].rolling(window=volume_window).mean()
+
+        open_ = df["open"].to_numpy(dtype=float)
+        close = df["close"].to_numpy(dtype=float)
+        highs = df["high"].to_numpy(dtype=float)
+        volumes = df["volume"].to_numpy(dtype=float)
+        avg_vol = avg_volume.to_numpy(dtype=float)
+        # 前 volume_window 根K线不产生信号（与逐根实现的起点一致）
+        valid = np.arange(len(df)) >= volume_window
+
+        # --- Signal 1: Sharp price spike + high volume ---
+        with np.errstate(divide="ignore", invalid="ignore"):
+            price_jump = (close - open_) / open_
+        signal_1 = valid & (price_jump > price_jump_threshold) & (volumes > volume_spike_multiplier * avg_vol)
+
+        # --- Signal 2: Breakout then close below recent high (max of the previous volume_window highs) ---
+        recent_high = df["high"].shift(1).rolling(window=volume_window, min_periods=1).max().to_numpy(dtype=float)
+        signal_2 = valid & (highs > recent_high) & (close < recent_high)
+
+        # --- Signal 3: Higher highs with lower volume over the last 3 bars ---
+        signal_3 = np.zeros(len(df), dtype=bool)
+        if len(df) > 2:
+            signal_3[2:] = ((highs[2:] > highs[1:-1]) & (highs[1:-1] > highs[:-2]) &
+                            (volumes[2:] < volumes[1:-1]) & (volumes[1:-1] < volumes[:-2]))
+        signal_3 &= np.arange(len(df)) >= volume_window + 2
+
+        df["exit_signal_1"] = signal_1
+        df["exit_signal_2"] = signal_2
+        df["exit_signal_3"] = signal_3
+        df["exit_signal"] = signal_1 | signal_2 | signal_3
+        df["avg_volume"] = avg_volume
+        return df
+
+    def _detect_exit_signal_loop(self, df, volume_window, price_jump_threshold, volume_spike_multiplier):
+        """Bar-by-bar reference implementation of detect_exit_signal_full()."""
         df = df.copy()
         df["timestamp"] = pd.to_datetime(df["timestamp"])
         df["exit_signal_1"] = False
@@ -82,3 +131,54 @@ class SellSignal:
         return df
 
 
+class SellSignalStream:
+    """
+    Streaming version of SellSignal.detect_exit_signal_full() for live use.
+
+    Keeps only the last volume_window bars and updates the three exit signals
+    in O(volume_window) per closed bar; the flags match the batch output for
+    the same bar.
+    """
+
+    def __init__(self, volume_window=20, price_jump_threshold=0.03, volume_spike_multiplier=2):
+        self.volume_window = volume_window
+        self.price_jump_threshold = price_jump_threshold
+        self.volume_spike_multiplier = volume_spike_multiplier
+        self.highs = deque(maxlen=volume_window)
+        self.volumes = deque(maxlen=volume_window)
+        self.count = 0  # 已处理的K线数量
+
+    def update(self, bar) -> dict:
+        """
+        Parameters:
+        - bar (dict | pd.Series): A closed candle with open, high, close, volume
+
+        Returns:
+        - dict: exit_signal_1, exit_signal_2, exit_signal_3, exit_signal for this bar
+        """
+        open_, high, close, volume = float(bar["open"]), float(bar["high"]), float(bar["close"]), float(bar["volume"])
+        i = self.count
+        signal_1 = signal_2 = signal_3 = False
+
+        if i >= self.volume_window:
+            # 与批量版本一致：均量包含当前K线
+            avg_vol = math.fsum(list(self.volumes)[1:] + [volume]) / self.volume_window
+            price_jump = (close - open_) / open_ if open_ else float("nan")
+            signal_1 = bool(price_jump > self.price_jump_threshold and volume > self.volume_spike_multiplier * avg_vol)
+
+            recent_high = max(self.highs)
+            signal_2 = bool(high > recent_high and close < recent_high)
+
+            if i >= self.volume_window + 2:
+                signal_3 = bool(high > self.highs[-1] > self.highs[-2] and
+                                volume < self.volumes[-1] < self.volumes[-2])
+
+        self.highs.append(high)
+        self.volumes.append(volume)
+        self.count += 1
+        return {
+            "exit_signal_1": signal_1,
+            "exit_signal_2": signal_2,
+            "exit_signal_3": signal_3,
+            "exit_signal": signal_1 or signal_2 or signal_3,
+        }
@@ -1,5 +1,6 @@
 # trend_analysis.py
 import pandas as pd
+from indicators.cache import cached_ema
 
 class TrendAnalyzer:
     def __init__(self, df):
@@ -7,12 +8,12 @@ class TrendAnalyzer:
         Initialize with OHLCV DataFrame.
         df: DataFrame with columns: ['timestamp', 'open', 'high', 'low', 'close', 'volume']
         """
-        self.df = df.copy()
+        self.df = df.copy(deep=False)
 
     def compute_emas(self, df):
         """Calculate EMA5, EMA10, EMA20, EMA60."""
         for span in [5, 10, 20, 60]:
-            df[f'EMA{span}'] = df['close'].ewm(span=span, adjust=False).mean()
+            df[f'EMA{span}'] = cached_ema(df, span, adjust=False)
         return df
 
     def determine_ema_trend(self, latest_row):
@@ -38,7 +39,7 @@ class TrendAnalyzer:
         """
         if len(self.df) < n:
             raise ValueError("Not enough data to compute trend.")
-        df_recent = self.df[-n:].copy()
+        df_recent = self.df[-n:].copy(deep=False)
         df_recent = self.compute_emas(df_recent)
         return self.determine_ema_trend(df_recent.iloc[-1])
 
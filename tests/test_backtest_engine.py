@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import strategies.ma_crossover_strategy  # noqa: F401  注册 MA_Crossover
+from backtest.backtest_engine import BacktestEngine
+from core.context import BacktestContext
+from core.strategy_registry import StrategyRegistry
+from execution.trade_logger import TradeLogger
+from risk_management.risk_checker import RiskChecker
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_data(n, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    index = pd.date_range("2020-01-01", periods=n, freq="1h")
+    return pd.DataFrame({
+        "open": close, "high": close * 1.005, "low": close * 0.995, "close": close,
+        "volume": rng.lognormal(0, 1, n),
+    }, index=index)
+
+
+def run_engine(data, mode, **backtest_overrides):
+    context = BacktestContext("configs/strategy/ma_crossover.yaml", "configs/backtest.yaml", "configs/risk.yaml")
+    context.backtest_config.update(backtest_overrides)
+    trade_logger = TradeLogger()
+    engine = BacktestEngine(StrategyRegistry.get("MA_Crossover"), data, context, trade_logger,
+                            RiskChecker(context), mode=mode)
+    engine.run()
+    return trade_logger.to_dataframe(), engine.get_unrealized(), engine.equity
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+@pytest.mark.parametrize("overrides", [
+    dict(execution_config=None),
+    dict(),
+    dict(intrabar_exits=True, intrabar_sub_bar=None),
+], ids=["instant_fills", "simulated_broker", "intrabar_exits"])
+def test_vectorized_mode_matches_loop(monkeypatch, seed, overrides):
+    monkeypatch.chdir(ROOT)  # 配置里的路径相对仓库根目录
+    data = make_data(1500, seed)
+    loop_trades, loop_unrealized, loop_equity = run_engine(data, "loop", **overrides)
+    vec_trades, vec_unrealized, vec_equity = run_engine(data, "vectorized", **overrides)
+
+    assert len(loop_trades) > 0
+    pd.testing.assert_frame_equal(loop_trades, vec_trades)
+    assert loop_unrealized == vec_unrealized
+    assert loop_equity == vec_equity
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("mplfinance")
+
+from indicators.bulldozer import BulldozerV2Pattern
+
+
+def make_data(n, seed):
+    """4h candles with bursts of strong up bars on hot volume, so init segments occur."""
+    rng = np.random.default_rng(seed)
+    ret = rng.normal(0, 0.01, n)
+    bursts = np.flatnonzero(rng.random(n) < 0.02)
+    for k in range(4):
+        ret[np.minimum(bursts + k, n - 1)] = 0.05 * (rng.random(len(bursts)) < 0.9)
+    close = 100 * np.exp(np.cumsum(ret))
+    open_ = np.roll(close, 1)
+    open_[0] = close[0]
+    return pd.DataFrame({
+        "open": open_,
+        "high": np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.003, n))),
+        "low": np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.003, n))),
+        "close": close,
+        "volume": rng.lognormal(0, 1, n) * (1 + 5 * (ret > 0.05)),
+    }, index=pd.date_range("2020-01-01", periods=n, freq="4h"))
+
+
+def reference_segments(df):
+    """The original bar-by-bar segment detection, run on calculate()'s feature columns."""
+    init_segments = []
+    for i in range(len(df) - 4):
+        window = df.iloc[i:i + 4]
+        if window['is_bullish'].sum() >= 3 and window['is_volume_hot'].sum() >= 2 \
+                and window['is_strong_up'].sum() >= 3:
+            init_segments.append((i, i + 3))
+
+    consolidation_segments = []
+    for start_idx, end_idx in init_segments:
+        init_high = df.iloc[start_idx:end_idx + 1]['high'].max()
+        init_low = df.iloc[start_idx:end_idx + 1]['low'].min()
+        cons_start = end_idx + 1
+        cons_end = cons_start
+        for i in range(cons_start, min(len(df), cons_start + 100)):
+            bar = df.iloc[i]
+            if bar['high'] > init_high * 1.1 and bar['is_volume_hot'] and bar['is_bullish']:
+                break
+            if bar['low'] < init_low * 0.9:
+                break
+            cons_end = i
+        if cons_end > cons_start:
+            consolidation_segments.append((cons_start, cons_end))
+    return init_segments, consolidation_segments
+
+
+@pytest.mark.parametrize("seed", [0, 2])
+def test_segments_match_reference(seed):
+    pattern = BulldozerV2Pattern()
+    df = pattern.calculate(make_data(1500, seed))
+    init_segments, consolidation_segments = reference_segments(df)
+
+    assert len(init_segments) > 0 and len(consolidation_segments) > 0
+    assert pattern.init_segments == init_segments
+    assert pattern.consolidation_segments == consolidation_segments
+
+
+@pytest.mark.parametrize("seed", [0, 2])
+def test_update_matches_full_calculate(seed):
+    data = make_data(1500, seed)
+    full = BulldozerV2Pattern()
+    expected = full.calculate(data)
+
+    incremental = BulldozerV2Pattern()
+    incremental.calculate(data.iloc[:500])
+    for end in range(500, len(data) + 1, 37):
+        incremental.update(data.iloc[:end])
+    result = incremental.update(data)
+
+    assert incremental.init_segments == full.init_segments
+    assert incremental.consolidation_segments == full.consolidation_segments
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategies.buy_signal import BuySignal
+
+
+def make_data(n, seed, with_nan=False):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.01, n)))
+    open_ = np.roll(close, 1) * (1 + rng.normal(0, 0.003, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.003, n)))
+    low = np.round(np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.003, n))), 1)
+    df = pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01", periods=n, freq="5min"),
+        "open": open_, "high": high, "low": low, "close": close, "volume": rng.lognormal(0, 1, n),
+    })
+    if with_nan:
+        df.loc[100:110, "low"] = np.nan
+        df.loc[500, "close"] = np.nan
+    return df
+
+
+DETECTORS = [
+    ("detect_pullback_entry", {}),
+    ("detect_dizijue_entry", {}),
+    ("detect_dizijue_entry", dict(trend_window=10, pullback_range=0.01)),
+]
+
+
+@pytest.mark.parametrize("detector, kwargs", DETECTORS)
+@pytest.mark.parametrize("seed, with_nan", [(0, False), (1, False), (3, True)])
+def test_vectorized_matches_loop(detector, kwargs, seed, with_nan):
+    df = make_data(1500, seed, with_nan)
+    detect = getattr(BuySignal(), detector)
+    loop = detect(df, method="loop", **kwargs)
+    vectorized = detect(df, **kwargs)
+
+    assert loop["entry_signal"].any()
+    pd.testing.assert_frame_equal(loop, vectorized)
+
+
+@pytest.mark.parametrize("detector, kwargs", DETECTORS)
+@pytest.mark.parametrize("n", [0, 5, 26, 27, 30])
+def test_vectorized_matches_loop_on_short_input(detector, kwargs, n):
+    df = make_data(n, 1)
+    detect = getattr(BuySignal(), detector)
+    pd.testing.assert_frame_equal(detect(df, method="loop", **kwargs), detect(df, **kwargs))
+
+
+def test_scan_many_runs_detector_per_symbol():
+    frames = {"A": make_data(300, 1), "B": make_data(300, 2)}
+    result = BuySignal().scan_many(frames, "dizijue")
+    assert list(result) == ["A", "B"]
+    pd.testing.assert_frame_equal(result["B"], BuySignal().detect_dizijue_entry(frames["B"]))
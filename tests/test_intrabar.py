@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.intrabar import IntrabarExits, LowerTimeframe
+
+
+def make_bars(rows):
+    """rows: (open, high, low, close) per hourly bar."""
+    return pd.DataFrame(rows, columns=["open", "high", "low", "close"],
+                        index=pd.date_range("2024-01-01", periods=len(rows), freq="h"))
+
+
+@pytest.mark.parametrize("direction, bar, stop, take, expected", [
+    # 开盘跳空越过止盈：按开盘价成交，而不是止盈价
+    ("long", (115, 116, 114, 115), 90, 110, ("take_profit", 115)),
+    ("short", (85, 86, 84, 85), 110, 90, ("take_profit", 85)),
+    # 开盘跳空越过止损：按开盘价成交
+    ("long", (85, 86, 84, 85), 90, 110, ("stop_loss", 85)),
+    ("short", (115, 116, 114, 115), 110, 90, ("stop_loss", 115)),
+    # 盘中触及：按价位成交
+    ("long", (100, 112, 99, 105), 90, 110, ("take_profit", 110)),
+    ("long", (100, 101, 88, 95), 90, 110, ("stop_loss", 90)),
+])
+def test_level_exit_price(direction, bar, stop, take, expected):
+    exits = IntrabarExits(make_bars([(100, 101, 99, 100), bar]))
+    assert exits.check(0, stop, take, direction) == (None, None)
+    assert exits.check(1, stop, take, direction) == expected
+
+    j, reason, price = exits.find_exit(None, 0, 100, stop, take, direction, exit_mask=np.zeros(2, dtype=bool))
+    assert (j, reason, price) == (1, *expected)
+
+
+@pytest.mark.parametrize("lower_rows, expected", [
+    ([(100, 112, 99, 111), (111, 111, 88, 89)], ("take_profit", 110)),
+    ([(100, 101, 88, 89), (89, 112, 89, 111)], ("stop_loss", 90)),
+])
+def test_both_levels_in_one_bar_resolved_by_lower_timeframe(lower_rows, expected):
+    lower = make_bars(lower_rows)
+    lower.index = pd.date_range("2024-01-01 01:00", periods=len(lower_rows), freq="30min")
+    exits = IntrabarExits(make_bars([(100, 101, 99, 100), (100, 112, 88, 100)]), lower=LowerTimeframe(lower, bar="30m"))
+    assert exits.check(1, 90, 110, "long") == expected
+    assert exits.resolved == 1
+
+
+def test_unresolved_bar_uses_ambiguous_policy():
+    data = make_bars([(100, 101, 99, 100), (100, 112, 88, 100)])
+    assert IntrabarExits(data).check(1, 90, 110, "long") == ("stop_loss", 90)
+    assert IntrabarExits(data, ambiguous="take_profit").check(1, 90, 110, "long") == ("take_profit", 110)
+
+
+class RangeFetcher:
+    """OKX fetcher stand-in serving 1m candles from `candles`, recording the requested ranges."""
+
+    def __init__(self, candles):
+        self.candles = candles
+        self.requests = []
+
+    def get_kline_range(self, instId, bar="1m", start=None, end=None):
+        self.requests.append((instId, bar, pd.Timestamp(start), pd.Timestamp(end)))
+        return self.candles[(self.candles.index >= start) & (self.candles.index < end)]
+
+
+def test_fetcher_downloads_only_the_ambiguous_bar():
+    minutes = pd.date_range("2024-01-01 01:00", periods=60, freq="min")
+    low = np.full(60, 99.0)
+    high = np.full(60, 101.0)
+    high[10], low[40] = 112, 88  # 先到止盈，再到止损
+    candles = pd.DataFrame({"open": 100.0, "high": high, "low": low, "close": 100.0}, index=minutes)
+    fetcher = RangeFetcher(candles)
+    lower = LowerTimeframe(fetcher=fetcher, symbol="BTC-USDT-SWAP", bar="1m")
+    data = make_bars([(100, 101, 99, 100), (100, 112, 88, 100), (100, 112, 88, 100)])
+    exits = IntrabarExits(data, lower=lower)
+
+    assert exits.check(1, 90, 110, "long") == ("take_profit", 110)
+    assert exits.check(1, 90, 110, "long") == ("take_profit", 110)
+    assert fetcher.requests == [("BTC-USDT-SWAP", "1m", data.index[1], data.index[2])]  # 同一根只下载一次
+
+    assert exits.check(2, 90, 110, "long") == ("stop_loss", 90)  # 没有低周期K线：按 ambiguous
+    assert len(fetcher.requests) == 2 and lower.missing == 1
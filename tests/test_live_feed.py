@@ -0,0 +1,82 @@
+import asyncio
+import gc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("websockets")
+
+import data.live_feed as live_feed
+from data.live_feed import LiveFeed, ReplaySource
+
+
+def make_frames(n_symbols=12, n_bars=200, seed=0):
+    """Hourly frames; symbols list at different times so some start mid-replay."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2024-01-01", periods=n_bars, freq="h")
+    frames = {}
+    for k in range(n_symbols):
+        start = int(rng.integers(0, 40))
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars - start)))
+        frames[f"S{k}-USDT-SWAP"] = pd.DataFrame({
+            "open": close, "high": close * 1.01, "low": close * 0.99, "close": close,
+            "volume": rng.random(n_bars - start),
+        }, index=index[start:])
+    return frames
+
+
+def test_replay_with_drops_delivers_every_closed_bar_once_in_order(monkeypatch):
+    monkeypatch.setattr(live_feed, "PING_INTERVAL", 0.01)
+    frames = make_frames()
+    start = 60
+    source = ReplaySource(frames, "1H", start=start, updates=2, drop_every=250, skip_on_reconnect=3)
+    feed = LiveFeed(list(frames), "1H", fetcher=source.rest(), candle_source=source,
+                    buffer_size=100, max_backoff=0)
+
+    seen = {symbol: [] for symbol in frames}
+    in_buffer = []
+
+    def on_bar(symbol, bar, buffers):
+        seen[symbol].append(bar["timestamp"])
+        in_buffer.append(buffers.last_timestamp(symbol) == bar["timestamp"])
+
+    feed.on_bar(on_bar)
+    asyncio.run(asyncio.wait_for(feed.run(), timeout=30))
+
+    assert feed.reconnects > 0  # 断线确实发生过，漏掉的K线靠补数据补回
+    first = source.index[start]
+    for symbol, df in frames.items():
+        assert seen[symbol] == list(df.index[df.index >= first])
+    assert all(in_buffer)
+
+    frame = feed.buffers.to_frame("S3-USDT-SWAP")
+    np.testing.assert_array_equal(frame.to_numpy(), frames["S3-USDT-SWAP"].tail(100).to_numpy())
+
+
+def test_failed_ping_is_logged_not_leaked(monkeypatch, caplog):
+    monkeypatch.setattr(live_feed, "PING_INTERVAL", 0)
+    original_send = live_feed._ReplayConnection.send
+
+    async def send(conn, text):
+        if text == "ping":
+            raise ConnectionError("socket closed")
+        await original_send(conn, text)
+
+    monkeypatch.setattr(live_feed._ReplayConnection, "send", send)
+    frames = make_frames(n_symbols=3, n_bars=120)
+    source = ReplaySource(frames, "1H", start=60, interval=0.001, drop_every=40, skip_on_reconnect=1)
+    feed = LiveFeed(list(frames), "1H", fetcher=source.rest(), candle_source=source, max_backoff=0)
+
+    leaked = []
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: leaked.append(context))
+        await feed.run()
+        gc.collect()  # 未取回的任务异常在任务被回收时报告
+
+    asyncio.run(main())
+
+    assert feed.reconnects > 0
+    assert leaked == []  # 没有 "Task exception was never retrieved"
+    assert "ping failed" in caplog.text
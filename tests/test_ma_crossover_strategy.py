@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from strategies.ma_crossover_strategy import MovingAverageCrossoverStrategy
+
+CONFIG = dict(short_window=10, long_window=50, volume_multiplier=1.5, stop_loss_pct=0.02, take_profit_pct=0.04)
+
+
+def make_strategy(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    data = pd.DataFrame({
+        "open": close, "high": close * 1.005, "low": close * 0.995, "close": close,
+        "volume": rng.lognormal(0, 1, n),
+    }, index=pd.date_range("2020-01-01", periods=n, freq="1h"))
+    strategy = MovingAverageCrossoverStrategy(data)
+    strategy.config = dict(CONFIG)
+    return strategy.prepare()
+
+
+def test_entry_signals_match_entry_signal():
+    strategy = make_strategy()
+    signals = strategy.entry_signals()
+    assert list(signals) == [strategy.entry_signal(i) for i in range(len(signals))]
+    assert all(s is None for s in signals[:CONFIG['long_window']])
+
+
+@pytest.mark.parametrize("start, stop", [(50, 300), (250, 500), (1000, 1720), (1751, 2000)])
+def test_window_keeps_warm_up_history(start, stop):
+    full = make_strategy()
+    expected = full.entry_signals()[start:stop]
+    view = full.window(start, stop)
+
+    assert (expected != None).sum() > 0  # noqa: E711  窗口内确有信号
+    assert list(view.entry_signals()) == list(expected)
+    assert [view.entry_signal(i) for i in range(stop - start)] == list(expected)
+
+
+def test_window_at_data_start_has_no_warm_up():
+    full = make_strategy()
+    view = full.window(0, 300)
+    assert list(view.entry_signals()) == list(full.entry_signals()[:300])
+
+
+def test_signal_on_first_bars_of_window():
+    full = make_strategy()
+    signals = full.entry_signals()
+    hits = [i for i in np.flatnonzero(signals != None) if i > CONFIG['long_window']]  # noqa: E711
+    assert hits
+    for i in hits:
+        for start in (i - 1, i):  # 信号在窗口第 2 根 / 第 1 根
+            assert full.window(start, i + 5).entry_signals()[i - start] == signals[i]
@@ -0,0 +1,130 @@
+import threading
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("okx.MarketData")
+pytest.importorskip("binance.client")
+
+import utils.rate_limiter as rate_limiter
+from data.market_data import OKXDataFetcher
+
+BASE_TS = 1_700_000_000_000
+HOUR_MS = 3_600_000
+HISTORY = 500
+
+
+class HTTPError(Exception):
+    """What the SDK's HTTP client raises for a non-2xx response."""
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = type("Response", (), {"status_code": status_code, "headers": {}})()
+
+
+class FakeMarketAPI:
+    """
+    OKX MarketAPI stand-in serving HISTORY hourly candles per instrument.
+    Per instrument, the 1st and 4th calls answer code 50011 and the 2nd
+    raises HTTP 429, so both the first page and a later page get throttled.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def get_candlesticks(self, instId, bar, limit, after=None):
+        with self.lock:
+            n = self.calls[instId] = self.calls.get(instId, 0) + 1
+        if n in (1, 4):
+            return {"code": "50011", "msg": "Too Many Requests", "data": []}
+        if n == 2:
+            raise HTTPError(429)
+        ts = [BASE_TS + i * HOUR_MS for i in range(HISTORY)][::-1]  # 新的在前
+        if after is not None:
+            ts = [t for t in ts if t < int(after)]
+        rows = [[str(t), "1", "2", "0.5", "1.5", "10", "0", "0", "1"] for t in ts[:int(limit)]]
+        return {"code": "0", "msg": "", "data": rows}
+
+
+    def get_history_candlesticks(self, instId, bar, after=None, limit="100"):
+        ts = [BASE_TS + i * HOUR_MS for i in range(HISTORY)][::-1]
+        if after:
+            ts = [t for t in ts if t < int(after)]
+        rows = [[str(t), "1", "2", "0.5", "1.5", "10", "0", "0", "1"] for t in ts[:int(limit)]]
+        with self.lock:
+            self.calls["history"] = self.calls.get("history", 0) + 1
+        return {"code": "0", "msg": "", "data": rows}
+
+
+@pytest.fixture
+def fetcher(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "backoff_delay", lambda *args, **kwargs: 0.0)
+    fetcher = OKXDataFetcher()
+    fetcher.marketDataAPI = FakeMarketAPI()
+    return fetcher
+
+
+def test_fetch_many_retries_rate_limits(fetcher):
+    symbols = [f"S{i}-USDT-SWAP" for i in range(8)]
+    result = fetcher.fetch_many(symbols, bar="1H", total=450, max_workers=4)
+
+    assert sorted(result) == sorted(symbols)
+    for symbol, df in result.items():
+        assert len(df) == 450
+        assert df.index.is_monotonic_increasing and df.index.is_unique
+        assert df.index[-1].value // 10 ** 6 == BASE_TS + (HISTORY - 1) * HOUR_MS
+        assert fetcher.marketDataAPI.calls[symbol] == 5  # 2 页 + 3 次被限频后重试
+
+
+def test_fetch_many_gives_up_after_max_retries(fetcher, monkeypatch):
+    def always_throttled(instId, bar, limit, after=None):
+        return {"code": "50011", "msg": "Too Many Requests", "data": []}
+
+    monkeypatch.setattr(fetcher.marketDataAPI, "get_candlesticks", always_throttled)
+    assert fetcher.fetch_many(["S0-USDT-SWAP"], total=10) == {}
+
+
+def test_get_kline_range_fetches_only_the_window(fetcher):
+    start = pd.Timestamp(BASE_TS + 100 * HOUR_MS, unit="ms")
+    end = start + pd.Timedelta(hours=150)
+    df = fetcher.get_kline_range("S0-USDT-SWAP", bar="1H", start=start, end=end)
+
+    assert len(df) == 150
+    assert df.index[0] == start and df.index[-1] == end - pd.Timedelta(hours=1)
+    assert fetcher.marketDataAPI.calls["history"] == 2  # 每页 100 根，只翻到 start
+
+
+class FakeSession:
+    def __init__(self):
+        self.hooks = {"response": []}
+
+
+class FakeBinanceClient:
+    """
+    python-binance Client stand-in: requests go through session hooks, and
+    client.response is left pointing at another thread's (idle) response.
+    """
+
+    def __init__(self):
+        self.session = FakeSession()
+        self.response = type("Response", (), {"headers": {"X-MBX-USED-WEIGHT-1m": "0"}})()
+
+    def get_klines(self, symbol, interval, endTime=None, limit=500, **kwargs):
+        response = type("Response", (), {"headers": {"X-MBX-USED-WEIGHT-1m": "5300"}})()
+        for hook in self.session.hooks["response"]:
+            hook(response)
+        return [[BASE_TS + i * HOUR_MS, "1", "2", "0.5", "1.5", "10", 0, "0", 1, "0", "0", "0"]
+                for i in range(limit)]
+
+
+def test_binance_weight_synced_from_own_response(monkeypatch):
+    import data.market_data as market_data
+
+    monkeypatch.setattr(market_data, "Client", FakeBinanceClient)
+    fetcher = market_data.BinanceDataFetcher()
+    fetcher.limiter = rate_limiter.RateLimiter(**rate_limiter.DEFAULT_LIMITS["binance"])
+
+    assert len(fetcher.get_klines("BTCUSDT", total=10)) == 10
+    # 本次响应报告已用 5300 / 5400，本地预算随之收紧，而不是按 client.response 的 0
+    assert fetcher.limiter.bucket.tokens < 200
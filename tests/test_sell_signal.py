@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("mplfinance")
+
+from strategies.sell_signal import SellSignal, SellSignalStream
+
+SIGNALS = ["exit_signal_1", "exit_signal_2", "exit_signal_3", "exit_signal"]
+
+
+def make_data(n, seed):
+    rng = np.random.default_rng(seed)
+    open_ = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    close = open_ * (1 + rng.normal(0, 0.02, n))
+    high = np.round(np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, n))), 1)  # 取整制造相等的高点
+    volume = rng.lognormal(0, 1, n)
+    volume[::7] *= 5
+    return pd.DataFrame({
+        "timestamp": pd.date_range("2024-01-01", periods=n, freq="min"),
+        "open": open_, "high": high, "low": np.minimum(open_, close), "close": close, "volume": volume,
+    })
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_vectorized_matches_loop(seed):
+    df = make_data(800, seed)
+    loop = SellSignal().detect_exit_signal_full(df, method="loop")
+    vectorized = SellSignal().detect_exit_signal_full(df)
+
+    assert loop[SIGNALS[:3]].to_numpy().any(axis=0).all()  # 三种信号都出现过
+    pd.testing.assert_frame_equal(loop, vectorized)
+
+
+@pytest.mark.parametrize("n", [0, 5, 20, 23])
+def test_vectorized_matches_loop_on_short_input(n):
+    df = make_data(n, 0)
+    pd.testing.assert_frame_equal(SellSignal().detect_exit_signal_full(df, method="loop"),
+                                  SellSignal().detect_exit_signal_full(df))
+
+
+def test_stream_matches_batch():
+    df = make_data(800, 0)
+    batch = SellSignal().detect_exit_signal_full(df)
+    stream = SellSignalStream()
+    rows = pd.DataFrame([stream.update(bar) for bar in df.to_dict("records")])
+    np.testing.assert_array_equal(rows[SIGNALS].to_numpy(), batch[SIGNALS].to_numpy())
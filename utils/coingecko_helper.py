@@ -1,23 +1,15 @@
-import requests
-import time
+from utils.rate_limiter import get_limiter, http_get_json
+
 
 def query_coin_info_from_coingecko(query: str, max_retries=5, base_sleep=10):
+    # 所有 CoinGecko 调用共享同一个限速器，429 时按 Retry-After / 抖动退避重试
+    limiter = get_limiter("coingecko")
+
     def rate_limited_request(url, name):
-        for attempt in range(max_retries):
-            try:
-                resp = requests.get(url)
-                if resp.status_code == 429:
-                    wait = base_sleep * (attempt + 1)
-                    print(f"[!] Rate limited for {name}, sleep {wait}s and retrying ({attempt+1}/{max_retries})")
-                    time.sleep(wait)
-                    continue
-                resp.raise_for_status()
-                return resp.json()
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    raise Exception(f"{name} API failed after retries for {query}") from e
-                time.sleep(base_sleep * (attempt + 1))
-        return None
+        try:
+            return http_get_json(url, limiter=limiter, max_retries=max_retries, base_delay=base_sleep)
+        except Exception as e:
+            raise Exception(f"{name} API failed after retries for {query}") from e
 
     # Step 1: Search
     search_url = f"https://api.coingecko.com/api/v3/search?query={query}"
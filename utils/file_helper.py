@@ -1,26 +1,116 @@
 # file: utils/io_helper.py
 
+import json
 import os
+from datetime import datetime
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+MANIFEST_FILE = "manifest.json"
+
 
 class DataIO:
+    """
+    Artifacts in `output_dir` stored as Parquet files (one per name) plus a
+    manifest.json describing each one (rows, schema, size, save time).
+
+    Parquet keeps the column types, is portable across pandas versions and
+    lets load() read only some columns and skip row groups that cannot match
+    a filter, instead of unpickling the whole frame. Old .pkl artifacts are
+    still readable.
+    """
+
+    ROW_GROUP_SIZE = 64 * 1024
+
+    @staticmethod
+    def _manifest_path(output_dir):
+        return os.path.join(output_dir, MANIFEST_FILE)
+
+    @staticmethod
+    def manifest(output_dir: str = "output") -> dict:
+        """name -> {path, format, rows, columns, index, bytes, saved_at} for every saved artifact."""
+        path = DataIO._manifest_path(output_dir)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
     @staticmethod
-    def save(df: pd.DataFrame, name: str, output_dir: str = "output"):
+    def _update_manifest(output_dir, name, entry):
+        manifest = DataIO.manifest(output_dir)
+        manifest[name] = entry
+        path = DataIO._manifest_path(output_dir)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)  # 原子替换，避免写一半的 manifest
+
+    @staticmethod
+    def save(df: pd.DataFrame, name: str, output_dir: str = "output", row_group_size: int = None):
         """
-        Save DataFrame to a pickle file (overwrites if exists).
+        Save DataFrame to a Parquet file (overwrites if exists) and record it in the manifest.
+
+        Parameters:
+        - row_group_size (int): Rows per row group; smaller groups let filtered loads skip more
         """
         os.makedirs(output_dir, exist_ok=True)
-        path = os.path.join(output_dir, f"{name}.pkl")
-        df.to_pickle(path)
+        path = os.path.join(output_dir, f"{name}.parquet")
+        table = pa.Table.from_pandas(df, preserve_index=None)
+        tmp = path + ".tmp"
+        pq.write_table(table, tmp, row_group_size=row_group_size or DataIO.ROW_GROUP_SIZE)
+        os.replace(tmp, path)
+
+        index_columns = table.schema.pandas_metadata.get("index_columns", []) if table.schema.pandas_metadata else []
+        DataIO._update_manifest(output_dir, name, {
+            "path": path,
+            "format": "parquet",
+            "rows": len(df),
+            "columns": {str(c): str(df[c].dtype) for c in df.columns},
+            "index": [c if isinstance(c, str) else c.get("kind") for c in index_columns],
+            "bytes": os.path.getsize(path),
+            "saved_at": datetime.utcnow().isoformat(timespec="seconds"),
+        })
         print(f"✅ Saved: {path}")
 
     @staticmethod
-    def load(name: str, output_dir: str = "output") -> pd.DataFrame:
+    def load(name: str, output_dir: str = "output", columns: list = None, filters=None,
+             memory_map: bool = True) -> pd.DataFrame:
         """
-        Load DataFrame from a pickle file.
+        Load DataFrame from a Parquet file, optionally only part of it.
+
+        Parameters:
+        - columns (list): Only read these columns (the index is always restored)
+        - filters: Row filter in pyarrow form, e.g. [("final_score", ">", 0.7)];
+          row groups whose min/max statistics cannot match are not read
+        - memory_map (bool): Map the file instead of reading it into a buffer
+
+        Returns:
+        - pd.DataFrame
         """
-        path = os.path.join(output_dir, f"{name}.pkl")
-        if not os.path.exists(path):
+        path = os.path.join(output_dir, f"{name}.parquet")
+        if os.path.exists(path):
+            if columns is not None:
+                # 索引列也要一起读，to_pandas() 才能还原索引
+                meta = pq.read_schema(path, memory_map=memory_map).pandas_metadata or {}
+                stored = [c for c in meta.get("index_columns", []) if isinstance(c, str)]
+                columns = list(columns) + [c for c in stored if c not in columns]
+            table = pq.read_table(path, columns=columns, filters=filters, memory_map=memory_map)
+            print(f"📦 Loaded: {path}")
+            return table.to_pandas()
+
+        # 兼容旧的 pickle 产物：只能整体读入后再筛选
+        legacy = os.path.join(output_dir, f"{name}.pkl")
+        if not os.path.exists(legacy):
             raise FileNotFoundError(f"No such file: {path}")
-        print(f"📦 Loaded: {path}")
-        return pd.read_pickle(path)
+        print(f"📦 Loaded: {legacy}")
+        df = pd.read_pickle(legacy)
+        if filters is not None:
+            df = pa.Table.from_pandas(df).filter(pq.filters_to_expression(filters)).to_pandas()
+        return df[columns] if columns is not None else df
+
+    @staticmethod
+    def schema(name: str, output_dir: str = "output") -> pa.Schema:
+        """Arrow schema of a saved artifact, read from the file footer only."""
+        return pq.read_schema(os.path.join(output_dir, f"{name}.parquet"))
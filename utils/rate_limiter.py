@@ -0,0 +1,287 @@
+import asyncio
+import random
+import threading
+import time
+
+import requests
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    Callers block in acquire() until enough tokens are available, so many
+    threads can share one exchange budget instead of sleeping a fixed time.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Parameters:
+        - rate (float): Tokens added per second
+        - capacity (float): Maximum burst size
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens if available.
+
+        Returns:
+        - float: 0 if the tokens were taken, otherwise seconds to wait before retrying
+        """
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def limit_tokens(self, remaining: float):
+        """Clamp the local budget to what the server reports as remaining."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, max(float(remaining), 0.0))
+
+    def acquire(self, tokens: float = 1.0):
+        """Block until `tokens` are available and take them."""
+        tokens = min(tokens, self.capacity)
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1.0):
+        """Same as acquire() but yields to the event loop while waiting."""
+        tokens = min(tokens, self.capacity)
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class RateLimitedError(Exception):
+    """Raised when a service answers 429/418/5xx or an equivalent error code."""
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """
+    Rate limiter for one outbound service (an exchange, CoinGecko, ...).
+
+    - A shared weight budget for the whole service (e.g. Binance 6000 weight / min)
+    - Optional per-endpoint request buckets (e.g. OKX candles 40 req / 2s)
+    - Per-endpoint request weights
+    - Feedback from rate-limit response headers and Retry-After cool-downs,
+      which pause every thread and task using the same limiter
+    """
+
+    def __init__(self, rate, capacity, endpoints=None, weights=None, header_limit=None):
+        """
+        Parameters:
+        - rate (float): Weight refilled per second for the whole service
+        - capacity (float): Maximum weight burst
+        - endpoints (dict): endpoint -> (rate, capacity) for endpoint-specific request limits
+        - weights (dict): endpoint -> request weight, defaults to 1
+        - header_limit (float): Server-side weight limit used to interpret "used weight" headers
+        """
+        self.bucket = TokenBucket(rate, capacity)
+        self.endpoints = {name: TokenBucket(r, c) for name, (r, c) in (endpoints or {}).items()}
+        self.weights = weights or {}
+        self.header_limit = header_limit
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _weight(self, endpoint, weight):
+        if weight is not None:
+            return weight
+        return self.weights.get(endpoint, 1)
+
+    def _cooldown(self):
+        with self.lock:
+            return self.blocked_until - time.monotonic()
+
+    def block_for(self, seconds: float):
+        """Pause all callers for `seconds` (e.g. after a 429 with Retry-After)."""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def acquire(self, endpoint=None, weight=None):
+        """Block until a request to `endpoint` fits in the budget."""
+        wait = self._cooldown()
+        if wait > 0:
+            time.sleep(wait)
+        if endpoint in self.endpoints:
+            self.endpoints[endpoint].acquire(1)
+        self.bucket.acquire(self._weight(endpoint, weight))
+
+    async def acquire_async(self, endpoint=None, weight=None):
+        wait = self._cooldown()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        if endpoint in self.endpoints:
+            await self.endpoints[endpoint].acquire_async(1)
+        await self.bucket.acquire_async(self._weight(endpoint, weight))
+
+    def update_from_headers(self, headers):
+        """
+        Adjust the local budget from response headers.
+
+        Understands Binance's X-MBX-USED-WEIGHT-1m, the common
+        X-RateLimit-Remaining and Retry-After.
+        """
+        if not headers:
+            return
+        headers = {k.lower(): v for k, v in headers.items()}
+        try:
+            used = headers.get("x-mbx-used-weight-1m")
+            if used is not None and self.header_limit:
+                self.bucket.limit_tokens(self.header_limit - float(used))
+            remaining = headers.get("x-ratelimit-remaining")
+            if remaining is not None:
+                self.bucket.limit_tokens(float(remaining))
+            retry_after = headers.get("retry-after")
+            if retry_after is not None:
+                self.block_for(float(retry_after))
+        except ValueError:
+            pass
+
+
+RETRY_STATUS_CODES = {418, 429, 500, 502, 503, 504}
+
+
+def backoff_delay(attempt, base_delay=0.5, max_delay=30.0):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def _retry_after(e):
+    """
+    Decide whether an exception is worth retrying.
+
+    Returns:
+    - None if not retryable, otherwise the server-requested wait in seconds (0 if unknown)
+    """
+    if isinstance(e, RateLimitedError):
+        return e.retry_after or 0.0
+    if isinstance(e, (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError)):
+        return 0.0
+    response = getattr(e, "response", None)
+    status = getattr(e, "status_code", None) or getattr(response, "status_code", None)
+    if status in RETRY_STATUS_CODES:
+        retry_after = getattr(response, "headers", {}).get("Retry-After") if response is not None else None
+        try:
+            return float(retry_after) if retry_after else 0.0
+        except ValueError:
+            return 0.0
+    return None
+
+
+def call_with_retry(fn, *args, limiter: RateLimiter = None, endpoint=None, weight=None,
+                    max_retries=5, base_delay=0.5, max_delay=30.0, **kwargs):
+    """
+    Call fn(*args, **kwargs) under `limiter`, retrying 429/5xx/connection
+    errors with jittered exponential backoff. Non-retryable errors and the
+    last failure are re-raised.
+    """
+    for attempt in range(max_retries):
+        if limiter is not None:
+            limiter.acquire(endpoint, weight)
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            retry_after = _retry_after(e)
+            if retry_after is None or attempt == max_retries - 1:
+                raise
+            delay = max(retry_after, backoff_delay(attempt, base_delay, max_delay))
+            if limiter is not None and retry_after:
+                limiter.block_for(retry_after)
+            print(f"[!] {e.__class__.__name__}: {e}, retry in {delay:.1f}s ({attempt + 1}/{max_retries})")
+            time.sleep(delay)
+
+
+async def call_with_retry_async(fn, *args, limiter: RateLimiter = None, endpoint=None, weight=None,
+                                max_retries=5, base_delay=0.5, max_delay=30.0, **kwargs):
+    """Async counterpart of call_with_retry() for coroutine functions."""
+    for attempt in range(max_retries):
+        if limiter is not None:
+            await limiter.acquire_async(endpoint, weight)
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            retry_after = _retry_after(e)
+            if retry_after is None or attempt == max_retries - 1:
+                raise
+            delay = max(retry_after, backoff_delay(attempt, base_delay, max_delay))
+            if limiter is not None and retry_after:
+                limiter.block_for(retry_after)
+            await asyncio.sleep(delay)
+
+
+def http_get_json(url, limiter: RateLimiter = None, endpoint=None, max_retries=5, base_delay=1.0, **kwargs):
+    """
+    requests.get() a JSON endpoint under a limiter, feeding response headers
+    back into it and retrying 429/5xx with backoff.
+    """
+    def _get():
+        resp = requests.get(url, **kwargs)
+        if limiter is not None:
+            limiter.update_from_headers(resp.headers)
+        if resp.status_code in RETRY_STATUS_CODES:
+            retry_after = resp.headers.get("Retry-After")
+            raise RateLimitedError(
+                f"HTTP {resp.status_code} for {url}",
+                status_code=resp.status_code,
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+        resp.raise_for_status()
+        return resp.json()
+
+    return call_with_retry(_get, limiter=limiter, endpoint=endpoint,
+                           max_retries=max_retries, base_delay=base_delay)
+
+
+# 各服务的限额（留一些余量）
+# OKX: /market/candles 40 次 / 2s, /market/history-candles 20 次 / 2s, /market/tickers 20 次 / 2s
+# Binance: 6000 weight / min, klines weight 2, exchangeInfo 20, 全量 24hr ticker 80
+# CoinGecko 免费接口: 约 30 次 / min
+DEFAULT_LIMITS = {
+    "okx": dict(
+        rate=36.0, capacity=72.0,
+        endpoints={"candles": (18.0, 36.0), "history_candles": (9.0, 18.0), "tickers": (9.0, 18.0)},
+    ),
+    "binance": dict(
+        rate=90.0, capacity=5000.0,
+        weights={"klines": 2, "exchange_info": 20, "ticker_24hr": 80},
+        header_limit=5400.0,
+    ),
+    "coingecko": dict(rate=0.4, capacity=3.0),
+}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name: str) -> RateLimiter:
+    """
+    Return the process-wide limiter for `name`, creating it on first use,
+    so every client instance, worker thread and async task draws from one budget.
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = RateLimiter(**DEFAULT_LIMITS.get(name, dict(rate=5.0, capacity=5.0)))
+        return _limiters[name]
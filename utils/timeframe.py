@@ -0,0 +1,7 @@
+import pandas as pd
+
+
+def bar_delta(bar: str) -> pd.Timedelta:
+    """OKX / Binance bar string ('1m', '15m', '1H' / '1h', '4H', '1D' / '1d', '1W') -> pd.Timedelta."""
+    unit = {"m": "min", "H": "h", "h": "h", "D": "D", "d": "D", "W": "W", "w": "W"}[bar[-1]]
+    return pd.Timedelta(int(bar[:-1]), unit)